@@ -0,0 +1,186 @@
+# autotune.py
+# Some operations have several implementations (OpenCV, NumPy, PIL; see Operation.backends)
+# whose speed depends on the machine: a Raspberry Pi's ARM cores and an x86 laptop rank
+# them differently. The first time such an operation runs for a given image mode, size
+# and cost class, every implementation is timed on a crop of the actual image and checked
+# against the operation's own one; the fastest that matches within the operation's
+# tolerance is used from then on. Choices are kept in a JSON profile, per machine, so
+# tuning happens once per machine rather than once per run.
+#
+#   python autotune.py            (shows the profile)
+#   python autotune.py --clear    (forgets it, so everything is measured again)
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+import PIL
+
+PROFILE_ENV = "IMAGE_EDITOR_BACKEND_PROFILE"   # Profile path; "off" disables tuning
+DEFAULT_PROFILE = os.path.join(os.path.expanduser("~"), ".cache", "image-editor", "backends.json")
+DEFAULT_BACKEND = "default"   # The operation's own implementation (apply or kernel)
+TUNE_SAMPLE_SIDE = 512        # Implementations are timed on a centred crop no larger than this
+TUNE_REPEAT = 5               # Best of this many runs per implementation
+TUNE_MARGIN = 0.1             # An alternative must be this much faster than the default to be used
+
+
+def machine_id():
+    # Anything that changes the ranking invalidates the profile
+    return (f"{platform.system()} {platform.machine()} cpus={os.cpu_count()} opencv={cv2.__version__} "
+            f"numpy={np.__version__} pillow={PIL.__version__}")
+
+
+def centre_crop(image, side=TUNE_SAMPLE_SIDE):
+    height, width = image.shape[:2]
+    top, left = max(0, (height - side) // 2), max(0, (width - side) // 2)
+    return np.ascontiguousarray(image[top:top + side, left:left + side])
+
+
+def max_difference(a, b, border=0):
+    # Largest per-pixel difference, ignoring `border` pixels around the edge (libraries
+    # extend images differently past their edges); None if the shapes differ
+    if a.shape != b.shape:
+        return None
+    if border and a.shape[0] > 2 * border and a.shape[1] > 2 * border:
+        a, b = a[border:-border, border:-border], b[border:-border, border:-border]
+    return int(cv2.absdiff(a, b).max()) if a.size else 0
+
+
+def profile_path():
+    path = os.environ.get(PROFILE_ENV, DEFAULT_PROFILE)
+    return None if path.lower() == "off" else path
+
+
+class BackendTuner:
+    def __init__(self, path=None, report=None):
+        # path None: from IMAGE_EDITOR_BACKEND_PROFILE, or DEFAULT_PROFILE; "" keeps the
+        # profile in memory only. report(message) receives a line per tuning decision.
+        self.path = profile_path() if path is None else path
+        self.enabled = self.path is not None
+        self.report = report
+        self._choices = None
+        self._lock = threading.Lock()
+
+    def key(self, operation, image, value):
+        # Size is bucketed by the sample's pixel count, the value by the operation's cost for
+        # it (a bigger kernel is a different problem, a different brightness is not)
+        channels = 1 if image.ndim == 2 else image.shape[2]
+        pixels = min(image.shape[0], TUNE_SAMPLE_SIDE) * min(image.shape[1], TUNE_SAMPLE_SIDE)
+        cost_class = round(2 * math.log2(max(operation.unit_cost(value), 1e-3)))
+        return f"{operation.name}/c{channels}/p{max(pixels, 1).bit_length()}/k{cost_class}"
+
+    def choose(self, operation, image, value, context=None):
+        # Name of the implementation to use; measures them the first time (value is coerced)
+        if not self.enabled or not operation.backends:
+            return DEFAULT_BACKEND
+        key = self.key(operation, image, value)
+        with self._lock:
+            choices = self._profile()
+            entry = choices.get(key)
+            if entry is None or entry["backend"] not in operation.implementations():
+                entry = choices[key] = self._tune(operation, centre_crop(image), value, context)
+                self._save()
+                if self.report is not None:
+                    self.report(self.describe(key, entry))
+            return entry["backend"]
+
+    def _tune(self, operation, sample, value, context):
+        # A first run of each implementation warms it up and checks its output; the timed
+        # runs then take turns, so a slow moment on the machine hits all of them alike
+        expected = operation.run_backend(DEFAULT_BACKEND, sample, value, context)
+        border = operation.region_halo(value)
+        candidates, rejected = [DEFAULT_BACKEND], {}
+        for name in operation.implementations():
+            if name == DEFAULT_BACKEND:
+                continue
+            try:
+                difference = max_difference(operation.run_backend(name, sample, value, context), expected, border)
+            except Exception as e:
+                rejected[name] = f"failed: {e}"
+                continue
+            if difference is None or difference > operation.tolerance:
+                rejected[name] = f"differs by {difference}" if difference is not None else "different shape"
+            else:
+                candidates.append(name)
+        best = dict.fromkeys(candidates, float("inf"))
+        for _ in range(TUNE_REPEAT):
+            for name in candidates:
+                start = time.perf_counter()
+                operation.run_backend(name, sample, value, context)
+                best[name] = min(best[name], time.perf_counter() - start)
+        # Another implementation has to be clearly faster than the operation's own
+        fastest = min(best, key=best.get)
+        backend = fastest if best[fastest] < best[DEFAULT_BACKEND] * (1.0 - TUNE_MARGIN) else DEFAULT_BACKEND
+        return {"backend": backend, "ms": {name: round(t * 1000.0, 3) for name, t in best.items()}, "rejected": rejected}
+
+    @staticmethod
+    def describe(key, entry):
+        times = "  ".join(f"{name} {ms:.2f}ms" for name, ms in sorted(entry["ms"].items(), key=lambda item: item[1]))
+        rejected = "".join(f"  [{name}: {reason}]" for name, reason in entry["rejected"].items())
+        return f"{key}: {entry['backend']}  ({times}){rejected}"
+
+    def choices(self):
+        with self._lock:
+            return dict(self._profile())
+
+    def clear(self):
+        with self._lock:
+            self._choices = {}
+            self._save()
+
+    def _profile(self):
+        if self._choices is None:
+            self._choices = {}
+            if self.path:
+                try:
+                    with open(self.path) as f:
+                        profile = json.load(f)
+                    if profile.get("machine") == machine_id():
+                        self._choices = profile.get("choices", {})
+                except (OSError, ValueError):
+                    pass # Missing or unreadable: tune again
+        return self._choices
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            temp_path = f"{self.path}.{os.getpid()}-{threading.get_ident()}.partial"
+            with open(temp_path, "w") as f:
+                json.dump({"machine": machine_id(), "choices": self._choices}, f, indent=1, sort_keys=True)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path) # Batch workers may tune at the same time
+        except OSError as e:
+            print(f"WARNING: could not save the backend profile '{self.path}': {e}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show or clear the per-machine backend profile.")
+    parser.add_argument("--profile", help=f"Profile file (default: ${PROFILE_ENV} or {DEFAULT_PROFILE})")
+    parser.add_argument("--clear", action="store_true", help="Forget all choices")
+    args = parser.parse_args(argv)
+
+    tuner = BackendTuner(args.profile)
+    if not tuner.enabled:
+        print("Backend tuning is off.")
+        return 0
+    if args.clear:
+        tuner.clear()
+        print(f"Cleared '{tuner.path}'.")
+        return 0
+    print(f"{tuner.path} ({machine_id()})")
+    for key, entry in sorted(tuner.choices().items()):
+        print(tuner.describe(key, entry))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+# batch.py
+# Headless batch processing with ImageLogic, no Qt needed:
+#
+#   python batch.py --recipe "grayscale -> gaussian_blur 5 -> canny 50,150" --output-dir out "photos/*.jpg"
+#   python batch.py --recipe edits.json --output-dir out --resume "photos/**/*.png"
+#
+# The recipe is either a file saved with "Save Recipe" or steps joined by "->", each step an
+# operation name followed by its value (comma-separated when it takes several numbers).
+# Outputs keep the inputs' directory layout below the deepest directory they share, so
+# photos/a/x.jpg and photos/b/x.jpg do not overwrite each other.
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import cv2
+
+from logic import ImageLogic
+from operations import registry
+from pipeline import Pipeline
+from saver import TEMP_MARKER, encoder_options, format_for_path, write_atomic
+from tiling import TileExecutor
+
+# --- Recipe parsing ---
+def _parse_number(text):
+    number = float(text)
+    return int(number) if number.is_integer() and "." not in text else number
+
+def parse_recipe(text):
+    # "grayscale -> gaussian_blur 5 -> canny 50,150" -> [("grayscale", None), ("gaussian_blur", 5), ("canny", [50, 150])]
+    steps = []
+    for part in text.replace("→", "->").split("->"):
+        fields = part.split(None, 1)
+        if not fields:
+            raise ValueError(f"Empty step in recipe: {text!r}")
+        value = None
+        if len(fields) == 2:
+            values = [_parse_number(v.strip()) for v in fields[1].split(",") if v.strip()]
+            value = values[0] if len(values) == 1 else values
+        steps.append((fields[0], value))
+    return steps
+
+def load_recipe(recipe):
+    steps = Pipeline.load_steps(recipe) if os.path.isfile(recipe) else parse_recipe(recipe)
+    # A misspelt step would otherwise only fail once per file, after every input was decoded
+    registry.load_plugins()
+    for name, _ in steps:
+        if name not in registry:
+            raise ValueError(f"Unknown operation: {name!r}")
+    return steps
+
+# --- Output ---
+def input_root(inputs):
+    # Deepest directory holding every input; outputs mirror the tree below it
+    return os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in inputs])
+
+def output_path_for(input_path, output_dir, output_format, suffix, root=None):
+    # photos/a/x.jpg and photos/b/x.jpg with root "photos" -> out/a/x.jpg and out/b/x.jpg
+    relative = os.path.relpath(os.path.abspath(input_path), os.path.abspath(root)) if root else os.path.basename(input_path)
+    stem, ext = os.path.splitext(relative)
+    ext = f".{output_format.lower().lstrip('.')}" if output_format else ext
+    return os.path.join(output_dir, f"{stem}{suffix}{ext}")
+
+def check_outputs(jobs):
+    # Two inputs writing one output (x.jpg and x.png with --format png), or an output
+    # overwriting an input, would silently lose a file; refuse before any work starts
+    sources = {os.path.normcase(os.path.abspath(src)) for src, _ in jobs}
+    seen = {}
+    for src, dst in jobs:
+        key = os.path.normcase(os.path.abspath(dst))
+        if key in seen:
+            raise ValueError(f"{seen[key]} and {src} would both be written to {dst}")
+        if key in sources:
+            raise ValueError(f"Output {dst} would overwrite an input; use another --output-dir or a --suffix")
+        seen[key] = src
+
+# --- Worker process ---
+_worker_logic = None
+_worker_status = []
+
+def _init_worker():
+    global _worker_logic
+    # One process per core already; keep OpenCV and the strip executor single-threaded
+    cv2.setNumThreads(1)
+    _worker_logic = ImageLogic(gui_status_callback=_worker_status.append, keep_history=False)
+    _worker_logic.tiles = TileExecutor(max_workers=1)
+
+def _process_file(input_path, output_path, steps, encoder=None):
+    # Streams one file: decode -> run the recipe -> encode; only paths cross the process boundary
+    start = time.perf_counter()
+    del _worker_status[:]
+    if not _worker_logic.load_image(input_path):
+        raise RuntimeError(_worker_status[-1] if _worker_status else "Could not load image")
+    height, width = _worker_logic.current_image.shape[:2]
+    if steps:
+        _worker_logic.run_operation("chain", steps)
+    write_atomic(_worker_logic.current_image, output_path, encoder_options(format_for_path(output_path), **(encoder or {})))
+    return width * height, time.perf_counter() - start
+
+# --- Driver ---
+def collect_inputs(patterns):
+    paths = []
+    for pattern in patterns:
+        paths.extend(sorted(glob.glob(pattern, recursive=True)))
+    return [p for p in dict.fromkeys(paths) if os.path.isfile(p)]
+
+def _remove_stale_temp_files(output_dir):
+    for directory, _, names in os.walk(output_dir):
+        for name in names:
+            if name.startswith(".") and name.endswith(TEMP_MARKER):
+                os.remove(os.path.join(directory, name))
+
+def run_batch(inputs, steps, output_dir, workers=None, max_in_flight=None, output_format=None,
+              suffix="", resume=False, encoder=None, report=print):
+    # encoder: keyword arguments for saver.encoder_options (fast, progressive, compress_level, quality)
+    root = input_root(inputs) if inputs else None
+    jobs = [(path, output_path_for(path, output_dir, output_format, suffix, root)) for path in inputs]
+    check_outputs(jobs) # ValueError
+    for directory in {os.path.dirname(dst) for _, dst in jobs} | {output_dir}:
+        os.makedirs(directory, exist_ok=True)
+    _remove_stale_temp_files(output_dir)
+    skipped = 0
+    if resume:
+        # Writes are atomic, so an existing output is a complete one
+        pending = [(src, dst) for src, dst in jobs if not os.path.exists(dst)]
+        skipped = len(jobs) - len(pending)
+        jobs = pending
+
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or workers * 2 # Bounds queued work, and so memory held in results
+    total, done, failed, pixels = len(jobs), 0, 0, 0
+    if skipped:
+        report(f"Resuming: {skipped} file(s) already done, {total} to go.")
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        queue = iter(jobs)
+        in_flight = {}
+        while True:
+            while len(in_flight) < max_in_flight:
+                job = next(queue, None)
+                if job is None:
+                    break
+                in_flight[pool.submit(_process_file, job[0], job[1], steps, encoder)] = job
+            if not in_flight:
+                break
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                input_path, output_path = in_flight.pop(future)
+                done += 1
+                try:
+                    file_pixels, _ = future.result()
+                    pixels += file_pixels
+                    status = f"-> {output_path}"
+                except Exception as e:
+                    failed += 1
+                    status = f"FAILED: {e}"
+                elapsed = time.perf_counter() - start
+                rate = done / elapsed if elapsed > 0 else 0.0
+                eta = (total - done) / rate if rate > 0 else 0.0
+                report(f"[{done}/{total}] {rate:.2f} files/s, {pixels / 1e6 / max(elapsed, 1e-9):.1f} MP/s, "
+                       f"ETA {eta:.0f}s  {input_path} {status}")
+
+    elapsed = time.perf_counter() - start
+    report(f"Processed {done - failed}/{total} file(s) in {elapsed:.1f}s ({failed} failed, {skipped} skipped).")
+    return failed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply an ImageLogic recipe to many images without the GUI.")
+    parser.add_argument("inputs", nargs="+", help="Input files or glob patterns (quote them; ** is recursive)")
+    parser.add_argument("--recipe", required=True, help="Recipe file, or steps like \"grayscale -> gaussian_blur 5\"")
+    parser.add_argument("--output-dir", required=True)
+    parser.add_argument("--format", dest="output_format", help="Output extension (default: same as input)")
+    parser.add_argument("--suffix", default="", help="Appended to each output file name")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--max-in-flight", type=int, help="Files queued or processing at once (default: 2 x workers)")
+    parser.add_argument("--resume", action="store_true", help="Skip inputs whose output already exists")
+    parser.add_argument("--fast", action="store_true", help="Faster encoding, larger files (PNG/TIFF deflate level 1, WebP method 0)")
+    parser.add_argument("--progressive", action="store_true", help="Write progressive JPEGs")
+    parser.add_argument("--compress-level", type=int, choices=range(10), metavar="0-9", help="PNG/TIFF deflate level")
+    parser.add_argument("--quality", type=int, help="JPEG/WebP quality (default: PIL's)")
+    args = parser.parse_args(argv)
+
+    try:
+        steps = load_recipe(args.recipe)
+    except (OSError, ValueError) as e:
+        print(f"Invalid recipe: {e}", file=sys.stderr)
+        return 2
+    inputs = collect_inputs(args.inputs)
+    if not inputs:
+        print("No input files matched.", file=sys.stderr)
+        return 2
+
+    print(f"Recipe: {' -> '.join(name if value is None else f'{name} {value}' for name, value in steps)}")
+    try:
+        failed = run_batch(inputs, steps, args.output_dir, workers=args.workers, max_in_flight=args.max_in_flight,
+                           output_format=args.output_format, suffix=args.suffix, resume=args.resume,
+                           encoder={"fast": args.fast, "progressive": args.progressive,
+                                    "compress_level": args.compress_level, "quality": args.quality})
+    except ValueError as e:
+        print(f"Invalid outputs: {e}", file=sys.stderr)
+        return 2
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+# bench_morphology.py
+# Erosion by a square of ksize 3-101 (and beyond) with OpenCV's running min and with the
+# van Herk/Gil-Werman engine in morphology.py, per channel count. Both results are checked
+# to be identical; the crossovers are where morphology.VHGW_MIN_KERNEL (per channel count)
+# comes from.
+#
+#   python benchmarks/bench_morphology.py --megapixels 12 --ksizes 3,5,9,15,31,51,75,101,151,201
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from bench_tiling import make_image  # noqa: E402
+from morphology import VHGW_MIN_KERNEL, dilate, erode  # noqa: E402
+
+OPERATIONS = {"erode": erode, "dilate": dilate}
+
+
+def timed(fn, repeat):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time OpenCV against van Herk/Gil-Werman morphology.")
+    parser.add_argument("--megapixels", type=float, default=12)
+    parser.add_argument("--ksizes", default="3,5,9,15,31,51,75,101,125,151,201")
+    parser.add_argument("--channels", default="1,3")
+    parser.add_argument("--operations", default=",".join(OPERATIONS))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'ch':>3} {'operation':<8} {'ksize':>5} {'opencv':>9} {'vhgw':>9} {'faster':>7}")
+    for channels in (int(c) for c in args.channels.split(",")):
+        image = make_image(args.megapixels, channels)
+        if channels == 1:
+            image = np.ascontiguousarray(image[..., 0])
+        for name in args.operations.split(","):
+            fn = OPERATIONS[name]
+            crossover = None
+            for ksize in (int(k) for k in args.ksizes.split(",")):
+                opencv, expected = timed(lambda: fn(image, ksize, engine="opencv"), args.repeat)
+                vhgw, result = timed(lambda: fn(image, ksize, engine="vhgw"), args.repeat)
+                if not np.array_equal(result, expected):
+                    raise AssertionError(f"{name} with ksize {ksize} on {channels} channel(s) differs between engines")
+                if crossover is None and vhgw < opencv:
+                    crossover = ksize
+                print(f"{channels:>3} {name:<8} {ksize:>5} {opencv * 1000:>7.1f}ms {vhgw * 1000:>7.1f}ms "
+                      f"{'vhgw' if vhgw < opencv else 'opencv':>7}")
+            print(f"{channels:>3} {name:<8} van Herk/Gil-Werman faster from ksize {crossover or '-'} "
+                  f"(VHGW_MIN_KERNEL: {VHGW_MIN_KERNEL.get(channels, '-')})")
+        del image
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+# bench_operations.py
+# Headless timing of every registered operation (plus the PIL <-> array conversions at the
+# load/save boundary) across image modes and sizes, with wall time and peak RSS per case.
+# Results can be stored as a baseline and later runs compared against it; regressions make
+# the exit status non-zero, so the script can gate CI.
+#
+#   python benchmarks/bench_operations.py --megapixels 0.3,2,12,50 --save-baseline baseline.json
+#   python benchmarks/bench_operations.py --megapixels 0.3,2 --baseline baseline.json
+#
+# Peak RSS is reset before each case through /proc/self/clear_refs (Linux); elsewhere the
+# process-wide ru_maxrss is reported instead, which only ever grows.
+#
+# Backend tuning (autotune.py) is kept in memory and starts afresh for every case, so the
+# stored profile of the machine neither changes the timings nor gets rewritten. Each case
+# runs once untimed first, which does its tuning; the backends it chose are saved with
+# the results, and a comparison points out cases whose choice differs from the baseline.
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from autotune import BackendTuner  # noqa: E402
+from bench_tiling import make_image  # noqa: E402
+from logic import ImageLogic, array_to_pil, pil_to_array  # noqa: E402
+from operations import registry  # noqa: E402
+
+MODES = ("RGB", "RGBA", "L", "1")
+CONVERSIONS = ("pil_to_array", "array_to_pil")
+# Representative values, as the sliders would send them
+VALUES = {
+    "rotate_left": 90, "rotate_right": -90, "rotate": 30,
+    "resize": 0.5, "gaussian_blur": 9, "median_blur": 5, "canny": (50, 150),
+    "threshold": 127, "erosion": 5, "dilation": 5, "opening": 5, "closing": 5, "gradient": 5,
+    "brightness": 1.2, "contrast": 0.8, "gamma": 1.5, "levels": (10, 240, 0, 255),
+    "chain": [("brightness", 1.2), ("contrast", 0.8), ("gaussian_blur", 5)],
+    "roi": {"operation": "gaussian_blur", "value": 9, "box": [0, 0, 512, 512], "mask": None},
+}
+TIME_TOLERANCE = 0.15     # Slower than baseline by more than this fraction is a regression...
+MIN_TIME_DELTA = 0.002    # ...and by more than this many seconds (timer noise on tiny cases)
+MEMORY_TOLERANCE = 0.10
+MIN_MEMORY_DELTA_MB = 4.0
+
+
+def _read_status(field):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return None
+
+def reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def peak_rss_mb():
+    peak = _read_status("VmHWM")
+    if peak is None: # ru_maxrss is KiB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024.0 * 1024.0 if sys.platform == "darwin" else 1024.0)
+    return peak
+
+
+def make_pil_image(megapixels, mode):
+    array = make_image(megapixels, 4 if mode == "RGBA" else 3)
+    if mode == "RGBA":
+        return Image.fromarray(array, "RGBA")
+    image = Image.fromarray(array, "RGB")
+    return image if mode == "RGB" else image.convert(mode)
+
+
+def measure(fn, repeat):
+    # Best wall time over `repeat` runs, and the peak RSS above the starting RSS while running
+    reset_peak_rss()
+    start_rss = _read_status("VmRSS") or peak_rss_mb()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+        del result
+    return best, max(0.0, peak_rss_mb() - start_rss)
+
+
+def run_suite(megapixels_list, modes, operations, repeat, report=print):
+    logic = ImageLogic(keep_history=False) # No callbacks: headless, no undo history kept
+    results = {}
+    report(f"{'MP':>5} {'mode':<5} {'operation':<16} {'time':>10} {'peak':>9}")
+    for megapixels in megapixels_list:
+        for mode in modes:
+            pil_image = make_pil_image(megapixels, mode)
+            array = pil_to_array(pil_image)
+            cases = {
+                "pil_to_array": lambda: pil_to_array(pil_image),
+                "array_to_pil": lambda: array_to_pil(array),
+            }
+            for name in operations:
+                if name not in CONVERSIONS:
+                    cases[name] = lambda name=name: run_operation(logic, array, name)
+            for name, fn in cases.items():
+                if name not in operations:
+                    continue
+                logic.backends = BackendTuner(path="") # In memory only
+                fn() # Warm-up, and tuning, outside the timed runs
+                backends = {tune_key: entry["backend"] for tune_key, entry in logic.backends.choices().items()}
+                seconds, peak_mb = measure(fn, repeat)
+                key = f"{name}/{mode}/{megapixels:g}"
+                results[key] = {"seconds": seconds, "peak_mb": peak_mb, "backends": backends}
+                report(f"{megapixels:>5g} {mode:<5} {name:<16} {seconds * 1000:>8.1f}ms {peak_mb:>7.1f}MB")
+            del pil_image, array, cases
+    return results
+
+
+def run_operation(logic, array, name):
+    # The headless apply path: dispatch, compute, commit (freeze + recipe log)
+    logic.current_image = array
+    logic.run_operation(name, VALUES.get(name))
+    return logic.current_image
+
+
+def compare(results, baseline, report=print):
+    regressions = []
+    for key, current in sorted(results.items()):
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        if "backends" in previous and current["backends"] != previous["backends"]:
+            report(f"NOTE {key}: backends {previous['backends']} -> {current['backends']}")
+        slower = current["seconds"] - previous["seconds"]
+        if slower > MIN_TIME_DELTA and current["seconds"] > previous["seconds"] * (1 + TIME_TOLERANCE):
+            regressions.append(f"{key}: {previous['seconds'] * 1000:.1f}ms -> {current['seconds'] * 1000:.1f}ms")
+        grown = current["peak_mb"] - previous["peak_mb"]
+        if grown > MIN_MEMORY_DELTA_MB and current["peak_mb"] > previous["peak_mb"] * (1 + MEMORY_TOLERANCE):
+            regressions.append(f"{key}: peak {previous['peak_mb']:.0f}MB -> {current['peak_mb']:.0f}MB")
+    missing = sorted(set(baseline) - set(results))
+    report(f"Compared {len(set(results) & set(baseline))} case(s) against the baseline, "
+           f"{len(missing)} baseline case(s) not run.")
+    for line in regressions:
+        report(f"REGRESSION {line}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time every ImageLogic operation across modes and sizes.")
+    parser.add_argument("--megapixels", default="0.3,2,12,50")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--operations", default=",".join(CONVERSIONS + tuple(op.name for op in registry)))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", help="Compare against this results file; exit 1 on regressions")
+    parser.add_argument("--save-baseline", help="Write the results to this file")
+    args = parser.parse_args(argv)
+
+    operations = args.operations.split(",")
+    unknown = [name for name in operations if name not in CONVERSIONS and name not in registry]
+    if unknown:
+        parser.error(f"Unknown operation(s): {', '.join(unknown)}")
+    if not reset_peak_rss():
+        print("Peak RSS cannot be reset on this platform; peak figures are process-wide.")
+
+    results = run_suite([float(mp) for mp in args.megapixels.split(",")], args.modes.split(","), operations, args.repeat)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Baseline with {len(results)} case(s) written to '{args.save_baseline}'.")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        return 1 if compare(results, baseline) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+# bench_startup.py
+# Start-up cost of the editor. Each module the window or the image engine imports is timed
+# in a fresh interpreter (nothing cached in sys.modules), and, when PyQt5 can run here, the
+# editor itself is started offscreen with IMAGE_EDITOR_STARTUP_PROBE set, which makes it
+# print the time to its first paint and to the engine being ready, then quit.
+# time-to-first-paint should track the window modules (PyQt5, gui) only; the engine modules
+# load afterwards in main.py's warm-up thread.
+#
+#   python benchmarks/bench_startup.py --save-baseline startup.json
+#   python benchmarks/bench_startup.py --baseline startup.json
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+# Window first, then the engine (logic pulls in numpy, cv2 and PIL itself)
+MODULES = ("PyQt5.QtWidgets", "gui", "numpy", "PIL.Image", "cv2", "logic", "main")
+PROBE_ENV = "IMAGE_EDITOR_STARTUP_PROBE"
+PROBE_TIMEOUT = 60.0
+TIME_TOLERANCE = 0.20    # Slower than baseline by more than this fraction is a regression...
+MIN_TIME_DELTA_MS = 15.0 # ...and by more than this many milliseconds (interpreter noise)
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import {module}; print((time.perf_counter() - t) * 1000.0)"
+
+
+def import_ms(module):
+    # Milliseconds to import `module` in a fresh interpreter; None if it cannot be imported
+    result = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET.format(module=module)], cwd=ROOT,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def probe_editor():
+    # {"first_paint": ms, "engine_ready": ms} from one offscreen start of main.py; None if
+    # the editor could not start here
+    env = dict(os.environ, **{PROBE_ENV: "1"})
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        result = subprocess.run([sys.executable, "main.py"], cwd=ROOT, env=env, capture_output=True, text=True,
+                                timeout=PROBE_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        return None
+    times = {}
+    for line in result.stdout.splitlines():
+        name, _, value = line.partition("_ms=")
+        if value:
+            times[name] = float(value)
+    return times or None
+
+
+def run_suite(modules, repeat, report=print):
+    results = {}
+    report(f"{'case':<24} {'median':>10} {'min':>10}")
+    for module in modules:
+        samples = [import_ms(module) for _ in range(repeat)]
+        if None in samples:
+            report(f"{'import ' + module:<24} {'not installed':>21}")
+            continue
+        results[f"import/{module}"] = statistics.median(samples)
+        report(f"{'import ' + module:<24} {statistics.median(samples):>8.1f}ms {min(samples):>8.1f}ms")
+    probes = [probe_editor() for _ in range(repeat)]
+    if None in probes:
+        report(f"{'editor':<24} {'cannot start here':>21}")
+        return results
+    for name in probes[0]:
+        samples = [probe[name] for probe in probes if name in probe]
+        results[f"editor/{name}"] = statistics.median(samples)
+        report(f"{name:<24} {statistics.median(samples):>8.1f}ms {min(samples):>8.1f}ms")
+    return results
+
+
+def compare(results, baseline, report=print):
+    regressions = []
+    for key, current in sorted(results.items()):
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        if current - previous > MIN_TIME_DELTA_MS and current > previous * (1 + TIME_TOLERANCE):
+            regressions.append(f"{key}: {previous:.1f}ms -> {current:.1f}ms")
+    report(f"Compared {len(set(results) & set(baseline))} case(s) against the baseline.")
+    for line in regressions:
+        report(f"REGRESSION {line}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time module imports and the editor's time to first paint.")
+    parser.add_argument("--modules", default=",".join(MODULES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", help="Compare against this results file; exit 1 on regressions")
+    parser.add_argument("--save-baseline", help="Write the results to this file")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.modules.split(","), args.repeat)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Baseline with {len(results)} case(s) written to '{args.save_baseline}'.")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        return 1 if compare(results, baseline) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
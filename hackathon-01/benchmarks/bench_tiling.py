@@ -0,0 +1,82 @@
+# bench_tiling.py
+# Scaling of the tiled filter executor: each filter is run untiled and then tiled with
+# 1..N worker threads on 10-100 MP images. Tiled output is checked to be identical.
+#
+#   python benchmarks/bench_tiling.py --megapixels 10,25,50,100 --workers 1,2,4
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from operations import sobel  # noqa: E402
+from tiling import TileExecutor, available_cores, gaussian_halo  # noqa: E402
+
+KSIZE = 9
+_KERNEL = np.ones((KSIZE, KSIZE), np.uint8)
+FILTERS = {
+    "gaussian_blur": (lambda tile: cv2.GaussianBlur(tile, (0, 0), sigmaX=KSIZE // 2), gaussian_halo(KSIZE // 2)),
+    "median_blur": (lambda tile: cv2.medianBlur(tile, KSIZE), KSIZE // 2),
+    "erosion": (lambda tile: cv2.erode(tile, _KERNEL), KSIZE // 2),
+    "dilation": (lambda tile: cv2.dilate(tile, _KERNEL), KSIZE // 2),
+    "sobel": (sobel, 1),
+}
+
+
+def make_image(megapixels, channels, seed=0):
+    side = int((megapixels * 1e6) ** 0.5)
+    rng = np.random.default_rng(seed)
+    # Noise on a gradient, built in row blocks to keep peak memory near the image size
+    image = np.empty((side, side, channels), dtype=np.uint8)
+    ramp = np.linspace(0, 255, side, dtype=np.float32)
+    for top in range(0, side, 1024):
+        rows = slice(top, min(top + 1024, side))
+        base = ramp[None, :] * 0.5 + ramp[rows, None] * 0.5
+        noise = rng.normal(0, 25, (base.shape[0], side, channels)).astype(np.float32)
+        image[rows] = np.clip(base[..., None] + noise, 0, 255)
+    return image
+
+
+def timed(fn, repeat):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time filters untiled and tiled across worker counts and image sizes.")
+    parser.add_argument("--megapixels", default="10,25,50,100")
+    parser.add_argument("--workers", default=",".join(str(n) for n in sorted({1, 2, 4, available_cores()})),
+                        help="Worker counts; TileExecutor caps them at the available cores")
+    parser.add_argument("--filters", default=",".join(FILTERS))
+    parser.add_argument("--channels", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=2)
+    args = parser.parse_args()
+    worker_counts = sorted({min(int(n), available_cores()) for n in args.workers.split(",")})
+
+    print(f"{'MP':>5} {'filter':<14} {'untiled':>9} " + " ".join(f"{f'{n} thr':>14}" for n in worker_counts))
+    for megapixels in (float(mp) for mp in args.megapixels.split(",")):
+        image = make_image(megapixels, args.channels)
+        for name in args.filters.split(","):
+            fn, halo = FILTERS[name]
+            baseline, expected = timed(lambda: fn(image), args.repeat)
+            cells = []
+            for workers in worker_counts:
+                executor = TileExecutor(max_workers=workers, min_pixels=0)
+                elapsed, result = timed(lambda: executor.run(fn, image, halo), args.repeat)
+                executor.shutdown()
+                if not np.array_equal(result, expected):
+                    raise AssertionError(f"{name} at {megapixels} MP with {workers} workers differs from the untiled result")
+                cells.append(f"{elapsed * 1000:>7.0f}ms {baseline / elapsed:>4.1f}x")
+            print(f"{megapixels:>5.0f} {name:<14} {baseline * 1000:>7.0f}ms " + " ".join(f"{cell:>14}" for cell in cells))
+        del image
+
+
+if __name__ == "__main__":
+    main()
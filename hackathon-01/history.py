@@ -0,0 +1,168 @@
+# history.py
+import zlib
+import numpy as np
+
+TILE_SIZE = 256
+CHECKPOINT_INTERVAL = 8          # Every Nth entry keeps a full (compressed) snapshot to replay from
+REPLAY_ENTRY_BYTES = 64          # Bookkeeping cost charged for an entry that only stores the operation
+COMPRESS_LEVEL = 1               # zlib level: favour speed, image diffs still shrink a lot
+
+# Operations that can be undone exactly by applying another operation to the current image
+INVERSE_OPERATIONS = {
+    "rotate_left": "rotate_right",
+    "rotate_right": "rotate_left",
+    "flip_horizontal": "flip_horizontal",
+    "flip_vertical": "flip_vertical",
+}
+
+
+class _HistoryEntry:
+    # kind is one of:
+    #   "inverse"    - no payload, undo by applying INVERSE_OPERATIONS[operation]
+    #   "tiles"      - payload is a list of (box, compressed bytes) for tiles that changed
+    #   "checkpoint" - payload is (shape, compressed bytes) of the full previous image
+    #   "replay"     - payload dropped to save memory, previous image is rebuilt by replaying
+    #                  operations forward from the nearest checkpoint
+    __slots__ = ("operation", "value", "kind", "payload", "nbytes")
+
+    def __init__(self, operation, value, kind, payload, nbytes):
+        self.operation = operation
+        self.value = value
+        self.kind = kind
+        self.payload = payload
+        self.nbytes = nbytes
+
+
+class HistoryEngine:
+    def __init__(self, replay_fn, budget_bytes=256 * 1024 * 1024):
+        # replay_fn(image, operation_name, value) -> new image; must be deterministic.
+        # Images are uint8 NumPy arrays that are never modified in place.
+        self._replay_fn = replay_fn
+        self.budget_bytes = budget_bytes
+        self._base = None
+        self._base_is_loaded = False # The base came from a callable (the file) and is not ours to store
+        self._entries = []
+        self.total_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __bool__(self):
+        return bool(self._entries)
+
+    def reset(self, base_image=None):
+        # base_image is the state undo can return to once every entry is popped (the loaded image).
+        # It may also be a zero-argument callable returning it, so a lazily decoded image is
+        # only read if undo actually has to replay from the base.
+        self._base = base_image
+        self._base_is_loaded = callable(base_image)
+        self._entries = []
+        self.total_bytes = 0
+
+    def export_state(self):
+        # Everything needed to rebuild this history later (e.g. after spilling a document to
+        # disk). A base that came from a callable is left out; pass it again to import_state.
+        base = None if self._base_is_loaded else self._base
+        return {"base": base, "entries": self._entries, "total_bytes": self.total_bytes}
+
+    def import_state(self, state, base_image=None):
+        self.reset(state["base"] if state["base"] is not None else base_image)
+        self._entries = list(state["entries"])
+        self.total_bytes = state["total_bytes"]
+
+    def push(self, previous_image, new_image, operation_name, value, region=None):
+        # region (left, top, right, bottom), if given, bounds the pixels the operation could
+        # change: only tiles inside it are compared and stored, and no full checkpoint is taken
+        if operation_name in INVERSE_OPERATIONS:
+            entry = _HistoryEntry(operation_name, value, "inverse", None, REPLAY_ENTRY_BYTES)
+        elif previous_image.shape != new_image.shape or (
+                region is None and (len(self._entries) + 1) % CHECKPOINT_INTERVAL == 0):
+            data = zlib.compress(previous_image, COMPRESS_LEVEL)
+            entry = _HistoryEntry(operation_name, value, "checkpoint", (previous_image.shape, data), len(data))
+        else:
+            tiles = self._diff_tiles(previous_image, new_image, region)
+            entry = _HistoryEntry(operation_name, value, "tiles", tiles,
+                                  REPLAY_ENTRY_BYTES + sum(len(data) for _, data in tiles))
+
+        self._entries.append(entry)
+        self.total_bytes += entry.nbytes
+        self._enforce_budget()
+
+    def pop(self, current_image):
+        # Removes the newest entry and returns the image as it was before that operation
+        if not self._entries:
+            return None
+        entry = self._entries.pop()
+        self.total_bytes -= entry.nbytes
+
+        if entry.kind == "inverse":
+            return self._replay_fn(current_image, INVERSE_OPERATIONS[entry.operation], entry.value)
+        if entry.kind == "tiles":
+            restored = current_image.copy()
+            for (left, top, right, bottom), data in entry.payload:
+                tile = restored[top:bottom, left:right]
+                tile[...] = np.frombuffer(zlib.decompress(data), dtype=np.uint8).reshape(tile.shape)
+            return restored
+        if entry.kind == "checkpoint":
+            return self._decompress_checkpoint(entry.payload)
+        return self._reconstruct(len(self._entries))
+
+    def _diff_tiles(self, previous_image, new_image, region=None):
+        tiles = []
+        height, width = previous_image.shape[:2]
+        left0, top0, right0, bottom0 = region if region is not None else (0, 0, width, height)
+        left0, top0 = max(left0, 0), max(top0, 0)
+        # Tiles stay on the TILE_SIZE grid, so a region only selects which of them are visited
+        for top in range(top0 // TILE_SIZE * TILE_SIZE, min(bottom0, height), TILE_SIZE):
+            for left in range(left0 // TILE_SIZE * TILE_SIZE, min(right0, width), TILE_SIZE):
+                bottom, right = min(top + TILE_SIZE, height), min(left + TILE_SIZE, width)
+                old_tile = previous_image[top:bottom, left:right]
+                if not np.array_equal(old_tile, new_image[top:bottom, left:right]):
+                    tiles.append(((left, top, right, bottom), zlib.compress(old_tile.tobytes(), COMPRESS_LEVEL)))
+        return tiles
+
+    def _decompress_checkpoint(self, payload):
+        shape, data = payload
+        return np.frombuffer(zlib.decompress(data), dtype=np.uint8).reshape(shape)
+
+    def _base_image(self):
+        if callable(self._base):
+            self._base = self._base()
+        return self._base
+
+    def _reconstruct(self, state_index):
+        # Rebuilds the image after the first state_index entries, starting from the closest
+        # checkpoint at or before that point and replaying the recorded operations forward
+        start = 0
+        image = self._base_image()
+        for i in range(state_index, -1, -1):
+            if i < len(self._entries) and self._entries[i].kind == "checkpoint":
+                start = i
+                image = self._decompress_checkpoint(self._entries[i].payload)
+                break
+        for entry in self._entries[start:state_index]:
+            image = self._replay_fn(image, entry.operation, entry.value)
+        return image
+
+    def _demote(self, entry):
+        self.total_bytes -= entry.nbytes - REPLAY_ENTRY_BYTES
+        entry.kind, entry.payload, entry.nbytes = "replay", None, REPLAY_ENTRY_BYTES
+
+    def _enforce_budget(self):
+        # Tile diffs go first, then checkpoints (oldest first, newest entry is kept intact
+        # so a single undo stays cheap); only after that are whole entries dropped.
+        for kind in ("tiles", "checkpoint"):
+            for entry in self._entries[:-1]:
+                if self.total_bytes <= self.budget_bytes:
+                    return
+                if entry.kind == kind:
+                    self._demote(entry)
+        while self.total_bytes > self.budget_bytes and len(self._entries) > 1:
+            oldest = self._entries.pop(0)
+            self.total_bytes -= oldest.nbytes
+            # The state after the dropped entry becomes the new base
+            if self._entries[0].kind == "checkpoint":
+                self._base = self._decompress_checkpoint(self._entries[0].payload)
+            else:
+                self._base = self._replay_fn(self._base_image(), oldest.operation, oldest.value)
+            self._base_is_loaded = False
@@ -0,0 +1,129 @@
+# loader.py
+import threading
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from tracing import tracer
+
+PREVIEW_MAX_SIDE = 2048   # Proxy size for display; larger than any panel the editor shows
+
+_CHANNELS = {"L": 1, "RGB": 3, "RGBA": 4}
+
+
+def normalize_mode(pil_image):
+    # The editor works on L, RGB or RGBA
+    if pil_image.mode == '1' or pil_image.mode.startswith('I') or pil_image.mode == 'F':
+        return pil_image.convert('L')
+    if pil_image.mode not in _CHANNELS:
+        return pil_image.convert('RGBA' if 'A' in pil_image.mode else 'RGB')
+    return pil_image
+
+
+def _raw_layout(pil_image):
+    # (offset, shape) when the file stores the pixels uncompressed, top-down, unpadded and in
+    # the working channel order, so the file itself can back the array. Covers PPM/PGM and
+    # uncompressed TIFF (including multi-strip ones whose strips are stored back to back).
+    channels = _CHANNELS.get(pil_image.mode)
+    if channels is None or not pil_image.tile:
+        return None
+    width, height = pil_image.size
+    stride = width * channels
+    first_offset, next_row = None, 0
+    for codec_name, extents, offset, args in pil_image.tile:
+        rawmode, row_stride, orientation = (args, 0, 1) if isinstance(args, str) else (tuple(args) + (0, 1))[:3]
+        if codec_name != "raw" or rawmode != pil_image.mode or row_stride not in (0, stride) or orientation != 1:
+            return None
+        x0, y0, x1, y1 = extents
+        if x0 != 0 or x1 != width or y0 != next_row:
+            return None
+        if first_offset is None:
+            first_offset = offset
+        elif offset != first_offset + y0 * stride:
+            return None
+        next_row = y1
+    if next_row != height:
+        return None
+    return first_offset, ((height, width) if channels == 1 else (height, width, channels))
+
+
+def _resize_frozen(array, size):
+    if (array.shape[1], array.shape[0]) != size:
+        array = cv2.resize(array, size, interpolation=cv2.INTER_AREA)
+    array.flags.writeable = False
+    return array
+
+
+class ImageSource:
+    # A file opened for editing. Opening only reads the header; pixels are produced on demand:
+    #   preview()      - a small proxy for display (JPEG uses reduced DCT decoding via draft)
+    #   load()         - the full working array, decoded once (thread-safe, so it can be
+    #                    warmed up in the background). Uncompressed files are memory-mapped
+    #                    instead of decoded, so only the pages actually touched are read.
+    def __init__(self, filepath):
+        self.filepath = filepath
+        with Image.open(filepath) as img:
+            self.size = img.size
+            self.format = img.format
+            self.mode = img.mode
+            self._layout = _raw_layout(img)
+        self._array = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_mapped(self):
+        return self._layout is not None
+
+    @property
+    def is_loaded(self):
+        return self._array is not None
+
+    @property
+    def nbytes(self):
+        # Memory held by the decoded pixels; a mapped file is paged in by the OS and counts 0
+        array = self._array
+        return 0 if array is None or self.is_mapped else array.nbytes
+
+    def load(self):
+        with self._lock:
+            if self._array is None:
+                self._array = self._map() if self._layout else self._decode()
+            return self._array
+
+    def release(self):
+        # Drops the decoded (or mapped) pixels; the next load() reads the file again
+        with self._lock:
+            self._array = None
+
+    def _map(self):
+        offset, shape = self._layout
+        array = np.memmap(self.filepath, dtype=np.uint8, mode='r', offset=offset, shape=shape)
+        return array.view(np.ndarray) # Plain read-only ndarray still backed by the mapping
+
+    def _decode(self):
+        with tracer.span("decode", "conversion") as span, Image.open(self.filepath) as img:
+            array = np.asarray(normalize_mode(img))
+            span.copied(array.nbytes)
+        array.flags.writeable = False
+        return array
+
+    def preview(self, max_side=PREVIEW_MAX_SIDE):
+        width, height = self.size
+        scale = min(1.0, max_side / max(width, height))
+        target = (max(1, int(width * scale)), max(1, int(height * scale)))
+        if self._array is not None or self.is_mapped or self.format != "JPEG" or scale > 0.5:
+            # Only JPEG can decode at reduced size, and only for at least a 2x reduction. Anything
+            # else is decoded in full once, and the proxy and the working image share that decode.
+            array = self.load()
+            if scale >= 1.0:
+                return array
+            # Sample every step-th row/column first, so a mapped file only pages in those rows
+            step = max(1, int(1 / scale) // 2)
+            array = np.ascontiguousarray(array[::step, ::step])
+        else:
+            with Image.open(self.filepath) as img:
+                img.draft(img.mode, target) # JPEG: decodes at 1/2, 1/4 or 1/8 scale, never below target
+                array = np.asarray(normalize_mode(img))
+        return _resize_frozen(array, target)
+
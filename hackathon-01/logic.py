@@ -1,238 +1,450 @@
 # logic.py
-import cv2
+import os
+import threading
+
 import numpy as np
-from PIL import Image, ImageEnhance, ImageOps, ImageFilter # Removed ImageTk as it's GUI specific
+from PIL import Image # Removed ImageTk as it's GUI specific
+from history import HistoryEngine
+from pipeline import Pipeline
+from operations import Operation, OperationError, register, registry
+from tiling import TileExecutor
+from autotune import BackendTuner
+from loader import ImageSource, normalize_mode
+from saver import BackgroundSaver, encoder_options, format_for_path
+from roi import Selection # Also registers the "roi" operation
+from session import Document, DocumentCache
+from tracing import tracer
+
+# --- Boundary conversions ---
+# Inside ImageLogic the working image is a C-contiguous uint8 NumPy array in PIL channel
+# order: 2-D for grayscale, H x W x 3 for RGB, H x W x 4 for RGBA. Arrays are never modified
+# in place, so they can be shared freely (original/current, history, pipeline cache).
+# PIL is only used to decode and encode files (see loader.py).
+def pil_to_array(pil_image):
+    with tracer.span("pil_to_array", "conversion") as span:
+        array = _freeze(np.asarray(normalize_mode(pil_image)))
+        span.copied(array.nbytes)
+        return array
+
+def array_to_pil(array):
+    with tracer.span("array_to_pil", "conversion") as span:
+        span.copied(array.nbytes)
+        return Image.fromarray(array)
+
+def _freeze(array):
+    if not array.flags.c_contiguous:
+        tracer.copied(array.nbytes)
+    array = np.ascontiguousarray(array)
+    array.flags.writeable = False
+    return array
+
+def _no_gui_callback(*args):
+    pass
 
 class ImageLogic:
-    def __init__(self, gui_update_callback, gui_history_callback, gui_status_callback, gui_reset_sliders_callback):
-        self.original_pil_image = None
-        self.current_pil_image = None
-        # self.preview_pil_image = None # Not strictly needed if previews always generate from current_pil_image
-        self.history = []
-        self.max_history_size = 10
-
-        self.update_gui_image = gui_update_callback
-        self.update_gui_history_buttons = gui_history_callback
-        self.update_gui_status = gui_status_callback
-        self.reset_gui_sliders = gui_reset_sliders_callback
-
-    def _add_to_history(self, image_to_add):
-        if self.current_pil_image: # Only add if there's a valid current image
-            if len(self.history) >= self.max_history_size:
-                self.history.pop(0)
-            self.history.append(image_to_add.copy()) # Store a copy
-        self.update_gui_history_buttons(bool(self.history), bool(self.original_pil_image))
+    # The GUI callbacks are optional, so the same logic runs headless (batch.py)
+    def __init__(self, gui_update_callback=None, gui_history_callback=None, gui_status_callback=None,
+                 gui_reset_sliders_callback=None, keep_history=True):
+        # The loaded file; original_image is decoded (or memory-mapped) from it on first access
+        self.document = None
+        self.filepath = None
+        self.source = None
+        self.preview = None
+        self._original_image = None
+        self._current_image = None
+        # While set, operations only change this part of the image (see roi.py)
+        self.selection = None
+        # Undo history stores operations and compressed diffs instead of full image copies
+        self.history = HistoryEngine(self._replay_operation)
+        # Recipe of the operations applied since load/revert; results live in history, so no node cache
+        self.pipeline = Pipeline(self._replay_operation, cache_budget_bytes=0)
+        # Pending slider adjustments over the current image, cached per node while previewing
+        self.adjustments = Pipeline(self._replay_operation)
+        # Previously opened files with their edits, so switching back is instant (see session.py)
+        self.documents = DocumentCache()
+        # Neighbourhood filters on large images run as overlapping strips across all cores
+        self.tiles = TileExecutor()
+        # Operations with several implementations use the one measured fastest on this machine
+        self.backends = BackendTuner()
+        registry.load_plugins() # Third-party operations named in IMAGE_EDITOR_PLUGINS
+        # Saves encode in the background; status callbacks then arrive from its worker threads
+        self.saver = BackgroundSaver()
+
+        self.keep_history = keep_history
+        # Headless callers (batch.py) skip the preview and background decode and use the image directly
+        self.prefetch = gui_update_callback is not None
+
+        self.update_gui_image = gui_update_callback or _no_gui_callback
+        self.update_gui_history_buttons = gui_history_callback or _no_gui_callback
+        self.update_gui_status = gui_status_callback or _no_gui_callback
+        self.reset_gui_sliders = gui_reset_sliders_callback or _no_gui_callback
+
+    @property
+    def original_image(self):
+        if self._original_image is None and self.source is not None:
+            self._original_image = _freeze(self.source.load())
+        return self._original_image
 
+    @property
+    def current_image(self):
+        # Until the first edit the current image is the original, so it stays undecoded too
+        if self._current_image is None:
+            return self.original_image
+        return self._current_image
+
+    @current_image.setter
+    def current_image(self, image):
+        self._current_image = image
+        self.adjustments.reset() # Its cached results were computed from the previous image
+
+    def has_image(self):
+        # Cheap check that never forces a decode
+        return self.source is not None or self._current_image is not None
+
+    def _prefetch(self):
+        # Decodes the full image in the background while the preview is on screen
+        try:
+            self.source.load()
+        except Exception:
+            pass # Reported when the image is first used
+
+    def _load_preview(self):
+        # Spilled documents drop their preview; it is made again from the file
+        if self.preview is None:
+            self.preview = self.source.preview()
+        return self.preview
+
+    def refresh_display(self):
+        # Shows the open document on both panels without forcing a decode: until then the
+        # preview proxy stands in for the original, and for the current image before any edit
+        original = self._original_image if self._original_image is not None else self._load_preview()
+        self.update_gui_image(original, "original")
+        self.update_gui_image(self._current_image if self._current_image is not None else original, "processed")
+
+    def image_size(self):
+        # (width, height) without forcing a decode
+        if self._current_image is not None:
+            return self._current_image.shape[1], self._current_image.shape[0]
+        return self.source.size if self.source is not None else None
+
+    def set_selection(self, box=None, mask=None):
+        # box is (left, top, right, bottom); mask alone is a full-image boolean mask, with a
+        # box it covers just the box. Neither clears the selection.
+        if box is None and mask is None:
+            self.selection = None
+        elif box is None:
+            self.selection = Selection.from_mask(mask)
+        else:
+            self.selection = Selection(box, mask)
+        return self.selection
+
+    def clear_selection(self):
+        self.selection = None
+
+    def _scoped(self, operation_name, value):
+        # With a selection, the operation runs through "roi" so history and recipes record it
+        if self.selection is None or operation_name == "roi":
+            return operation_name, value
+        return "roi", self.selection.wrap(operation_name, value)
+
+    def _add_to_history(self, previous_image, new_image, operation_name, value):
+        if previous_image is not None and self.keep_history: # Only add if there's a valid current image
+            region = value["box"] if operation_name == "roi" else None
+            with tracer.span("history_push", "history"):
+                self.history.push(previous_image, new_image, operation_name, value, region=region)
+        self.update_gui_history_buttons(bool(self.history), self.has_image())
+
+    def _replay_operation(self, image, operation_name, value):
+        return self._compute_operation(image, operation_name, value)[0]
+
+
+    def _document(self):
+        # The open image and its edits, to be kept in the session while another file is open
+        document = self.document
+        document.original_image, document.current_image = self._original_image, self._current_image
+        document.preview, document.selection = self.preview, self.selection
+        return document
+
+    def _activate(self, document):
+        self.document = document
+        self.filepath = document.filepath
+        self.source = document.source
+        self.preview = document.preview
+        self._original_image = document.original_image
+        self._current_image = document.current_image
+        self.history = document.history
+        self.pipeline = document.pipeline
+        self.selection = document.selection
+        self.adjustments.reset()
+
+    def recent_documents(self):
+        # Paths of the other documents in the session, most recently used first
+        return self.documents.paths()
 
     def load_image(self, filepath):
+        with tracer.span("load_image", "load"):
+            return self._load_image(filepath)
+
+    def _load_image(self, filepath):
+        filepath = os.path.abspath(filepath)
+        name = os.path.basename(filepath)
+        if self.source is not None and self.keep_history: # Headless runs (batch.py) don't switch back
+            self.documents.put(self._document())
         try:
-            img = Image.open(filepath)
-            if img.mode not in ['RGB', 'RGBA']:
-                img = img.convert('RGBA') if 'A' in img.mode else img.convert('RGB')
-
-            self.original_pil_image = img.copy()
-            self.current_pil_image = img.copy()
-            self.history = []
-            self.update_gui_image(self.original_pil_image, "original")
-            self.update_gui_image(self.current_pil_image, "processed")
+            document = self.documents.take(filepath)
+            if document is not None and document.is_stale():
+                document = None # Changed on disk since it was opened: its edits no longer apply
+            if document is not None:
+                self._activate(document)
+                if self.prefetch:
+                    self.refresh_display()
+                self.update_gui_history_buttons(bool(self.history), True)
+                self.update_gui_status(f"Switched to '{name}'.")
+                self.reset_gui_sliders()
+                return True
+
+            # Only the header is read here; the panels get a reduced preview, and the full
+            # image is decoded (or memory-mapped) when an operation first needs it
+            source = ImageSource(filepath)
+            preview = source.preview() if self.prefetch else None
+
+            # Each document has its own history and recipe, based on its own file
+            self._activate(Document(filepath, source, None, None, preview,
+                                    HistoryEngine(self._replay_operation, self.history.budget_bytes),
+                                    Pipeline(self._replay_operation, cache_budget_bytes=0), None))
+            self.history.reset(source.load)
+            self.pipeline.reset(source.load)
+            if preview is not None:
+                self.update_gui_image(preview, "original")
+                self.update_gui_image(preview, "processed")
+                threading.Thread(target=self._prefetch, daemon=True).start()
             self.update_gui_history_buttons(False, True)
-            self.update_gui_status(f"Image '{filepath.split('/')[-1]}' loaded.")
+            self.update_gui_status(f"Image '{name}' loaded.")
             self.reset_gui_sliders()
             return True
         except Exception as e:
             self.update_gui_status(f"Error loading image: {e}")
-            self.original_pil_image = None
-            self.current_pil_image = None
+            self.document = None
+            self.filepath = None
+            self.source = None
+            self.preview = None
+            self._original_image = None
+            self._current_image = None
+            self.selection = None
+            self.adjustments.reset()
+            self.history = HistoryEngine(self._replay_operation, self.history.budget_bytes)
+            self.pipeline = Pipeline(self._replay_operation, cache_budget_bytes=0)
             self.update_gui_image(None, "original")
             self.update_gui_image(None, "processed")
             self.update_gui_history_buttons(False, False)
             return False
 
     def get_current_processed_pil_image(self):
-        return self.current_pil_image
-
-    def save_image(self, filepath):
-        if self.current_pil_image:
-            try:
-                img_to_save = self.current_pil_image
-                if (filepath.lower().endswith(".jpg") or filepath.lower().endswith(".jpeg")) and img_to_save.mode == 'RGBA':
-                    img_to_save = img_to_save.convert('RGB')
-                img_to_save.save(filepath)
-                self.update_gui_status(f"Image saved to '{filepath}'.")
-            except Exception as e:
-                self.update_gui_status(f"Error saving image: {e}")
-        else:
+        return array_to_pil(self.current_image) if self.has_image() else None
+
+    def save_image(self, filepath, options=None, scale=None):
+        # Encoding runs on a worker thread against the current array (immutable, so it is
+        # the snapshot); returns the Future, or None if there was nothing to save
+        if not self.has_image():
             self.update_gui_status("No processed image to save.")
+            return None
+        name = os.path.basename(filepath)
+        try:
+            if options is None:
+                options = encoder_options(format_for_path(filepath))
+            future = self.saver.submit(self.current_image, filepath, options, scale, progress=self._report_save_progress)
+        except Exception as e:
+            self.update_gui_status(f"Error saving image: {e}")
+            return None
+        future.add_done_callback(lambda f: self._report_save_done(f, filepath))
+        self.update_gui_status(f"Saving '{name}'...")
+        return future
+
+    def export_images(self, targets):
+        # Several exports (path, options, scale) of the current state, encoded in parallel
+        return [self.save_image(path, options, scale) for path, options, scale in targets]
+
+    def _report_save_progress(self, filepath, bytes_written):
+        self.update_gui_status(f"Saving '{os.path.basename(filepath)}': {bytes_written / 1e6:.1f} MB written...")
+
+    def _report_save_done(self, future, filepath):
+        error = future.exception()
+        if error is not None:
+            self.update_gui_status(f"Error saving image: {error}")
+        else:
+            self.update_gui_status(f"Image saved to '{filepath}' ({future.result() / 1e6:.1f} MB).")
+
+    def save_recipe(self, filepath):
+        if not self.pipeline.nodes:
+            self.update_gui_status("No operations to save as a recipe.")
+            return
+        try:
+            self.pipeline.save(filepath)
+            self.update_gui_status(f"Recipe with {len(self.pipeline)} step(s) saved to '{filepath}'.")
+        except Exception as e:
+            self.update_gui_status(f"Error saving recipe: {e}")
+
+    def load_recipe(self, filepath):
+        # Replays a saved recipe on the current image as a single undoable step
+        try:
+            steps = Pipeline.load_steps(filepath)
+        except Exception as e:
+            self.update_gui_status(f"Error loading recipe: {e}")
+            return
+        if steps:
+            self.apply_operation("chain", steps)
 
     def undo_last_change(self):
         if self.history:
-            self.current_pil_image = self.history.pop()
-            self.update_gui_image(self.current_pil_image, "processed")
-            self.update_gui_history_buttons(bool(self.history), bool(self.original_pil_image))
+            with tracer.span("history_pop", "history"):
+                self.current_image = _freeze(self.history.pop(self.current_image))
+            self.pipeline.pop()
+            self.update_gui_image(self.current_image, "processed")
+            self.update_gui_history_buttons(bool(self.history), self.has_image())
             self.update_gui_status("Last change undone.")
             self.reset_gui_sliders()
         else:
             self.update_gui_status("No more changes to undo.")
 
     def revert_all_changes(self):
-        if self.original_pil_image:
-            self.current_pil_image = self.original_pil_image.copy()
-            self.history = []
-            self.update_gui_image(self.current_pil_image, "processed")
+        if self.has_image():
+            self._current_image = None
+            self.adjustments.reset()
+            self.history.reset(self.source.load)
+            self.pipeline.reset(self.source.load)
+            # Still undecoded if no edit was ever applied: show the preview again
+            self.update_gui_image(self._original_image if self._original_image is not None else self._load_preview(), "processed")
             self.update_gui_history_buttons(False, True)
             self.update_gui_status("All changes reverted.")
             self.reset_gui_sliders()
         else:
             self.update_gui_status("No image loaded.")
 
-    def _apply_and_update(self, new_pil_image, operation_description, is_preview):
+    def _apply_and_update(self, new_image, operation_name, value, operation_description, is_preview):
         if is_preview:
             # For previews, just update the GUI display
-            self.update_gui_image(new_pil_image, "processed")
+            self.update_gui_image(new_image, "processed")
             # Optionally, update status for preview, or let main.py handle that
             # self.update_gui_status(f"Preview: {operation_description}")
         else: # Definitive operation
-            self._add_to_history(self.current_pil_image) # Add *current state before change* to history
-            self.current_pil_image = new_pil_image     # Update current state
-            self.update_gui_image(self.current_pil_image, "processed")
-            self.update_gui_history_buttons(bool(self.history), bool(self.original_pil_image))
+            new_image = _freeze(new_image)
+            self._add_to_history(self.current_image, new_image, operation_name, value) # Record how to get back to the state before change
+            self.current_image = new_image     # Update current state
+            self.pipeline.append(operation_name, value, result=new_image)
+            self.update_gui_image(self.current_image, "processed")
+            self.update_gui_history_buttons(bool(self.history), self.has_image())
             self.update_gui_status(f"{operation_description} applied.")
 
     def apply_operation(self, operation_name, value, is_preview=False):
-        if not self.current_pil_image:
+        if not self.has_image():
             self.update_gui_status("Load an image first.")
             return
 
-        # Always operate on a copy of the current_pil_image
-        # This ensures that if an operation fails, current_pil_image is not corrupted.
-        # And for previews, they don't alter current_pil_image.
-        # For definitive ops, current_pil_image will be updated in _apply_and_update.
-        image_to_operate_on = self.current_pil_image.copy()
-        
-        processed_image = None
-        description = ""
-
+        # Operations never modify the array they are given, so current_image needs no
+        # defensive copy: a failed operation or a preview leaves it untouched, and for
+        # definitive ops current_image is replaced in _apply_and_update.
+        operation_name, value = self._scoped(operation_name, value)
         try:
-            # --- Transform Operations ---
-            if operation_name == "rotate_left": # New
-                processed_image = image_to_operate_on.rotate(90, expand=True, fillcolor='white' if image_to_operate_on.mode == 'RGB' else (0,0,0,0))
-                description = "Rotated 90° Left"
-            elif operation_name == "rotate_right": # New
-                processed_image = image_to_operate_on.rotate(-90, expand=True, fillcolor='white' if image_to_operate_on.mode == 'RGB' else (0,0,0,0))
-                description = "Rotated 90° Right"
-            elif operation_name == "rotate": # Old slider version, keep for reference if needed by main.py for a bit
-                processed_image = image_to_operate_on.rotate(int(value), expand=True, fillcolor='white' if image_to_operate_on.mode == 'RGB' else (0,0,0,0))
-                description = f"Rotated by {int(value)} degrees" # This is likely a preview op if called "rotate"
-            elif operation_name == "flip_horizontal":
-                processed_image = ImageOps.mirror(image_to_operate_on)
-                description = "Flipped horizontally"
-            elif operation_name == "flip_vertical":
-                processed_image = ImageOps.flip(image_to_operate_on)
-                description = "Flipped vertically"
-            elif operation_name == "resize_preview" or operation_name == "resize":
-                if value is None or not (0.01 <= value <= 5.0):
-                    self.update_gui_status("Invalid resize scale.")
-                    return
-                width, height = image_to_operate_on.size
-                new_width, new_height = int(width * value), int(height * value)
-                if new_width > 0 and new_height > 0:
-                    processed_image = image_to_operate_on.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                    description = f"Resized to {value*100:.0f}%"
-                else:
-                    self.update_gui_status("Resize resulted in zero dimension."); return
-
-            # --- Filter Operations ---
-            elif operation_name == "grayscale":
-                img_to_gray = image_to_operate_on.convert('RGB') if image_to_operate_on.mode == 'RGBA' else image_to_operate_on
-                processed_image = img_to_gray.convert('L')
-                description = "Converted to Grayscale"
-            elif operation_name == "gaussian_blur":
-                ksize = int(value); ksize = ksize + 1 if ksize % 2 == 0 else ksize
-                if ksize > 0:
-                    processed_image = image_to_operate_on.filter(ImageFilter.GaussianBlur(radius=ksize // 2))
-                    description = f"Gaussian Blur (kernel: {ksize})"
-            elif operation_name == "median_blur":
-                ksize = int(value); ksize = ksize + 1 if ksize % 2 == 0 else ksize
-                if ksize > 0:
-                    cv_img = self.pil_to_cv2(image_to_operate_on)
-                    blurred_cv_img = cv2.medianBlur(cv_img, ksize)
-                    processed_image = self.cv2_to_pil(blurred_cv_img)
-                    description = f"Median Blur (kernel: {ksize})"
-
-            # --- Edge Detection ---
-            elif operation_name == "sobel":
-                cv_img = self.pil_to_cv2(image_to_operate_on)
-                gray_cv_img = cv2.cvtColor(cv_img, cv2.COLOR_BGR2GRAY) if len(cv_img.shape) == 3 else cv_img
-                sobelx = cv2.Sobel(gray_cv_img, cv2.CV_64F, 1, 0, ksize=3)
-                sobely = cv2.Sobel(gray_cv_img, cv2.CV_64F, 0, 1, ksize=3)
-                sobel_combined = cv2.convertScaleAbs(cv2.magnitude(sobelx, sobely))
-                processed_image = self.cv2_to_pil(sobel_combined)
-                description = "Sobel Edge Detection"
-            elif operation_name == "canny_preview" or operation_name == "canny":
-                t1, t2 = int(value[0]), int(value[1])
-                cv_img = self.pil_to_cv2(image_to_operate_on)
-                gray_cv_img = cv2.cvtColor(cv_img, cv2.COLOR_BGR2GRAY) if len(cv_img.shape) == 3 else cv_img
-                edges = cv2.Canny(gray_cv_img, t1, t2)
-                processed_image = self.cv2_to_pil(edges)
-                description = f"Canny Edge (T1:{t1}, T2:{t2})"
-
-            # --- Morphology & Threshold ---
-            elif operation_name == "threshold":
-                thresh_val = int(value)
-                gray_pil = image_to_operate_on.convert('L') if image_to_operate_on.mode != 'L' else image_to_operate_on
-                processed_image = gray_pil.point(lambda p: 255 if p > thresh_val else 0, '1').convert('L')
-                description = f"Binary Threshold at {thresh_val}"
-            elif operation_name == "erosion":
-                ksize = int(value); ksize = ksize + 1 if ksize % 2 == 0 else ksize
-                if ksize > 0:
-                    cv_img = self.pil_to_cv2(image_to_operate_on)
-                    kernel = np.ones((ksize, ksize), np.uint8)
-                    processed_image = self.cv2_to_pil(cv2.erode(cv_img, kernel, iterations=1))
-                    description = f"Erosion (kernel: {ksize})"
-            elif operation_name == "dilation":
-                ksize = int(value); ksize = ksize + 1 if ksize % 2 == 0 else ksize
-                if ksize > 0:
-                    cv_img = self.pil_to_cv2(image_to_operate_on)
-                    kernel = np.ones((ksize, ksize), np.uint8)
-                    processed_image = self.cv2_to_pil(cv2.dilate(cv_img, kernel, iterations=1))
-                    description = f"Dilation (kernel: {ksize})"
-
-            # --- Adjustments ---
-            elif operation_name == "brightness_preview" or operation_name == "brightness":
-                enhancer = ImageEnhance.Brightness(image_to_operate_on)
-                processed_image = enhancer.enhance(float(value))
-                description = f"Brightness: {value:.2f}"
-            elif operation_name == "contrast_preview" or operation_name == "contrast":
-                enhancer = ImageEnhance.Contrast(image_to_operate_on)
-                processed_image = enhancer.enhance(float(value))
-                description = f"Contrast: {value:.2f}"
-            else:
-                self.update_gui_status(f"Unknown operation: {operation_name}"); return
-
-            if processed_image:
-                self._apply_and_update(processed_image, description, is_preview)
-            elif not is_preview:
-                self.update_gui_status(f"Op '{description}' no result.")
+            # The whole step, from compute through history to the display refresh
+            with tracer.span(operation_name, "apply", preview=is_preview):
+                processed_image, description = self._compute_operation(self.current_image, operation_name, value)
+
+                if processed_image is not None:
+                    self._apply_and_update(processed_image, operation_name, value, description, is_preview)
+                elif not is_preview:
+                    self.update_gui_status(f"Op '{description}' no result.")
 
+        except OperationError as e:
+            self.update_gui_status(str(e))
         except Exception as e:
             error_msg = f"Error in '{operation_name}': {e}"
             self.update_gui_status(error_msg)
             print(error_msg)
             if is_preview: # If preview fails, show current committed image
-                self.update_gui_image(self.current_pil_image, "processed")
-
-    def pil_to_cv2(self, pil_image):
-        numpy_image = np.array(pil_image)
-        if pil_image.mode == 'RGB': return cv2.cvtColor(numpy_image, cv2.COLOR_RGB2BGR)
-        if pil_image.mode == 'RGBA': return cv2.cvtColor(numpy_image, cv2.COLOR_RGBA2BGRA)
-        if pil_image.mode == 'L': return numpy_image
-        if pil_image.mode == '1': return (numpy_image * 255).astype(np.uint8)
-        pil_rgb = pil_image.convert('RGB')
-        self.update_gui_status(f"PIL mode {pil_image.mode} converted to RGB for CV2.")
-        return cv2.cvtColor(np.array(pil_rgb), cv2.COLOR_RGB2BGR)
-
-    def cv2_to_pil(self, cv2_image):
-        if len(cv2_image.shape) == 2: return Image.fromarray(cv2_image, mode='L')
-        if cv2_image.shape[2] == 3: return Image.fromarray(cv2.cvtColor(cv2_image, cv2.COLOR_BGR2RGB), mode='RGB')
-        if cv2_image.shape[2] == 4: return Image.fromarray(cv2.cvtColor(cv2_image, cv2.COLOR_BGRA2RGBA), mode='RGBA')
-        raise ValueError(f"Unsupported cv2_image channels: {cv2_image.shape}")
\ No newline at end of file
+                self.update_gui_image(self.current_image, "processed")
+
+    def preview_adjustments(self, steps):
+        # Slider previews: steps is the full list of pending (operation_name, value) steps. They
+        # are kept as nodes of one pipeline over the current image, so a slider change only
+        # recomputes from its node on and an unchanged list is not recomputed at all.
+        if not self.has_image():
+            self.update_gui_status("Load an image first.")
+            return
+        if self.selection is not None:
+            self.apply_operation("chain", steps, is_preview=True) # Runs through "roi"
+            return
+        try:
+            with tracer.span("chain", "apply", preview=True):
+                image = self.current_image
+                if self.adjustments.source is not image:
+                    self.adjustments.reset(image)
+                nodes = self.adjustments.nodes
+                # Nodes whose operation is unchanged keep their cache up to the first changed value
+                keep = 0
+                while keep < min(len(nodes), len(steps)) and nodes[keep].operation == steps[keep][0]:
+                    keep += 1
+                while len(nodes) > keep:
+                    self.adjustments.pop()
+                for index in range(keep):
+                    self.adjustments.set_value(index, steps[index][1])
+                for step_name, step_value in steps[keep:]:
+                    self.adjustments.append(step_name, step_value)
+                self.update_gui_image(self.adjustments.evaluate(), "processed")
+        except OperationError as e:
+            self.update_gui_status(str(e))
+        except Exception as e:
+            error_msg = f"Error in 'chain': {e}"
+            self.update_gui_status(error_msg)
+            print(error_msg)
+            self.update_gui_image(self.current_image, "processed")
+
+    def run_operation(self, operation_name, value):
+        # Headless counterpart of apply_operation: commits the result and raises on failure
+        if not self.has_image():
+            raise OperationError("Load an image first.")
+        operation_name, value = self._scoped(operation_name, value)
+        with tracer.span(operation_name, "apply", preview=False):
+            processed_image, description = self._compute_operation(self.current_image, operation_name, value)
+            if processed_image is None:
+                raise OperationError(f"Op '{description or operation_name}' no result.")
+            self._apply_and_update(processed_image, operation_name, value, description, is_preview=False)
+        return description
+
+    def run_chain(self, image, steps):
+        # Applies steps to any array (e.g. a video frame) without touching the loaded image,
+        # its history or its recipe
+        return self._compute_operation(image, "chain", list(steps))[0]
+
+    def _compute_operation(self, image, operation_name, value):
+        # Pure function of (image, operation, value); also used to replay history.
+        # Operations are looked up in the registry (operations.py), which also decides
+        # whether a filter runs as tiles; none of them modifies the array it is given.
+        operation = registry.get(operation_name)
+        if operation is None:
+            raise OperationError(f"Unknown operation: {operation_name}")
+        with tracer.span(operation_name, "compute", shape=image.shape) as span:
+            result = operation(image, value, self)
+            if result[0] is not None and result[0] is not image:
+                span.copied(result[0].nbytes) # The result is a new array
+            return result
+
+
+# --- Chains (recipes, combined adjustments) ---
+def _chain(image, value, context):
+    # value is a list of (operation_name, value) steps; adjacent point operations are fused
+    chain = Pipeline(context._replay_operation, source=image, cache_budget_bytes=0)
+    for step_name, step_value in value:
+        chain.append(step_name, step_value)
+    return chain.evaluate()
+
+def _chain_steps(value):
+    for name, _ in value:
+        if name not in registry:
+            raise OperationError(f"Unknown operation: {name}")
+    return [(registry.get(name), step_value) for name, step_value in value]
+
+register(Operation("chain", lambda value: " + ".join(step_name.replace("_", " ").capitalize() for step_name, _ in value),
+                   apply=_chain, kind="global", cost=lambda value: sum(op.unit_cost(v) for op, v in _chain_steps(value)),
+                   # Halos add up along the chain
+                   halo=lambda value: sum(op.region_halo(op.coerce(v)) for op, v in _chain_steps(value)),
+                   preserves_shape=lambda value: all(op.keeps_shape(v) for op, v in _chain_steps(value))))
@@ -0,0 +1,116 @@
+# lut.py
+import cv2
+import numpy as np
+from PIL import Image
+
+# Per-pixel operations that compile into a 256-entry lookup table per channel.
+# Any run of them is applied to the image with a single cv2.LUT pass.
+POINT_OPERATIONS = ("brightness", "contrast", "threshold", "gamma", "levels", "invert")
+
+_RAMP = np.arange(256, dtype=np.float32)
+_IDENTITY = np.arange(256, dtype=np.uint8)
+
+
+# --- Table builders ---
+def _blend_table(mean, factor):
+    # Same arithmetic as PIL's Image.blend against a constant image (what ImageEnhance does):
+    # float32 interpolation, truncated, then clipped to 0..255
+    values = np.float32(mean) + np.float32(factor) * (_RAMP - np.float32(mean))
+    return np.clip(np.trunc(values), 0, 255).astype(np.uint8)
+
+def brightness_table(factor):
+    return _blend_table(0, float(factor))
+
+def contrast_table(factor, mean):
+    # mean is the rounded mean of the image's luma, as ImageEnhance.Contrast computes it
+    return _blend_table(mean, float(factor))
+
+def threshold_table(threshold):
+    return np.where(_IDENTITY > int(threshold), 255, 0).astype(np.uint8)
+
+def gamma_table(gamma):
+    return levels_table((0, 255, 0, 255, gamma))
+
+def levels_table(value):
+    # value is (in_black, in_white, out_black, out_white) with an optional trailing gamma
+    in_black, in_white, out_black, out_white = (float(v) for v in value[:4])
+    gamma = float(value[4]) if len(value) > 4 else 1.0
+    if in_white <= in_black or gamma <= 0:
+        raise ValueError(f"Invalid levels: {value}")
+    normalized = np.clip((_RAMP - in_black) / (in_white - in_black), 0.0, 1.0) ** (1.0 / gamma)
+    return np.clip(np.rint(out_black + normalized * (out_white - out_black)), 0, 255).astype(np.uint8)
+
+def invert_table():
+    return (255 - _IDENTITY).astype(np.uint8)
+
+
+# --- Image helpers ---
+def luma(array):
+    # RGB(A) -> L in one output buffer. Same weights as PIL's convert('L'); OpenCV's
+    # fixed-point rounding differs from PIL's by at most one level on a few pixels.
+    if array.ndim == 2:
+        return array
+    return cv2.cvtColor(array, cv2.COLOR_RGBA2GRAY if array.shape[2] == 4 else cv2.COLOR_RGB2GRAY)
+
+def channel_histograms(array, channels):
+    return [cv2.calcHist([array], [channel], None, [256], [0, 256]).ravel() for channel in range(channels)]
+
+def _luma_mean(array, tables, histograms):
+    # Mean of the luma after the tables collected so far have been applied
+    if tables is None:
+        return float(cv2.mean(luma(array))[0])
+    # Estimate from the input's per-channel histograms pushed through the tables (exact
+    # for 'L'); avoids materialising the intermediate image just to measure it
+    means = [float(np.dot(counts, table)) / counts.sum() for counts, table in zip(histograms, tables)]
+    if len(means) == 1:
+        return means[0]
+    return means[0] * 0.299 + means[1] * 0.587 + means[2] * 0.114
+
+def apply_tables(array, tables, backend=None):
+    # One cv2.LUT pass; a trailing alpha channel is passed through unchanged.
+    # backend "numpy" (fancy indexing) or "pil" (Image.point) give the same result.
+    columns = list(tables) + [_IDENTITY] * ((1 if array.ndim == 2 else array.shape[2]) - len(tables))
+    if backend == "numpy":
+        if array.ndim == 2:
+            return columns[0][array]
+        return np.stack([table[array[..., channel]] for channel, table in enumerate(columns)], axis=-1)
+    if backend == "pil":
+        return np.asarray(Image.fromarray(array).point(np.concatenate(columns).tolist()))
+    if array.ndim == 2:
+        return cv2.LUT(array, tables[0])
+    return cv2.LUT(array, np.stack(columns, axis=-1).reshape(1, 256, array.shape[2]))
+
+
+def apply_point_chain(array, steps, backend=None):
+    # Compiles the steps into per-channel tables and applies them in as few passes as
+    # possible: one LUT pass, plus a luma conversion wherever a threshold needs one.
+    # Returns the new uint8 array ('L' arrays are 2-D, RGB/RGBA are H x W x C).
+    # backend selects how the tables are applied (see apply_tables).
+    tables = None
+    histograms = None
+    for operation_name, value in steps:
+        color_channels = 1 if array.ndim == 2 else 3
+        if operation_name == "brightness":
+            step_table = brightness_table(value)
+        elif operation_name == "contrast":
+            if tables is not None and histograms is None:
+                histograms = channel_histograms(array, color_channels)
+            step_table = contrast_table(value, int(_luma_mean(array, tables, histograms) + 0.5))
+        elif operation_name == "gamma":
+            step_table = gamma_table(value)
+        elif operation_name == "levels":
+            step_table = levels_table(value)
+        elif operation_name == "invert":
+            step_table = invert_table()
+        elif operation_name == "threshold":
+            step_table = threshold_table(value)
+            if array.ndim == 3:
+                # Threshold works on luma, so settle pending tables and drop to one channel
+                if tables is not None:
+                    array = apply_tables(array, tables, backend)
+                array, tables, histograms, color_channels = luma(array), None, None, 1
+        else:
+            raise ValueError(f"Not a point operation: {operation_name}")
+        step_tables = [step_table] * color_channels
+        tables = step_tables if tables is None else [step[table] for step, table in zip(step_tables, tables)]
+    return array if tables is None else apply_tables(array, tables, backend)
@@ -1,24 +1,86 @@
 # main.py
+import time
+STARTED = time.perf_counter() # Start-up is measured from here (see benchmarks/bench_startup.py)
+
+import importlib
+import os
 import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from PyQt5 import QtCore, QtGui, QtWidgets # QtWidgets needed for QApplication
 from PyQt5.QtWidgets import QMainWindow, QApplication, QFileDialog # Keep QFileDialog
 from PyQt5.QtGui import QImage, QPixmap # Keep these for conversion
 
 from gui import Ui_ImageEditorGUI # Your generated UI class
-from logic import ImageLogic      # Your image processing logic class
+from tracing import tracer # Standard library only, so it does not slow start-up
+
+# The image engine pulls in NumPy, OpenCV and PIL, which is most of the start-up time on a
+# Pi. These modules are imported by a warm-up thread once the window has painted; the
+# methods that need them import them locally, and only run once the engine is ready.
+ENGINE_MODULES = ("logic", "saver", "stats", "stream")
+STARTUP_PROBE_ENV = "IMAGE_EDITOR_STARTUP_PROBE" # Set: print start-up timings and quit
+
+PIXMAP_CACHE_SIZE = 4      # Scaled pixmaps kept per panel (one per recent label size)
+RESIZE_DEBOUNCE_MS = 80    # Panels are rescaled once the window stops resizing for this long
+MAX_MORPHOLOGY_KERNEL = 101 # Largest erosion/dilation/opening/closing kernel the sliders offer
+TRACE_REFRESH_MS = 1000    # The trace panel's table is refreshed this often while it is visible
+TRACE_COLUMNS = ("Step", "Kind", "Count", "Total ms", "Max ms", "Max copied MB", "Max peak MB")
+
+def array_to_qimage(image):
+    # Wraps the array's buffer without copying (uint8, 2-D grayscale or H x W x 3/4 RGB(A)).
+    # The QImage is only valid while the array is alive, so use it immediately.
+    height, width = image.shape[:2]
+    if image.ndim == 2:
+        image_format = QImage.Format_Grayscale8
+    elif image.shape[2] == 3:
+        image_format = QImage.Format_RGB888
+    elif image.shape[2] == 4:
+        image_format = QImage.Format_RGBA8888
+    else:
+        return None
+    return QImage(image.data, width, height, image.strides[0], image_format)
 
 class ImageEditorApp(QMainWindow):
+    # Status messages may come from background save threads; a queued signal delivers them on the GUI thread
+    status_message = QtCore.pyqtSignal(str)
+    stats_ready = QtCore.pyqtSignal(object, object) # (generation, ImageStats or None)
+    stream_frame = QtCore.pyqtSignal(object, object, str) # (original, processed, stats summary)
+    stream_finished = QtCore.pyqtSignal(object) # error or None
+    engine_ready = QtCore.pyqtSignal(object) # import error or None
+
     def __init__(self):
         super().__init__()
         self.ui = Ui_ImageEditorGUI()
         self.ui.setupUi(self)
-
-        self.image_logic = ImageLogic(
-            gui_update_callback=self.display_pil_image_in_gui,
-            gui_history_callback=self.update_history_buttons_state,
-            gui_status_callback=self.ui.statusbar.showMessage,
-            gui_reset_sliders_callback=self.reset_all_sliders_to_default
-        )
+        self.image_logic = None # Created when the engine modules have loaded (on_engine_ready)
+        self.startup_times = {}
+        self.probe_startup = bool(os.environ.get(STARTUP_PROBE_ENV))
+        self.engine_ready.connect(self.on_engine_ready)
+
+        # Display cache, per panel: the array being shown, a generation number that changes
+        # whenever that array changes, and scaled pixmaps keyed by (generation, label size)
+        self.panel_sources = {"original": None, "processed": None}
+        self.panel_generations = {"original": 0, "processed": 0}
+        self.scaled_pixmaps = {"original": OrderedDict(), "processed": OrderedDict()}
+        self.shown_pixmap_keys = {"original": None, "processed": None}
+        self.resize_timer = QtCore.QTimer(self)
+        self.resize_timer.setSingleShot(True)
+        self.resize_timer.setInterval(RESIZE_DEBOUNCE_MS)
+        self.resize_timer.timeout.connect(self.refresh_panels)
+        self.status_message.connect(self.ui.statusbar.showMessage)
+
+        # Histogram and statistics of the processed panel, computed on a sampled proxy in the
+        # background and cached by the panel's generation
+        self.stats_cache = None
+        self.stats_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stats")
+        self.stats_wanted = None
+        self.stats_ready.connect(self.on_stats_ready)
+        self.histogramLabel = QtWidgets.QLabel(self.ui.processedImageGroupBox)
+        self.histogramLabel.setSizePolicy(QtWidgets.QSizePolicy.Ignored, QtWidgets.QSizePolicy.Fixed)
+        self.statsLabel = QtWidgets.QLabel(self.ui.processedImageGroupBox)
+        self.ui.verticalLayout_3.addWidget(self.histogramLabel)
+        self.ui.verticalLayout_3.addWidget(self.statsLabel)
 
         # self.current_processed_pil_image_for_preview = None # This might not be needed if previews are simple
 
@@ -26,8 +88,50 @@ class ImageEditorApp(QMainWindow):
         # Top Controls
         self.ui.uploadButton.clicked.connect(self.upload_image)
         self.ui.saveButton.clicked.connect(self.save_image)
-        self.ui.undoButton.clicked.connect(self.image_logic.undo_last_change)
-        self.ui.revertButton.clicked.connect(self.image_logic.revert_all_changes)
+        self.ui.undoButton.clicked.connect(lambda: self.image_logic.undo_last_change())
+        self.ui.revertButton.clicked.connect(lambda: self.image_logic.revert_all_changes())
+
+        # Recipe buttons live next to the top controls (not part of the generated UI)
+        self.saveRecipeButton = QtWidgets.QPushButton("Save Recipe", self.ui.topControlsWidget)
+        self.loadRecipeButton = QtWidgets.QPushButton("Load Recipe", self.ui.topControlsWidget)
+        self.ui.topControlsLayout.insertWidget(4, self.saveRecipeButton)
+        self.ui.topControlsLayout.insertWidget(5, self.loadRecipeButton)
+        self.saveRecipeButton.clicked.connect(self.save_recipe)
+        self.loadRecipeButton.clicked.connect(self.load_recipe)
+        self.clearSelectionButton = QtWidgets.QPushButton("Clear Selection", self.ui.topControlsWidget)
+        self.ui.topControlsLayout.insertWidget(6, self.clearSelectionButton)
+        self.clearSelectionButton.clicked.connect(self.clear_selection)
+
+        # Live mode: the current recipe runs on frames from a camera or video file
+        self.streamButton = QtWidgets.QPushButton("Start Stream", self.ui.topControlsWidget)
+        self.ui.topControlsLayout.insertWidget(7, self.streamButton)
+        self.streamButton.clicked.connect(self.toggle_stream)
+        self.stream = None
+        self.stream_frame_pending = False
+        self.stream_frame.connect(self.on_stream_frame)
+        self.stream_finished.connect(self.on_stream_finished)
+
+        # Dragging on the processed panel selects the region operations are limited to
+        self.selection_band = QtWidgets.QRubberBand(QtWidgets.QRubberBand.Rectangle, self.ui.processedImageLabel)
+        self.selection_origin = None
+        self.ui.processedImageLabel.installEventFilter(self)
+
+        # Saves run in the background; this trades file size for encoding speed
+        self.fastSaveCheckBox = QtWidgets.QCheckBox("Fast save", self.ui.topControlsWidget)
+        self.ui.topControlsLayout.insertWidget(2, self.fastSaveCheckBox)
+
+        # Recently opened files; switching back keeps each file's edits and undo history
+        self.recentComboBox = QtWidgets.QComboBox(self.ui.topControlsWidget)
+        self.recentComboBox.setSizeAdjustPolicy(QtWidgets.QComboBox.AdjustToContents)
+        self.ui.topControlsLayout.insertWidget(1, self.recentComboBox)
+        self.recentComboBox.activated.connect(self.switch_document)
+
+        # Debug > Trace Panel: where time and memory go, per step (see tracing.py); built on first use
+        self.traceDock = None
+        self.debugMenu = self.ui.menubar.addMenu("Debug")
+        self.traceAction = self.debugMenu.addAction("Trace Panel")
+        self.traceAction.setShortcut("F12")
+        self.traceAction.triggered.connect(self.toggle_trace_dock)
 
         # Transform Tab
         # self.ui.rotateSlider.valueChanged.connect(self.rotate_image_preview) # REMOVE THIS
@@ -62,10 +166,13 @@ class ImageEditorApp(QMainWindow):
         self.ui.cannyThresh2Slider.valueChanged.connect(self.canny_preview)
         self.ui.applyCannyButton.clicked.connect(self.apply_current_canny)
 
-        # Morphology Tab
+        # Morphology Tab: the additions below are built the first time the tab is shown
         self.ui.thresholdSlider.valueChanged.connect(self.threshold_preview)
         self.ui.erosionSlider.valueChanged.connect(self.erosion_preview)
         self.ui.dilationSlider.valueChanged.connect(self.dilation_preview)
+        self.morphologySlider = None
+        self.tab_builders = {self.ui.morphologyTab: self.build_morphology_tab}
+        self.ui.controlsNotebook.currentChanged.connect(self.build_current_tab)
         # Consider making these definitive or add apply buttons
 
 
@@ -74,59 +181,355 @@ class ImageEditorApp(QMainWindow):
         self.ui.contrastSlider.valueChanged.connect(self.contrast_preview)
         self.ui.applyAdjustmentsButton.clicked.connect(self.apply_current_adjustments)
 
-        # Initial UI state
-        self.update_history_buttons_state(False, False)
+        # Initial UI state: controls wait for the engine
+        self.ui.undoButton.setEnabled(False)
+        self.ui.revertButton.setEnabled(False)
         self.ui.saveButton.setEnabled(False)
+        self.ui.topControlsWidget.setEnabled(False)
+        self.ui.controlsNotebook.setEnabled(False)
+        self.ui.statusbar.showMessage("Starting...")
+        self.build_current_tab(self.ui.controlsNotebook.currentIndex())
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if "first_paint" not in self.startup_times:
+            self.startup_times["first_paint"] = time.perf_counter() - STARTED
+            # Queued, so the window finishes painting before the imports compete for the GIL
+            QtCore.QTimer.singleShot(0, self.start_engine_warmup)
+
+    def start_engine_warmup(self):
+        def warm_up():
+            try:
+                for name in ENGINE_MODULES:
+                    importlib.import_module(name)
+                self.engine_ready.emit(None)
+            except Exception as e:
+                self.engine_ready.emit(e)
+        threading.Thread(target=warm_up, name="engine-warmup", daemon=True).start()
+
+    def on_engine_ready(self, error):
+        self.startup_times["engine_ready"] = time.perf_counter() - STARTED
+        if error is not None:
+            self.ui.statusbar.showMessage(f"Could not load the image engine: {error}")
+            self.report_startup()
+            return
+        from logic import ImageLogic
+        from stats import HISTOGRAM_HEIGHT, StatsCache
+        self.image_logic = ImageLogic(
+            gui_update_callback=self.display_image_in_gui,
+            gui_history_callback=self.update_history_buttons_state,
+            gui_status_callback=self.status_message.emit,
+            gui_reset_sliders_callback=self.reset_all_sliders_to_default
+        )
+        self.stats_cache = StatsCache()
+        self.histogramLabel.setFixedHeight(HISTOGRAM_HEIGHT)
+        self.refresh_recent_documents()
+        self.update_history_buttons_state(False, False)
+        self.ui.topControlsWidget.setEnabled(True)
+        self.ui.controlsNotebook.setEnabled(True)
+        self.ui.statusbar.showMessage("Ready.")
+        self.report_startup()
+
+    def report_startup(self):
+        if self.probe_startup:
+            for name, seconds in self.startup_times.items():
+                print(f"{name}_ms={seconds * 1000:.1f}", flush=True)
+            QtCore.QTimer.singleShot(0, self.close)
+
+    def build_current_tab(self, index):
+        # Extra controls of a tab are built the first time it is shown
+        builder = self.tab_builders.pop(self.ui.controlsNotebook.widget(index), None)
+        if builder is not None:
+            builder()
+
+    def build_morphology_tab(self):
+        self.autoThresholdButton = QtWidgets.QPushButton("Auto (Otsu)", self.ui.morphologyTab)
+        self.ui.gridLayout_4.addWidget(self.autoThresholdButton, 0, 2, 1, 1)
+        self.autoThresholdButton.clicked.connect(self.auto_threshold)
+        # Morphology cost no longer grows with the kernel size (see morphology.py)
+        self.ui.erosionSlider.setMaximum(MAX_MORPHOLOGY_KERNEL)
+        self.ui.dilationSlider.setMaximum(MAX_MORPHOLOGY_KERNEL)
+        # Opening / closing / gradient share one kernel slider, below the generated rows
+        spacer = self.ui.gridLayout_4.itemAtPosition(3, 0)
+        self.ui.gridLayout_4.removeItem(spacer)
+        self.ui.gridLayout_4.addItem(spacer, 4, 0, 1, 1)
+        self.morphologyComboBox = QtWidgets.QComboBox(self.ui.morphologyTab)
+        for label, operation_name in (("Opening", "opening"), ("Closing", "closing"), ("Gradient", "gradient")):
+            self.morphologyComboBox.addItem(label, operation_name)
+        self.morphologySlider = QtWidgets.QSlider(QtCore.Qt.Horizontal, self.ui.morphologyTab)
+        self.morphologySlider.setRange(1, MAX_MORPHOLOGY_KERNEL)
+        self.morphologySlider.setSingleStep(2)
+        self.morphologySlider.setPageStep(2)
+        self.applyMorphologyButton = QtWidgets.QPushButton("Apply", self.ui.morphologyTab)
+        self.ui.gridLayout_4.addWidget(self.morphologyComboBox, 3, 0, 1, 1)
+        self.ui.gridLayout_4.addWidget(self.morphologySlider, 3, 1, 1, 1)
+        self.ui.gridLayout_4.addWidget(self.applyMorphologyButton, 3, 2, 1, 1)
+        self.morphologyComboBox.currentIndexChanged.connect(lambda index: self.morphology_preview(self.morphologySlider.value()))
+        self.morphologySlider.valueChanged.connect(self.morphology_preview)
+        self.applyMorphologyButton.clicked.connect(self.apply_current_morphology)
+
+
+    def toggle_trace_dock(self):
+        if self.traceDock is None:
+            self.build_trace_dock()
+        self.traceDock.setVisible(not self.traceDock.isVisible())
+
+    def build_trace_dock(self):
+        self.traceDock = QtWidgets.QDockWidget("Trace", self)
+        self.traceDock.setObjectName("traceDock")
+        panel = QtWidgets.QWidget(self.traceDock)
+        layout = QtWidgets.QVBoxLayout(panel)
+        controls = QtWidgets.QHBoxLayout()
+        self.traceRecordCheckBox = QtWidgets.QCheckBox("Record", panel)
+        self.traceRecordCheckBox.setChecked(tracer.enabled)
+        self.traceMemoryCheckBox = QtWidgets.QCheckBox("Memory (slow)", panel)
+        self.traceMemoryCheckBox.setChecked(tracer.memory)
+        self.traceClearButton = QtWidgets.QPushButton("Clear", panel)
+        self.traceExportButton = QtWidgets.QPushButton("Export Chrome Trace...", panel)
+        for widget in (self.traceRecordCheckBox, self.traceMemoryCheckBox, self.traceClearButton, self.traceExportButton):
+            controls.addWidget(widget)
+        layout.addLayout(controls)
+        self.traceTable = QtWidgets.QTableWidget(0, len(TRACE_COLUMNS), panel)
+        self.traceTable.setHorizontalHeaderLabels(TRACE_COLUMNS)
+        self.traceTable.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.traceTable.verticalHeader().setVisible(False)
+        layout.addWidget(self.traceTable)
+        self.traceDock.setWidget(panel)
+        self.addDockWidget(QtCore.Qt.RightDockWidgetArea, self.traceDock)
+        self.traceDock.hide()
+
+        self.traceRecordCheckBox.toggled.connect(self.set_tracing)
+        self.traceMemoryCheckBox.toggled.connect(self.set_tracing)
+        self.traceClearButton.clicked.connect(self.clear_trace)
+        self.traceExportButton.clicked.connect(self.export_trace)
+        self.trace_timer = QtCore.QTimer(self)
+        self.trace_timer.setInterval(TRACE_REFRESH_MS)
+        self.trace_timer.timeout.connect(self.refresh_trace_dock)
+        self.traceDock.visibilityChanged.connect(lambda visible: self.trace_timer.start() if visible else self.trace_timer.stop())
+
+    def set_tracing(self):
+        if self.traceRecordCheckBox.isChecked():
+            tracer.enable(memory=self.traceMemoryCheckBox.isChecked())
+        else:
+            tracer.disable()
+        self.refresh_trace_dock()
+
+    def clear_trace(self):
+        tracer.clear()
+        self.refresh_trace_dock()
+
+    def refresh_trace_dock(self):
+        rows = tracer.summary()
+        self.traceTable.setRowCount(len(rows))
+        for index, row in enumerate(rows):
+            peak = row["max_peak_bytes"]
+            cells = (row["name"], row["category"], str(row["count"]), f"{row['total_ms']:.1f}", f"{row['max_ms']:.1f}",
+                     f"{row['max_copied_bytes'] / 1e6:.1f}", f"{peak / 1e6:.1f}" if peak is not None else "-")
+            for column, text in enumerate(cells):
+                self.traceTable.setItem(index, column, QtWidgets.QTableWidgetItem(text))
+
+    def export_trace(self):
+        filepath, _ = QFileDialog.getSaveFileName(self, "Export Chrome Trace", "trace.json", "Chrome trace (*.json)")
+        if filepath:
+            try:
+                count = tracer.export_chrome(filepath)
+                self.ui.statusbar.showMessage(f"{count} trace events written to '{filepath}' (open in chrome://tracing).")
+            except OSError as e:
+                self.ui.statusbar.showMessage(f"Error exporting trace: {e}")
 
-
-    def display_pil_image_in_gui(self, pil_image, panel_name):
-        label_to_update = None
+    def panel_label(self, panel_name):
         if panel_name == "original":
-            label_to_update = self.ui.originalImageLabel
-        elif panel_name == "processed":
-            label_to_update = self.ui.processedImageLabel
-        else:
+            return self.ui.originalImageLabel
+        if panel_name == "processed":
+            return self.ui.processedImageLabel
+        return None
+
+    def display_image_in_gui(self, image, panel_name):
+        # image is ImageLogic's working array: uint8, 2-D grayscale or H x W x 3/4 in RGB(A) order
+        label_to_update = self.panel_label(panel_name)
+        if label_to_update is None:
             self.ui.statusbar.showMessage(f"Error: Unknown panel '{panel_name}'"); return
 
-        if pil_image is None:
+        if image is None:
+            self.panel_sources[panel_name] = None
+            self.scaled_pixmaps[panel_name].clear()
+            self.shown_pixmap_keys[panel_name] = None
+            if panel_name == "processed":
+                self.show_stats(None)
             label_to_update.clear(); label_to_update.setText("No image"); return
 
+        # Working arrays are never modified in place, so identity tells us whether it changed
+        if image is not self.panel_sources[panel_name]:
+            self.panel_sources[panel_name] = image
+            self.panel_generations[panel_name] += 1
+            self.scaled_pixmaps[panel_name].clear()
+            if panel_name == "processed":
+                self.request_stats(image, self.panel_generations[panel_name])
+        self.render_panel(panel_name)
+
+    def render_panel(self, panel_name):
+        image = self.panel_sources[panel_name]
+        label_to_update = self.panel_label(panel_name)
+        if image is None:
+            return
+
+        key = (self.panel_generations[panel_name], label_to_update.width(), label_to_update.height())
+        if key == self.shown_pixmap_keys[panel_name]:
+            return # Already showing this image at this size
+        with tracer.span(f"render {panel_name}", "display", shape=image.shape):
+            self.render_pixmap(panel_name, image, label_to_update, key)
+
+    def render_pixmap(self, panel_name, image, label_to_update, key):
         try:
-            q_image = None
-            if pil_image.mode == 'RGB':
-                q_image = QImage(pil_image.tobytes("raw", "RGB"), pil_image.width, pil_image.height, QImage.Format_RGB888)
-            elif pil_image.mode == 'RGBA':
-                q_image = QImage(pil_image.tobytes("raw", "RGBA"), pil_image.width, pil_image.height, QImage.Format_RGBA8888)
-            elif pil_image.mode == 'L':
-                q_image = QImage(pil_image.tobytes("raw", "L"), pil_image.width, pil_image.height, QImage.Format_Grayscale8)
-            elif pil_image.mode == '1':
-                pil_gray = pil_image.convert('L')
-                q_image = QImage(pil_gray.tobytes("raw", "L"), pil_gray.width, pil_gray.height, QImage.Format_Grayscale8)
+            cache = self.scaled_pixmaps[panel_name]
+            pixmap = cache.get(key)
+            if pixmap is None:
+                q_image = array_to_qimage(image)
+                if q_image is None or q_image.isNull(): # Check if q_image was successfully created
+                    label_to_update.setText("Error: QImage conversion failed."); return
+
+                if label_to_update.width() > 1 and label_to_update.height() > 1: # Ensure label has size
+                    # Scale the wrapped buffer first, so only the small result is copied into a pixmap
+                    q_image = q_image.scaled(label_to_update.size(), QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation)
+                pixmap = QPixmap.fromImage(q_image) # Copies, so the pixmap no longer depends on the array
+                tracer.copied(q_image.bytesPerLine() * q_image.height())
+                cache[key] = pixmap
+                if len(cache) > PIXMAP_CACHE_SIZE:
+                    cache.popitem(last=False)
             else:
-                pil_rgba = pil_image.convert('RGBA')
-                q_image = QImage(pil_rgba.tobytes("raw", "RGBA"), pil_rgba.width, pil_rgba.height, QImage.Format_RGBA8888)
-                # self.ui.statusbar.showMessage(f"Displaying mode '{pil_image.mode}' as RGBA.") # Less noisy
+                cache.move_to_end(key)
 
-            if q_image is None or q_image.isNull(): # Check if q_image was successfully created
-                label_to_update.setText("Error: QImage conversion failed."); return
-
-            pixmap = QPixmap.fromImage(q_image)
-            if label_to_update.width() > 1 and label_to_update.height() > 1: # Ensure label has size
-                 scaled_pixmap = pixmap.scaled(label_to_update.size(), QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation)
-                 label_to_update.setPixmap(scaled_pixmap)
-            else:
-                 label_to_update.setPixmap(pixmap) # Set unscaled if label size not determined
+            label_to_update.setPixmap(pixmap)
+            self.shown_pixmap_keys[panel_name] = key
 
         except Exception as e:
             label_to_update.setText(f"Display Error");
             self.ui.statusbar.showMessage(f"Error displaying image: {e}")
-            print(f"Error in display_pil_image_in_gui for {panel_name}: {e}")
+            print(f"Error in render_panel for {panel_name}: {e}")
+
+    def request_stats(self, image, generation):
+        stats = self.stats_cache.get(generation)
+        if stats is not None:
+            self.show_stats(stats); return
+        self.stats_wanted = generation
+
+        from stats import ImageStats
+
+        def compute():
+            # Slider drags queue many generations; only the newest one is worth computing
+            stats = ImageStats(image) if generation == self.stats_wanted else None
+            self.stats_ready.emit(generation, stats)
+        self.stats_pool.submit(compute)
+
+    def on_stats_ready(self, generation, stats):
+        if stats is None:
+            return
+        self.stats_cache.put(generation, stats)
+        if generation == self.panel_generations["processed"]:
+            self.show_stats(stats)
+
+    def show_stats(self, stats):
+        if stats is None:
+            self.histogramLabel.clear(); self.statsLabel.clear(); return
+        histogram = stats.render()
+        q_image = array_to_qimage(histogram).scaled(max(self.histogramLabel.width(), 256), histogram.shape[0])
+        self.histogramLabel.setPixmap(QPixmap.fromImage(q_image))
+        self.statsLabel.setText(stats.summary())
+
+    def current_image_stats(self):
+        # Stats of the committed image: cached if the panel shows it, else taken from a fresh proxy sample
+        image = self.image_logic.current_image
+        if image is self.panel_sources["processed"]:
+            stats = self.stats_cache.get(self.panel_generations["processed"])
+            if stats is not None:
+                return stats
+        from stats import ImageStats
+        return ImageStats(image)
+
+    def auto_threshold(self):
+        if not self.image_logic.has_image():
+            self.ui.statusbar.showMessage("Load an image first."); return
+        level = self.current_image_stats().otsu_threshold
+        if self.ui.thresholdSlider.value() == level:
+            self.threshold_preview(level) # setValue does not signal when the value is unchanged
+        else:
+            self.ui.thresholdSlider.setValue(level) # Previews through threshold_preview
+        self.ui.statusbar.showMessage(f"Otsu threshold: {level}")
+
+    def refresh_panels(self):
+        # Rescale both panels for the current label sizes; unchanged panels are served from the cache
+        self.render_panel("original")
+        self.render_panel("processed")
+        self.show_selection()
+
+    def displayed_image_rect(self):
+        # (x offset, y offset, x scale, y scale) from image pixels to processed-label pixels
+        label = self.ui.processedImageLabel
+        pixmap = label.pixmap()
+        size = self.image_logic.image_size()
+        if pixmap is None or pixmap.isNull() or size is None:
+            return None
+        return ((label.width() - pixmap.width()) / 2, (label.height() - pixmap.height()) / 2,
+                pixmap.width() / size[0], pixmap.height() / size[1])
+
+    def eventFilter(self, obj, event):
+        if obj is self.ui.processedImageLabel and self.image_logic is not None and self.image_logic.has_image():
+            event_type = event.type()
+            if event_type == QtCore.QEvent.MouseButtonPress and event.button() == QtCore.Qt.LeftButton:
+                self.selection_origin = event.pos()
+                self.selection_band.setGeometry(QtCore.QRect(self.selection_origin, QtCore.QSize()))
+                self.selection_band.show()
+                return True
+            if event_type == QtCore.QEvent.MouseMove and self.selection_origin is not None:
+                self.selection_band.setGeometry(QtCore.QRect(self.selection_origin, event.pos()).normalized())
+                return True
+            if event_type == QtCore.QEvent.MouseButtonRelease and self.selection_origin is not None:
+                rect = QtCore.QRect(self.selection_origin, event.pos()).normalized()
+                self.selection_origin = None
+                self.select_label_rect(rect)
+                return True
+        return super().eventFilter(obj, event)
+
+    def select_label_rect(self, rect):
+        mapping = self.displayed_image_rect()
+        if mapping is None or rect.width() < 3 or rect.height() < 3: # A click clears the selection
+            self.clear_selection(); return
+        off_x, off_y, scale_x, scale_y = mapping
+        width, height = self.image_logic.image_size()
+        left = min(max(int((rect.left() - off_x) / scale_x), 0), width)
+        top = min(max(int((rect.top() - off_y) / scale_y), 0), height)
+        right = min(max(int(round((rect.right() + 1 - off_x) / scale_x)), 0), width)
+        bottom = min(max(int(round((rect.bottom() + 1 - off_y) / scale_y)), 0), height)
+        if right <= left or bottom <= top:
+            self.clear_selection(); return
+        self.image_logic.set_selection((left, top, right, bottom))
+        self.show_selection()
+        self.ui.statusbar.showMessage(f"Selection: {right - left} x {bottom - top} at ({left}, {top}). Operations apply inside it.")
+
+    def show_selection(self):
+        # Places the rubber band over the selection for the current label size
+        if self.image_logic is None:
+            return
+        selection = self.image_logic.selection
+        mapping = self.displayed_image_rect()
+        if selection is None or mapping is None:
+            self.selection_band.hide(); return
+        off_x, off_y, scale_x, scale_y = mapping
+        left, top, right, bottom = selection.box
+        self.selection_band.setGeometry(int(off_x + left * scale_x), int(off_y + top * scale_y),
+                                        max(1, int((right - left) * scale_x)), max(1, int((bottom - top) * scale_y)))
+        self.selection_band.show()
+
+    def clear_selection(self):
+        self.image_logic.clear_selection()
+        self.selection_band.hide()
+        self.ui.statusbar.showMessage("Selection cleared.")
 
 
     def update_history_buttons_state(self, can_undo, can_revert):
         self.ui.undoButton.setEnabled(can_undo)
-        self.ui.revertButton.setEnabled(can_revert and bool(self.image_logic.original_pil_image)) # Revert needs original
-        self.ui.saveButton.setEnabled(bool(self.image_logic.current_pil_image))
+        self.ui.revertButton.setEnabled(can_revert and self.image_logic.has_image()) # Revert needs original
+        self.ui.saveButton.setEnabled(self.image_logic.has_image())
 
     def reset_all_sliders_to_default(self):
         sliders_to_reset = [
@@ -147,20 +550,61 @@ class ImageEditorApp(QMainWindow):
                 slider.blockSignals(True)
                 slider.setValue(default_value)
                 slider.blockSignals(False)
+        if self.morphologySlider is not None: # Built with its tab
+            self.morphologySlider.blockSignals(True)
+            self.morphologySlider.setValue(1)
+            self.morphologySlider.blockSignals(False)
         # self.current_processed_pil_image_for_preview = None # If you were using this
 
     def upload_image(self):
         filepath, _ = QFileDialog.getOpenFileName(self, "Open Image", "", "Images (*.png *.jpg *.jpeg *.bmp *.gif *.tiff);;All Files (*)")
         if filepath:
-            self.image_logic.load_image(filepath)
-            # update_history_buttons_state and saveButton state handled by logic via callbacks
+            self.open_document(filepath)
+
+    def open_document(self, filepath):
+        # A file already in the session comes back with its edits, history and selection
+        self.image_logic.load_image(filepath)
+        self.show_selection()
+        self.refresh_recent_documents()
+        # update_history_buttons_state and saveButton state handled by logic via callbacks
+
+    def refresh_recent_documents(self):
+        self.recentComboBox.blockSignals(True)
+        self.recentComboBox.clear()
+        self.recentComboBox.addItem("Recent files")
+        for path in self.image_logic.recent_documents():
+            self.recentComboBox.addItem(os.path.basename(path), path)
+        self.recentComboBox.setEnabled(self.recentComboBox.count() > 1)
+        self.recentComboBox.blockSignals(False)
+
+    def switch_document(self, index):
+        path = self.recentComboBox.itemData(index)
+        if path:
+            self.open_document(path)
 
     def save_image(self):
-        if not self.image_logic.current_pil_image:
+        if not self.image_logic.has_image():
             self.ui.statusbar.showMessage("No image to save."); return
         filepath, _ = QFileDialog.getSaveFileName(self, "Save Image As", "", "PNG (*.png);;JPEG (*.jpg *.jpeg);;BMP (*.bmp);;TIFF (*.tiff)")
         if filepath:
-            self.image_logic.save_image(filepath)
+            from saver import encoder_options, format_for_path
+            try:
+                options = encoder_options(format_for_path(filepath), fast=self.fastSaveCheckBox.isChecked())
+            except ValueError as e:
+                self.ui.statusbar.showMessage(str(e)); return
+            self.image_logic.save_image(filepath, options) # Returns at once; progress shows in the status bar
+
+    def save_recipe(self):
+        filepath, _ = QFileDialog.getSaveFileName(self, "Save Recipe As", "", "Recipe (*.json)")
+        if filepath:
+            self.image_logic.save_recipe(filepath)
+
+    def load_recipe(self):
+        if not self.image_logic.has_image():
+            self.ui.statusbar.showMessage("Load an image first."); return
+        filepath, _ = QFileDialog.getOpenFileName(self, "Load Recipe", "", "Recipe (*.json);;All Files (*)")
+        if filepath:
+            self.image_logic.load_recipe(filepath)
 
     # --- Preview and Apply Methods for Sliders ---
     def rotate_image_preview(self, value): # This will be removed if rotate slider is removed
@@ -205,36 +649,107 @@ class ImageEditorApp(QMainWindow):
     def dilation_preview(self, value):
         self.image_logic.apply_operation("dilation", value, is_preview=True)
 
+    def morphology_preview(self, value):
+        self.image_logic.apply_operation(self.morphologyComboBox.currentData(), value, is_preview=True)
+
+    def apply_current_morphology(self):
+        self.image_logic.apply_operation(self.morphologyComboBox.currentData(), self.morphologySlider.value(), is_preview=False)
+
     def brightness_preview(self, value):
-        factor = value / 100.0
-        self.image_logic.apply_operation("brightness_preview", factor, is_preview=True)
+        self.adjustments_preview()
 
     def contrast_preview(self, value):
-        factor = value / 100.0
-        self.image_logic.apply_operation("contrast_preview", factor, is_preview=True)
+        self.adjustments_preview()
 
-    def apply_current_adjustments(self):
+    def current_adjustment_steps(self):
+        steps = []
         brightness_factor = self.ui.brightnessSlider.value() / 100.0
         # Only apply if significantly different from 1.0
         if abs(brightness_factor - 1.0) > 0.001: # Allow for float inaccuracies
-            self.image_logic.apply_operation("brightness", brightness_factor, is_preview=False)
-        
+            steps.append(("brightness", brightness_factor))
         contrast_factor = self.ui.contrastSlider.value() / 100.0
         if abs(contrast_factor - 1.0) > 0.001:
-            self.image_logic.apply_operation("contrast", contrast_factor, is_preview=False)
+            steps.append(("contrast", contrast_factor))
+        return steps
+
+    def adjustments_preview(self):
+        # Preview both sliders together; brightness and contrast are fused into one pass, and
+        # the logic keeps the steps cached between slider ticks
+        steps = self.current_adjustment_steps()
+        if self.stream is not None:
+            self.stream.set_steps(self.stream_steps()) # Live mode follows the sliders
+        if steps:
+            self.image_logic.preview_adjustments(steps)
+        elif self.image_logic.has_image():
+            self.display_image_in_gui(self.image_logic.current_image, "processed")
+
+    def apply_current_adjustments(self):
+        steps = self.current_adjustment_steps()
+        if steps: # One fused pass and one undo step for both adjustments
+            self.image_logic.apply_operation("chain", steps, is_preview=False)
         
         # self.reset_all_sliders_to_default() # Let logic trigger this via callback on load/revert/undo
 
+    def stream_steps(self):
+        # What has been applied to the still image so far, then the pending adjustment sliders
+        return [(node.operation, node.value) for node in self.image_logic.pipeline.nodes
+                if node.operation != "roi"] + self.current_adjustment_steps()
+
+    def toggle_stream(self):
+        if self.stream is not None:
+            self.stream.stop(); return
+        source, ok = QtWidgets.QInputDialog.getText(self, "Start Stream", "Camera index or video file:", text="0")
+        if not ok or not source.strip():
+            return
+        self.stream_frame_pending = False
+        from stream import VideoStream
+        self.stream = VideoStream(source.strip(), self.stream_steps(), on_frame=self.stream_frame_callback,
+                                  on_finished=self.stream_finished.emit, loop=True).start()
+        self.streamButton.setText("Stop Stream")
+        self.ui.statusbar.showMessage(f"Streaming from {source.strip()}...")
+
+    def stream_frame_callback(self, original, processed, stats):
+        # Processing thread -> GUI thread. Skipped while the previous frame is still waiting to
+        # be painted, so the signal queue can't build up latency either.
+        if self.stream_frame_pending:
+            stats.count(dropped=1); return
+        self.stream_frame_pending = True
+        self.stream_frame.emit(original, processed, stats.summary())
+
+    def on_stream_frame(self, original, processed, summary):
+        self.stream_frame_pending = False
+        if self.stream is None:
+            return
+        self.display_image_in_gui(original, "original")
+        self.display_image_in_gui(processed, "processed")
+        self.ui.statusbar.showMessage(summary)
+
+    def on_stream_finished(self, error):
+        stream, self.stream = self.stream, None
+        self.streamButton.setText("Start Stream")
+        if self.image_logic.has_image(): # Back to the still image (its preview if not decoded yet)
+            self.image_logic.refresh_display()
+        if error is not None:
+            self.ui.statusbar.showMessage(f"Stream stopped: {error}")
+        elif stream is not None:
+            self.ui.statusbar.showMessage(f"Stream stopped. {stream.stats.summary()}")
+
+    def closeEvent(self, event):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.join(1.0)
+        # Let saves that are still encoding finish before the window goes away
+        if self.image_logic is not None:
+            if self.image_logic.saver.pending:
+                self.ui.statusbar.showMessage("Finishing saves...")
+            self.image_logic.saver.shutdown(wait=True)
+        self.stats_pool.shutdown(wait=False)
+        super().closeEvent(event)
+
     def resizeEvent(self, event):
         super().resizeEvent(event)
-        # Rescale original image if it exists
-        if self.image_logic and self.image_logic.original_pil_image:
-             # Use the stored original PIL image from logic for rescaling
-            self.display_pil_image_in_gui(self.image_logic.original_pil_image, "original")
-        # Rescale processed image if it exists
-        if self.image_logic and self.image_logic.current_pil_image:
-            # Use the stored current PIL image from logic for rescaling
-            self.display_pil_image_in_gui(self.image_logic.current_pil_image, "processed")
+        # Debounced: a drag-resize produces many events, the panels are rescaled once it settles
+        self.resize_timer.start()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,106 @@
+# morphology.py
+# Erosion and dilation by a ksize x ksize square, and the operations built from them.
+# A square is separable, so it runs as a running min/max down the columns and then along
+# the rows. OpenCV already separates rectangles, but its running min/max still looks at
+# every pixel of the window, so its cost grows with ksize. The van Herk/Gil-Werman
+# algorithm splits each line into blocks of ksize and takes prefix and suffix extremes
+# within every block; any window then spans at most two blocks, so each output is one
+# comparison of a suffix and a prefix: three comparisons per pixel and pass, whatever the
+# kernel size. Its passes are whole-array cv2.min/max calls, so OpenCV's own loop is still
+# faster for small kernels and is used below VHGW_MIN_KERNEL. Colour images are split into
+# planes for van Herk/Gil-Werman, which OpenCV avoids, so their crossover is later. The
+# backend tuner (autotune.py) measures both engines too, and can override this default.
+#
+#   python benchmarks/bench_morphology.py    (times both engines for ksize 3-101 and up)
+import cv2
+import numpy as np
+
+# Per channel count, from bench_morphology.py: below these OpenCV's SIMD loop is faster
+VHGW_MIN_KERNEL = {1: 101, 3: 151, 4: 151}
+ENGINES = ("opencv", "vhgw")
+
+
+def _running_rows(array, ksize, extreme, fill):
+    # Running extreme over windows of ksize rows, centred, of a 2-D array; rows outside the
+    # array count as `fill`, the identity of the extreme (as OpenCV's default border)
+    radius = ksize // 2
+    rows, width = array.shape
+    padded_rows = -(-(rows + 2 * radius) // ksize) * ksize
+    padded = np.empty((padded_rows, width), dtype=array.dtype)
+    padded[:radius] = fill
+    padded[radius:radius + rows] = array
+    padded[radius + rows:] = fill
+    blocks = padded.reshape(-1, ksize, width)
+    suffix = np.empty_like(blocks)
+    suffix[:, -1] = blocks[:, -1]
+    # One row of every block per call; each call covers the whole image width
+    for i in range(ksize - 2, -1, -1):
+        extreme(suffix[:, i + 1], blocks[:, i], dst=suffix[:, i])
+    # The prefixes overwrite the blocks, which are not needed any more
+    prefix = blocks
+    for i in range(1, ksize):
+        extreme(prefix[:, i - 1], blocks[:, i], dst=prefix[:, i])
+    prefix = prefix.reshape(padded_rows, width)
+    suffix = suffix.reshape(padded_rows, width)
+    # The window of output row y is padded rows y .. y + ksize - 1
+    return extreme(suffix[:rows], prefix[ksize - 1:ksize - 1 + rows])
+
+
+def _van_herk(image, ksize, extreme, fill):
+    if image.ndim == 3:
+        # Planes transpose much faster than interleaved pixels
+        return cv2.merge([_van_herk(plane, ksize, extreme, fill) for plane in cv2.split(image)])
+    columns = _running_rows(image, ksize, extreme, fill)
+    # Rows become columns, so the second pass also runs over whole contiguous rows
+    return cv2.transpose(_running_rows(cv2.transpose(columns), ksize, extreme, fill))
+
+
+def vhgw_min_kernel(image):
+    channels = 1 if image.ndim == 2 else image.shape[2]
+    return VHGW_MIN_KERNEL.get(channels, max(VHGW_MIN_KERNEL.values()))
+
+
+def unit_cost(ksize):
+    # Per-pixel cost of one erosion or dilation relative to a LUT pass: grows with the
+    # kernel while OpenCV runs it, flat once van Herk/Gil-Werman takes over for every
+    # channel count (the cost does not know the image, so it assumes the latest crossover)
+    return 2.0 + min(ksize, max(VHGW_MIN_KERNEL.values())) / 10.0
+
+
+def _square(ksize):
+    return cv2.getStructuringElement(cv2.MORPH_RECT, (ksize, ksize))
+
+
+def erode(image, ksize, engine=None):
+    # engine: None picks by kernel size and channel count, or "opencv" / "vhgw"
+    if ksize <= 1:
+        return image
+    if engine == "vhgw" or (engine is None and ksize >= vhgw_min_kernel(image)):
+        return _van_herk(image, ksize, cv2.min, 255)
+    return cv2.erode(image, _square(ksize))
+
+
+def dilate(image, ksize, engine=None):
+    if ksize <= 1:
+        return image
+    if engine == "vhgw" or (engine is None and ksize >= vhgw_min_kernel(image)):
+        return _van_herk(image, ksize, cv2.max, 0)
+    return cv2.dilate(image, _square(ksize))
+
+
+def opening(image, ksize, engine=None):
+    # Removes bright details smaller than the kernel
+    return dilate(erode(image, ksize, engine), ksize, engine)
+
+
+def closing(image, ksize, engine=None):
+    # Fills dark details smaller than the kernel
+    return erode(dilate(image, ksize, engine), ksize, engine)
+
+
+def gradient(image, ksize, engine=None):
+    # Dilation minus erosion: the outline of shapes. The alpha of RGBA images is kept, or
+    # every opaque area would become transparent.
+    colour = np.ascontiguousarray(image[..., :3]) if image.ndim == 3 and image.shape[2] == 4 else image
+    result = cv2.subtract(dilate(colour, ksize, engine), erode(colour, ksize, engine))
+    return result if colour is image else np.dstack([result, image[..., 3]])
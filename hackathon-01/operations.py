@@ -0,0 +1,337 @@
+# operations.py
+# Registry of the operations ImageLogic can run. Each operation declares its parameters,
+# what kind of operation it is and how expensive it is per pixel, so the layers around it
+# can pick a strategy without knowing the operation:
+#   point  - output pixel depends only on the same input pixel (fusable into one LUT pass)
+#   local  - depends on a bounded neighbourhood (`halo` rows), so it can run as tiles
+#   global - anything else (geometry, resampling, hysteresis), always runs on the whole image
+#
+# Plugins are modules that define register_operations(registry); they are imported from the
+# IMAGE_EDITOR_PLUGINS environment variable (comma-separated module names) or load_plugins().
+import importlib
+import os
+
+import cv2
+import numpy as np
+from PIL import Image, ImageFilter
+
+import morphology
+from autotune import DEFAULT_BACKEND
+from lut import apply_point_chain, luma
+from tiling import gaussian_halo
+
+PLUGINS_ENV = "IMAGE_EDITOR_PLUGINS"
+KINDS = ("point", "local", "global")
+
+
+class OperationError(ValueError):
+    # Raised for invalid operation input; the message is shown as-is in the status bar
+    pass
+
+
+class Param:
+    def __init__(self, name, cast=float, minimum=None, maximum=None, optional=False):
+        self.name = name
+        self.cast = cast
+        self.minimum = minimum
+        self.maximum = maximum
+        self.optional = optional # Only allowed as trailing parameters
+
+    def coerce(self, value, label):
+        try:
+            value = self.cast(value)
+        except (TypeError, ValueError):
+            raise OperationError(f"Invalid {label} {self.name}: {value!r}.")
+        if (self.minimum is not None and value < self.minimum) or (self.maximum is not None and value > self.maximum):
+            raise OperationError(f"Invalid {label} {self.name}.")
+        return value
+
+
+class Operation:
+    # apply(image, value, context) -> array, or None for "no result"; context is the caller
+    # (ImageLogic), providing .tiles and ._replay_operation. Local operations give
+    # kernel(value) -> fn(array) -> array and halo(value) instead, and are tiled on large images.
+    # cost is a per-pixel estimate relative to one LUT pass, or a function of the value.
+    # fusable point operations are compiled by lut.apply_point_chain under their name.
+    # preserves_shape (bool, or a function of the value) is False for geometric operations,
+    # which cannot be limited to a selection.
+    # backends maps names ("numpy", "pil", ...) to alternative implementations with the same
+    # signature as apply or kernel; context.backends (autotune.py) picks the fastest one
+    # whose output is within `tolerance` levels of the operation's own.
+    def __init__(self, name, describe, apply=None, kind="global", params=(), cost=1.0,
+                 kernel=None, halo=None, fusable=False, aliases=(), preserves_shape=True,
+                 backends=None, tolerance=0):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown operation kind: {kind}")
+        if (apply is None) == (kernel is None):
+            raise ValueError(f"Operation '{name}' needs exactly one of apply or kernel")
+        self.name = name
+        self.describe = describe
+        self.apply = apply
+        self.kind = kind
+        self.params = tuple(params)
+        self.cost = cost
+        self.kernel = kernel
+        self.halo = halo
+        self.fusable = fusable
+        self.aliases = tuple(aliases)
+        self.preserves_shape = preserves_shape
+        self.backends = dict(backends or {})
+        self.tolerance = tolerance
+
+    @property
+    def tileable(self):
+        return self.kernel is not None and self.halo is not None
+
+    def keeps_shape(self, value=None):
+        return self.preserves_shape(value) if callable(self.preserves_shape) else self.preserves_shape
+
+    def region_halo(self, value=None):
+        # Rows/columns of context a region needs around it to come out as in the full image;
+        # global operations have none to give and treat a region as an image of its own
+        if self.kind == "point" or self.halo is None:
+            return 0
+        return self.halo(value)
+
+    def coerce(self, value):
+        # Casts and range-checks the value against the declared parameters
+        label = self.name.replace("_", " ")
+        if not self.params:
+            return value
+        if len(self.params) == 1:
+            return self.params[0].coerce(value, label)
+        values = list(value) if value is not None else []
+        required = sum(1 for p in self.params if not p.optional)
+        if not required <= len(values) <= len(self.params):
+            raise OperationError(f"{label.capitalize()} takes {required} to {len(self.params)} values.")
+        return tuple(p.coerce(v, label) for p, v in zip(self.params, values))
+
+    def unit_cost(self, value=None):
+        return self.cost(value) if callable(self.cost) else self.cost
+
+    def estimate(self, shape, value=None):
+        # Relative cost of running on an image of this shape (pixels x per-pixel cost)
+        return shape[0] * shape[1] * self.unit_cost(value)
+
+    def implementations(self):
+        # Backend name -> apply or kernel, the operation's own first
+        return {DEFAULT_BACKEND: self.apply if self.kernel is None else self.kernel, **self.backends}
+
+    def run_backend(self, backend, image, value, context=None):
+        # One implementation on the whole image, untiled (value is already coerced)
+        implementation = self.implementations()[backend]
+        if self.kernel is None:
+            return implementation(image, value, context)
+        fn = implementation(value)
+        return image if fn is None else fn(image)
+
+    def __call__(self, image, value, context):
+        value = self.coerce(value)
+        tuner = getattr(context, "backends", None)
+        backend = tuner.choose(self, image, value, context) if tuner is not None and self.backends else DEFAULT_BACKEND
+        implementation = self.implementations()[backend] if self.backends else (self.apply or self.kernel)
+        if self.kernel is None:
+            return implementation(image, value, context), self.describe(value)
+        fn = implementation(value)
+        if fn is None: # Identity for this value
+            return image, self.describe(value)
+        tiles = getattr(context, "tiles", None)
+        if tiles is None or not self.tileable:
+            return fn(image), self.describe(value)
+        # Costlier filters are worth splitting at smaller sizes
+        min_pixels = tiles.min_pixels / max(self.unit_cost(value), 1.0)
+        return tiles.run(fn, image, self.halo(value), min_pixels=min_pixels), self.describe(value)
+
+
+class OperationRegistry:
+    # Name -> Operation, with aliases resolving to the same object (one dict lookup)
+    def __init__(self):
+        self._operations = {}
+        self.plugins = []
+
+    def __contains__(self, name):
+        return name in self._operations
+
+    def __iter__(self):
+        # Canonical operations only, in registration order
+        return (op for name, op in self._operations.items() if name == op.name)
+
+    def get(self, name):
+        return self._operations.get(name)
+
+    def register(self, operation, replace=False):
+        for name in (operation.name,) + operation.aliases:
+            if name in self._operations and not replace:
+                raise ValueError(f"Operation '{name}' is already registered")
+        for name in (operation.name,) + operation.aliases:
+            self._operations[name] = operation
+        return operation
+
+    def load_plugins(self, module_names=None):
+        # Imports each plugin module once and lets it register its operations.
+        # A broken plugin is reported and skipped, so the editor still starts.
+        if module_names is None:
+            module_names = [n.strip() for n in os.environ.get(PLUGINS_ENV, "").split(",") if n.strip()]
+        for module_name in module_names:
+            if module_name in self.plugins:
+                continue
+            try:
+                module = importlib.import_module(module_name)
+                module.register_operations(self)
+                self.plugins.append(module_name)
+            except Exception as e:
+                print(f"WARNING: could not load operation plugin '{module_name}': {e}")
+        return self.plugins
+
+
+registry = OperationRegistry()
+register = registry.register
+
+
+# --- Helpers ---
+def _odd_kernel(value):
+    ksize = int(value)
+    return ksize + 1 if ksize % 2 == 0 else ksize
+
+def sobel(image):
+    gray = luma(image)
+    sobelx = cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=3)
+    sobely = cv2.Sobel(gray, cv2.CV_64F, 0, 1, ksize=3)
+    return cv2.convertScaleAbs(cv2.magnitude(sobelx, sobely))
+
+def _fill_color(image):
+    # White background for RGB, transparent for RGBA (as before), black for grayscale
+    if image.ndim == 2: return 0
+    return (255, 255, 255) if image.shape[2] == 3 else (0, 0, 0, 0)
+
+def _point(name, backend=None):
+    return lambda image, value, context: apply_point_chain(image, [(name, value)], backend)
+
+def _point_operation(name, describe, params=(), aliases=()):
+    # Fusable LUT operation; alone, its table can also be applied by NumPy or PIL
+    return Operation(name, describe, apply=_point(name), kind="point", params=params, fusable=True, aliases=aliases,
+                     backends={"numpy": _point(name, "numpy"), "pil": _point(name, "pil")})
+
+def _pil(fn):
+    # Runs fn(PIL image) -> PIL image on an array
+    return lambda image: np.asarray(fn(Image.fromarray(image)))
+
+def _numpy_luma(image):
+    # PIL's integer weights and rounding
+    if image.ndim == 2:
+        return image
+    weights = np.array([19595, 38470, 7471], dtype=np.uint32)
+    return ((image[..., :3].astype(np.uint32) @ weights + 0x8000) >> 16).astype(np.uint8)
+
+_KERNEL = Param("kernel size", int, minimum=0)
+
+
+# --- Transform Operations ---
+def _rotate(image, value, context):
+    height, width = image.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), value, 1.0)
+    cos, sin = abs(matrix[0, 0]), abs(matrix[0, 1])
+    new_width, new_height = int(round(height * sin + width * cos)), int(round(height * cos + width * sin))
+    matrix[0, 2] += new_width / 2 - width / 2
+    matrix[1, 2] += new_height / 2 - height / 2
+    return cv2.warpAffine(image, matrix, (new_width, new_height), flags=cv2.INTER_NEAREST,
+                          borderMode=cv2.BORDER_CONSTANT, borderValue=_fill_color(image))
+
+def _resize(image, value, context):
+    height, width = image.shape[:2]
+    new_width, new_height = int(width * value), int(height * value)
+    if new_width <= 0 or new_height <= 0:
+        raise OperationError("Resize resulted in zero dimension.")
+    # Area averaging when shrinking (anti-aliased like PIL's LANCZOS), Lanczos when enlarging
+    interpolation = cv2.INTER_AREA if value < 1.0 else cv2.INTER_LANCZOS4
+    return cv2.resize(image, (new_width, new_height), interpolation=interpolation)
+
+register(Operation("rotate_left", lambda value: "Rotated 90° Left", kind="global", cost=2.0, preserves_shape=False,
+                   apply=lambda image, value, context: cv2.rotate(image, cv2.ROTATE_90_COUNTERCLOCKWISE),
+                   backends={"numpy": lambda image, value, context: np.ascontiguousarray(np.rot90(image, 1))}))
+register(Operation("rotate_right", lambda value: "Rotated 90° Right", kind="global", cost=2.0, preserves_shape=False,
+                   apply=lambda image, value, context: cv2.rotate(image, cv2.ROTATE_90_CLOCKWISE),
+                   backends={"numpy": lambda image, value, context: np.ascontiguousarray(np.rot90(image, -1))}))
+register(Operation("rotate", lambda value: f"Rotated by {value} degrees", apply=_rotate, kind="global", preserves_shape=False,
+                   params=[Param("angle", int)], cost=4.0))
+register(Operation("flip_horizontal", lambda value: "Flipped horizontally", kind="global",
+                   apply=lambda image, value, context: cv2.flip(image, 1),
+                   backends={"numpy": lambda image, value, context: np.ascontiguousarray(image[:, ::-1])}))
+register(Operation("flip_vertical", lambda value: "Flipped vertically", kind="global",
+                   apply=lambda image, value, context: cv2.flip(image, 0),
+                   backends={"numpy": lambda image, value, context: np.ascontiguousarray(image[::-1])}))
+register(Operation("resize", lambda value: f"Resized to {value*100:.0f}%", apply=_resize, kind="global", preserves_shape=False,
+                   params=[Param("scale", float, 0.01, 5.0)], cost=lambda value: 3.0 * max(1.0, value * value),
+                   aliases=["resize_preview"]))
+
+# --- Filter Operations ---
+register(Operation("grayscale", lambda value: "Converted to Grayscale", kind="point",
+                   apply=lambda image, value, context: luma(image), # Alpha is dropped, as PIL's RGBA -> RGB -> L did
+                   backends={"numpy": lambda image, value, context: _numpy_luma(image),
+                             "pil": lambda image, value, context: np.asarray(Image.fromarray(image).convert("L"))},
+                   tolerance=1)) # OpenCV rounds its fixed-point weights differently
+register(Operation("gaussian_blur", lambda value: f"Gaussian Blur (kernel: {_odd_kernel(value)})", kind="local",
+                   params=[_KERNEL], cost=lambda value: 1.0 + 0.5 * _odd_kernel(value),
+                   # PIL's GaussianBlur radius is the standard deviation
+                   kernel=lambda value: (lambda tile: cv2.GaussianBlur(tile, (0, 0), sigmaX=_odd_kernel(value) // 2))
+                                        if _odd_kernel(value) // 2 > 0 else None,
+                   halo=lambda value: gaussian_halo(_odd_kernel(value) // 2),
+                   # PIL approximates the Gaussian with box blurs: constant cost, within 3 levels
+                   backends={"pil": lambda value: _pil(lambda image: image.filter(ImageFilter.GaussianBlur(_odd_kernel(value) // 2)))
+                                                  if _odd_kernel(value) // 2 > 0 else None},
+                   tolerance=3))
+register(Operation("median_blur", lambda value: f"Median Blur (kernel: {_odd_kernel(value)})", kind="local",
+                   params=[_KERNEL], cost=lambda value: 2.0 + _odd_kernel(value),
+                   kernel=lambda value: lambda tile: cv2.medianBlur(tile, _odd_kernel(value)),
+                   halo=lambda value: _odd_kernel(value) // 2))
+
+# --- Edge Detection ---
+register(Operation("sobel", lambda value: "Sobel Edge Detection", kind="local", cost=8.0,
+                   kernel=lambda value: sobel, halo=lambda value: 1))
+register(Operation("canny", lambda value: f"Canny Edge (T1:{value[0]}, T2:{value[1]})", kind="global",
+                   params=[Param("threshold 1", int, 0), Param("threshold 2", int, 0)], cost=10.0,
+                   apply=lambda image, value, context: cv2.Canny(luma(image), value[0], value[1]),
+                   aliases=["canny_preview"]))
+
+# --- Morphology & Threshold ---
+# Square structuring elements of any size; see morphology.py for the engines
+def _morphology(fn):
+    def kernel(value):
+        ksize = _odd_kernel(value)
+        return (lambda tile: fn(tile, ksize)) if ksize > 1 else None
+    return kernel
+
+def _morphology_engines(fn):
+    # The size- and channel-based choice in morphology.py is the default; the tuner can measure each engine
+    return {engine: _morphology(lambda tile, ksize: fn(tile, ksize, engine)) for engine in morphology.ENGINES}
+
+def _morphology_operation(name, label, fn, passes=1):
+    # passes: erosions/dilations run in sequence, each one widening the halo by the kernel radius
+    return Operation(name, lambda value: f"{label} (kernel: {_odd_kernel(value)})", kind="local", params=[_KERNEL],
+                     cost=lambda value: passes * morphology.unit_cost(_odd_kernel(value)), kernel=_morphology(fn),
+                     halo=lambda value: passes * (_odd_kernel(value) // 2), backends=_morphology_engines(fn))
+
+register(_point_operation("threshold", lambda value: f"Binary Threshold at {value}", params=[Param("level", int, 0, 255)]))
+register(_morphology_operation("erosion", "Erosion", morphology.erode))
+register(_morphology_operation("dilation", "Dilation", morphology.dilate))
+register(_morphology_operation("opening", "Opening", morphology.opening, passes=2))
+register(_morphology_operation("closing", "Closing", morphology.closing, passes=2))
+# Both passes read the same input, so the halo is one radius
+register(Operation("gradient", lambda value: f"Morphological Gradient (kernel: {_odd_kernel(value)})", kind="local",
+                   params=[_KERNEL], cost=lambda value: 2 * morphology.unit_cost(_odd_kernel(value)),
+                   kernel=lambda value: lambda tile: morphology.gradient(tile, _odd_kernel(value)), # Not the identity at 1
+                   halo=lambda value: _odd_kernel(value) // 2,
+                   backends={engine: lambda value, engine=engine: lambda tile: morphology.gradient(tile, _odd_kernel(value), engine)
+                             for engine in morphology.ENGINES}))
+
+# --- Adjustments (point operations, see lut.py) ---
+register(_point_operation("brightness", lambda value: f"Brightness: {value:.2f}", params=[Param("factor", float, 0.0)],
+                          aliases=["brightness_preview"]))
+register(_point_operation("contrast", lambda value: f"Contrast: {value:.2f}", params=[Param("factor", float, 0.0)],
+                          aliases=["contrast_preview"]))
+register(_point_operation("gamma", lambda value: f"Gamma: {value:.2f}", params=[Param("gamma", float, 0.01)]))
+register(_point_operation("levels", lambda value: f"Levels: {value[0]:g}-{value[1]:g} -> {value[2]:g}-{value[3]:g}",
+                          params=[Param("input black", float, 0, 255), Param("input white", float, 0, 255),
+                                  Param("output black", float, 0, 255), Param("output white", float, 0, 255),
+                                  Param("gamma", float, 0.01, optional=True)]))
+register(_point_operation("invert", lambda value: "Inverted"))
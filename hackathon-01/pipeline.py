@@ -0,0 +1,128 @@
+# pipeline.py
+import json
+
+from lut import apply_point_chain
+from operations import registry
+
+RECIPE_VERSION = 1
+
+
+class PipelineNode:
+    def __init__(self, operation, value=None):
+        self.operation = operation
+        self.value = value
+
+    def to_dict(self):
+        return {"operation": self.operation, "value": self.value}
+
+
+class Pipeline:
+    # An ordered list of operation nodes applied to a source image (a uint8 NumPy array).
+    # Results are evaluated lazily and cached per node, so changing a node only recomputes
+    # the nodes after it.
+    def __init__(self, compute_fn, source=None, cache_budget_bytes=256 * 1024 * 1024):
+        # compute_fn(image, operation_name, value) -> new image
+        self._compute_fn = compute_fn
+        self.cache_budget_bytes = cache_budget_bytes
+        self.source = source
+        self.nodes = []
+        self._cache = {}
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def reset(self, source=None):
+        # source may be a zero-argument callable; it is only called when evaluation needs it
+        self.source = source
+        self.nodes = []
+        self._cache = {}
+
+    def append(self, operation, value=None, result=None):
+        # result lets a caller that already computed this node seed the cache
+        self.nodes.append(PipelineNode(operation, value))
+        if result is not None:
+            self._store(len(self.nodes) - 1, result)
+
+    def pop(self):
+        if not self.nodes:
+            return None
+        self._invalidate(len(self.nodes) - 1)
+        return self.nodes.pop()
+
+    def remove(self, index):
+        self._invalidate(index)
+        return self.nodes.pop(index)
+
+    def set_value(self, index, value):
+        if self.nodes[index].value != value:
+            self.nodes[index].value = value
+            self._invalidate(index)
+
+    def evaluate(self):
+        if self.source is None:
+            return None
+        if callable(self.source):
+            self.source = self.source()
+        start, image = 0, self.source
+        for index in range(len(self.nodes) - 1, -1, -1):
+            if index in self._cache:
+                start, image = index + 1, self._cache[index]
+                break
+
+        index = start
+        while index < len(self.nodes):
+            end = index
+            while end < len(self.nodes) and self._fusable(self.nodes[end].operation):
+                end += 1
+            if end - index > 1:
+                steps = []
+                for node in self.nodes[index:end]:
+                    operation = registry.get(node.operation)
+                    steps.append((operation.name, operation.coerce(node.value)))
+                image = apply_point_chain(image, steps)
+                self._store(end - 1, image)
+                index = end
+            else:
+                node = self.nodes[index]
+                image = self._compute_fn(image, node.operation, node.value)
+                self._store(index, image)
+                index += 1
+        return image
+
+    def to_json(self):
+        return json.dumps({"version": RECIPE_VERSION, "nodes": [node.to_dict() for node in self.nodes]}, indent=2)
+
+    def save(self, filepath):
+        with open(filepath, "w") as f:
+            f.write(self.to_json())
+
+    @staticmethod
+    def steps_from_json(text):
+        recipe = json.loads(text)
+        if recipe.get("version") != RECIPE_VERSION:
+            raise ValueError(f"Unsupported recipe version: {recipe.get('version')}")
+        return [(node["operation"], node.get("value")) for node in recipe["nodes"]]
+
+    @staticmethod
+    def load_steps(filepath):
+        with open(filepath) as f:
+            return Pipeline.steps_from_json(f.read())
+
+    @staticmethod
+    def _fusable(operation_name):
+        operation = registry.get(operation_name)
+        return operation is not None and operation.fusable
+
+    def _invalidate(self, index):
+        for cached_index in [i for i in self._cache if i >= index]:
+            del self._cache[cached_index]
+
+    def _store(self, index, image):
+        self._cache[index] = image
+        # The newest result is always kept; older intermediates are dropped oldest first
+        cached = sorted(self._cache)
+        total = sum(self._cache[i].nbytes for i in cached)
+        for cached_index in cached:
+            if total <= self.cache_budget_bytes or cached_index == cached[-1]:
+                break
+            total -= self._cache.pop(cached_index).nbytes
@@ -0,0 +1,124 @@
+# roi.py
+# Operations limited to a selection. The "roi" operation wraps another one: it computes
+# only the selection's bounding box plus the wrapped operation's halo, crops the halo off,
+# blends through the mask if there is one, and pastes the box back into a copy of the
+# image. Its value is a plain dict, so it replays from history and saves into recipes:
+#   {"operation": name, "value": value, "box": [left, top, right, bottom], "mask": str or None}
+import base64
+import zlib
+
+import cv2
+import numpy as np
+
+from lut import luma
+from operations import Operation, OperationError, register, registry
+
+
+class Selection:
+    # A rectangle in image pixels, optionally refined by a boolean mask of the rectangle's size
+    def __init__(self, box, mask=None):
+        left, top, right, bottom = (int(v) for v in box)
+        if right <= left or bottom <= top:
+            raise OperationError("Empty selection.")
+        self.box = (left, top, right, bottom)
+        self.mask = None
+        if mask is not None:
+            mask = np.asarray(mask, dtype=bool)
+            if mask.shape != (bottom - top, right - left):
+                raise OperationError("Selection mask does not match its box.")
+            self.mask = mask
+
+    @classmethod
+    def from_mask(cls, mask):
+        # Full-image mask -> selection cropped to the mask's bounding box
+        mask = np.asarray(mask, dtype=bool)
+        rows, cols = np.flatnonzero(mask.any(axis=1)), np.flatnonzero(mask.any(axis=0))
+        if rows.size == 0:
+            raise OperationError("Empty selection.")
+        top, bottom, left, right = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+        box_mask = mask[top:bottom, left:right]
+        return cls((left, top, right, bottom), None if box_mask.all() else box_mask)
+
+    def clipped(self, shape):
+        # The box limited to an image of this shape; None if they do not overlap
+        height, width = shape[:2]
+        left, top, right, bottom = self.box
+        box = (max(left, 0), max(top, 0), min(right, width), min(bottom, height))
+        if box[2] <= box[0] or box[3] <= box[1]:
+            return None
+        return box
+
+    def wrap(self, operation_name, value):
+        # The value of the "roi" operation that applies operation_name inside this selection
+        mask = None
+        if self.mask is not None:
+            packed = np.packbits(self.mask, axis=None).tobytes()
+            mask = base64.b64encode(zlib.compress(packed)).decode("ascii")
+        return {"operation": operation_name, "value": value, "box": list(self.box), "mask": mask}
+
+    @classmethod
+    def from_value(cls, value):
+        left, top, right, bottom = value["box"]
+        mask = None
+        if value.get("mask"):
+            bits = np.frombuffer(zlib.decompress(base64.b64decode(value["mask"])), dtype=np.uint8)
+            size = (bottom - top) * (right - left)
+            mask = np.unpackbits(bits, count=size).astype(bool).reshape(bottom - top, right - left)
+        return cls((left, top, right, bottom), mask)
+
+
+def _match_channels(region, like):
+    # Operations such as grayscale or sobel return one channel; a selection inside a colour
+    # image gets it on every colour channel, with the image's own alpha kept
+    if region.ndim == like.ndim:
+        return region
+    if region.ndim == 3:
+        return luma(region)
+    gray = cv2.cvtColor(region, cv2.COLOR_GRAY2RGB)
+    return gray if like.shape[2] == 3 else np.dstack([gray, like[..., 3]])
+
+
+def _inner(value):
+    operation = registry.get(value["operation"])
+    if operation is None:
+        raise OperationError(f"Unknown operation: {value['operation']}")
+    if operation.name == "roi":
+        raise OperationError("Selections cannot be nested.")
+    inner_value = operation.coerce(value["value"])
+    if not operation.keeps_shape(inner_value):
+        raise OperationError(f"{operation.describe(inner_value)} can't be limited to a selection.")
+    return operation, inner_value
+
+
+def apply_in_selection(image, value, context):
+    operation, inner_value = _inner(value)
+    selection = Selection.from_value(value)
+    box = selection.clipped(image.shape)
+    if box is None:
+        return image # Selection lies outside the image
+    left, top, right, bottom = box
+    height, width = image.shape[:2]
+    halo = operation.region_halo(inner_value)
+    padded = (max(left - halo, 0), max(top - halo, 0), min(right + halo, width), min(bottom + halo, height))
+    result, _ = operation(image[padded[1]:padded[3], padded[0]:padded[2]], inner_value, context)
+    if result is None:
+        return None
+    result = result[top - padded[1]:bottom - padded[1], left - padded[0]:right - padded[0]]
+    original = image[top:bottom, left:right]
+    result = _match_channels(result, original)
+    if selection.mask is not None:
+        mask = selection.mask[top - selection.box[1]:bottom - selection.box[1], left - selection.box[0]:right - selection.box[0]]
+        result = np.where(mask[..., None] if result.ndim == 3 else mask, result, original)
+    # Arrays are never modified in place: one copy of the image, then only the box is written
+    output = image.copy()
+    output[top:bottom, left:right] = result
+    return output
+
+
+def _describe(value):
+    operation, inner_value = _inner(value)
+    return f"{operation.describe(inner_value)} (selection)"
+
+
+register(Operation("roi", _describe, apply=apply_in_selection, kind="global",
+                   cost=lambda value: registry.get(value["operation"]).unit_cost(value["value"])))
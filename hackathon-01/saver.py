@@ -0,0 +1,137 @@
+# saver.py
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+from PIL import Image
+
+from tracing import tracer
+
+TEMP_MARKER = ".partial"
+PROGRESS_STEP_BYTES = 1024 * 1024   # Progress is reported at most once per this many bytes written
+SAVE_WORKERS = 2                     # Exports encoded at once; PIL's encoders release the GIL
+
+
+def format_for_path(output_path):
+    ext = os.path.splitext(output_path)[1].lower()
+    image_format = Image.registered_extensions().get(ext)
+    if image_format is None:
+        raise ValueError(f"Unknown output format: {ext}")
+    return image_format
+
+
+def encoder_options(image_format, fast=False, progressive=False, compress_level=None, quality=None):
+    # Keyword arguments for PIL's save(); with no arguments the output matches PIL's defaults.
+    # fast trades file size for encoding speed (PNG deflate level 1, WebP method 0), and
+    # optimisation passes are always off: they re-encode the whole image a second time.
+    options = {}
+    if image_format == "PNG":
+        options["optimize"] = False
+        if fast or compress_level is not None:
+            options["compress_level"] = compress_level if compress_level is not None else 1
+    elif image_format in ("JPEG", "WEBP"):
+        if quality is not None:
+            options["quality"] = quality
+        if image_format == "JPEG":
+            options["optimize"] = False
+            options["progressive"] = progressive
+        elif fast:
+            options["method"] = 0
+    elif image_format == "TIFF" and (fast or compress_level is not None):
+        options["compression"] = "tiff_adobe_deflate"
+        options["compress_level"] = compress_level if compress_level is not None else 1
+    return options
+
+
+class _ProgressFile:
+    # File wrapper that reports how many bytes the encoder has streamed out so far
+    def __init__(self, fileobj, callback):
+        self._file = fileobj
+        self._callback = callback
+        self.written = 0
+        self._reported = 0
+
+    def write(self, data):
+        count = self._file.write(data)
+        self.written += len(data)
+        if self.written - self._reported >= PROGRESS_STEP_BYTES:
+            self._reported = self.written
+            self._callback(self.written)
+        return count
+
+    def __getattr__(self, name): # seek/tell/flush for encoders that rewrite headers (TIFF)
+        return getattr(self._file, name)
+
+
+def write_atomic(image, output_path, options=None, progress=None):
+    # Encodes the uint8 array (ImageLogic's working format) to a temporary name in the same
+    # directory, then renames it over the target, so an interrupted save never leaves a
+    # truncated file under the final name. progress(bytes_written) is called while encoding.
+    directory, name = os.path.split(output_path)
+    image_format = format_for_path(output_path)
+    if image_format == "JPEG" and image.ndim == 3 and image.shape[2] == 4:
+        image = image[..., :3]
+    if options is None:
+        options = encoder_options(image_format)
+    temp_path = os.path.join(directory, f".{name}.{os.getpid()}-{threading.get_ident()}{TEMP_MARKER}")
+    try:
+        with open(temp_path, "wb") as f:
+            target = _ProgressFile(f, progress) if progress else f
+            Image.fromarray(image).save(target, format=image_format, **options)
+            f.flush()
+            os.fsync(f.fileno()) # On disk before the rename, so a crash cannot leave an empty output
+        os.replace(temp_path, output_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return os.path.getsize(output_path)
+
+
+class BackgroundSaver:
+    # Encodes and writes images on worker threads. Working arrays are never modified in
+    # place, so the array passed in already is a snapshot: later edits replace it rather than
+    # change it, and no copy is made. Several exports of one snapshot (other formats or
+    # sizes) can be queued and are encoded in parallel.
+    def __init__(self, max_workers=SAVE_WORKERS):
+        self.max_workers = max_workers
+        self._pool = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def submit(self, image, output_path, options=None, scale=None, progress=None):
+        # Returns a Future resolving to the written file size. scale resizes the snapshot
+        # first; progress(output_path, bytes_written) runs on the worker thread.
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="save")
+        with self._lock:
+            self._pending += 1
+        future = self._pool.submit(self._save, image, output_path, options, scale, progress)
+        future.add_done_callback(self._finished)
+        return future
+
+    def _save(self, image, output_path, options, scale, progress):
+        with tracer.span("save", "conversion", shape=image.shape):
+            return self._encode(image, output_path, options, scale, progress)
+
+    def _encode(self, image, output_path, options, scale, progress):
+        if scale is not None and scale != 1.0:
+            height, width = image.shape[:2]
+            size = (max(1, int(width * scale)), max(1, int(height * scale)))
+            image = cv2.resize(image, size, interpolation=cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LANCZOS4)
+        report = (lambda written: progress(output_path, written)) if progress else None
+        return write_atomic(image, output_path, options, report)
+
+    def _finished(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    def shutdown(self, wait=True):
+        # Waits for queued saves by default, so closing the editor never drops one
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
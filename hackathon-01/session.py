@@ -0,0 +1,181 @@
+# session.py
+# Recently opened documents, so switching between files does not decode them again or
+# lose their edits. Each Document keeps what ImageLogic needs to resume it: the source,
+# decoded original, preview, working image, undo history, recipe and selection.
+# Documents are held in memory up to a byte budget; beyond it, the least recently used
+# ones are spilled to a compressed scratch file (working image, history, recipe and
+# selection; the original is read from its file again) and restored when switched to.
+import atexit
+import os
+import pickle
+import shutil
+import tempfile
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+SESSION_BUDGET_BYTES = 1024 * 1024 * 1024   # In-memory documents, not counting the open one
+MAX_SPILLED_DOCUMENTS = 16                  # Beyond this, the oldest spilled documents are dropped
+SPILL_COMPRESS_LEVEL = 1                    # zlib level: favour speed, as history does
+
+
+class Document:
+    def __init__(self, filepath, source, original_image, current_image, preview, history, pipeline, selection):
+        self.filepath = filepath
+        self.source = source
+        self.original_image = original_image
+        self.current_image = current_image
+        self.preview = preview
+        self.history = history
+        self.pipeline = pipeline
+        self.selection = selection
+        self.mtime = _mtime(filepath)
+        self.spill_path = None # Set while the document's state lives in the scratch store
+
+    @property
+    def spilled(self):
+        return self.spill_path is not None
+
+    def is_stale(self):
+        # The file changed since it was opened: its history no longer applies to it
+        return _mtime(self.filepath) != self.mtime
+
+    def nbytes(self):
+        # Arrays are shared (current may be the original, the recipe may hold the original),
+        # so each one is counted once; memory-mapped files count 0
+        total = self.source.nbytes + self.history.total_bytes
+        # The original is the source's own array, already counted above
+        seen = {id(self.original_image)}
+        for array in (self.current_image, self.preview):
+            if array is not None and id(array) not in seen:
+                seen.add(id(array))
+                total += 0 if _is_mapped(array) else array.nbytes
+        return total
+
+
+def _mtime(filepath):
+    try:
+        return os.stat(filepath).st_mtime_ns
+    except OSError:
+        return None
+
+def _is_mapped(array):
+    base = array
+    while base is not None:
+        if isinstance(base, np.memmap):
+            return True
+        base = getattr(base, "base", None)
+    return False
+
+
+class DocumentCache:
+    # LRU of Documents keyed by file path; the most recently used document is last
+    def __init__(self, budget_bytes=SESSION_BUDGET_BYTES, max_spilled=MAX_SPILLED_DOCUMENTS, scratch_dir=None):
+        self.budget_bytes = budget_bytes
+        self.max_spilled = max_spilled
+        self._scratch_dir = scratch_dir
+        self._owns_scratch_dir = scratch_dir is None
+        self._documents = OrderedDict()
+
+    def __len__(self):
+        return len(self._documents)
+
+    def __contains__(self, filepath):
+        return filepath in self._documents
+
+    def paths(self):
+        # Most recently used first
+        return list(reversed(self._documents))
+
+    def put(self, document):
+        self._documents[document.filepath] = document
+        self._documents.move_to_end(document.filepath)
+        self._enforce()
+
+    def take(self, filepath):
+        # Removes and returns the document, brought back from the scratch store if it was
+        # spilled; None if it is not in the session
+        document = self._documents.pop(filepath, None)
+        if document is not None and document.spilled:
+            self._unspill(document)
+        return document
+
+    def discard(self, filepath):
+        document = self._documents.pop(filepath, None)
+        if document is not None and document.spilled:
+            _remove(document.spill_path)
+
+    def memory_bytes(self):
+        return sum(document.nbytes() for document in self._documents.values() if not document.spilled)
+
+    def clear(self):
+        for filepath in list(self._documents):
+            self.discard(filepath)
+        if self._owns_scratch_dir and self._scratch_dir is not None:
+            shutil.rmtree(self._scratch_dir, ignore_errors=True)
+            self._scratch_dir = None
+
+    def _enforce(self):
+        # Spill from the least recently used end until the in-memory documents fit
+        in_memory = [document for document in self._documents.values() if not document.spilled]
+        total = sum(document.nbytes() for document in in_memory)
+        for document in in_memory:
+            if total <= self.budget_bytes:
+                break
+            size = document.nbytes()
+            self._spill(document)
+            total -= size
+        spilled = [path for path, document in self._documents.items() if document.spilled]
+        for filepath in spilled[:max(0, len(spilled) - self.max_spilled)]:
+            self.discard(filepath)
+
+    def _scratch(self):
+        if self._scratch_dir is None:
+            self._scratch_dir = tempfile.mkdtemp(prefix="image-editor-session-")
+            atexit.register(self.clear)
+        return self._scratch_dir
+
+    def _spill(self, document):
+        state = {
+            "current_image": document.current_image,
+            "history": document.history.export_state(),
+            "nodes": document.pipeline.nodes,
+            "selection": document.selection,
+        }
+        data = zlib.compress(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL), SPILL_COMPRESS_LEVEL)
+        fd, path = tempfile.mkstemp(suffix=".doc", dir=self._scratch())
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+        except OSError:
+            _remove(path)
+            raise
+        document.spill_path = path
+        document.source.release()
+        document.original_image = document.current_image = document.preview = None
+        document.history.reset()
+        document.pipeline.reset()
+        document.selection = None
+
+    def _unspill(self, document):
+        with open(document.spill_path, "rb") as f:
+            state = pickle.loads(zlib.decompress(f.read()))
+        _remove(document.spill_path)
+        document.spill_path = None
+        # The original is read from its file again, only when something needs it
+        current_image = state["current_image"]
+        if current_image is not None:
+            current_image.flags.writeable = False
+        document.current_image = current_image
+        document.history.import_state(state["history"], document.source.load)
+        document.pipeline.reset(document.source.load)
+        document.pipeline.nodes = state["nodes"]
+        document.selection = state["selection"]
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
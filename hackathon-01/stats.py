@@ -0,0 +1,84 @@
+# stats.py
+from collections import OrderedDict
+
+import numpy as np
+
+from lut import channel_histograms, luma
+
+STATS_PROXY_SIDE = 512     # Statistics are taken on a strided sample no larger than this per side
+STATS_CACHE_SIZE = 16      # Results kept, keyed by the caller's image generation
+HISTOGRAM_HEIGHT = 80
+_CHANNEL_COLORS = {1: [(200, 200, 200)], 3: [(230, 60, 60), (60, 200, 60), (70, 110, 240)]}
+
+
+def sample(array, max_side=STATS_PROXY_SIDE):
+    # Every step-th row and column: a zero-copy view, so only the sampled rows are touched
+    step = max(1, -(-max(array.shape[:2]) // max_side))
+    return array[::step, ::step] if step > 1 else array
+
+
+def otsu_threshold(histogram):
+    # Otsu's threshold from a 256-bin histogram: the level maximising the between-class
+    # variance. Pixels above the returned level are foreground, as in the threshold op.
+    counts = np.asarray(histogram, dtype=np.float64)
+    total = counts.sum()
+    if total == 0:
+        return 127
+    levels = np.arange(256, dtype=np.float64)
+    weight = np.cumsum(counts) / total
+    mean = np.cumsum(counts * levels) / total
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = (mean[-1] * weight - mean) ** 2 / (weight * (1.0 - weight))
+    return int(np.argmax(np.nan_to_num(between[:-1], nan=0.0)))
+
+
+class ImageStats:
+    # Per-channel histograms and summary numbers for one image (alpha is ignored)
+    def __init__(self, array, max_side=STATS_PROXY_SIDE):
+        proxy = np.ascontiguousarray(sample(array, max_side))
+        color_channels = 1 if proxy.ndim == 2 else 3
+        self.histograms = channel_histograms(proxy, color_channels)
+        self.luma_histogram = self.histograms[0] if color_channels == 1 else channel_histograms(luma(proxy), 1)[0]
+        self.pixels = float(self.luma_histogram.sum())
+        levels = np.arange(256, dtype=np.float64)
+        self.means = [float(np.dot(h, levels)) / self.pixels for h in self.histograms]
+        # Share of pixels with a channel at 0 (shadows) or 255 (highlights), worst channel
+        self.clipped_shadows = max(float(h[0]) for h in self.histograms) / self.pixels
+        self.clipped_highlights = max(float(h[255]) for h in self.histograms) / self.pixels
+        self.otsu_threshold = otsu_threshold(self.luma_histogram)
+
+    def summary(self):
+        names = ["L"] if len(self.means) == 1 else ["R", "G", "B"]
+        means = "  ".join(f"{name} {mean:.1f}" for name, mean in zip(names, self.means))
+        return (f"Mean {means}   Clipped {self.clipped_shadows * 100:.1f}% shadows, "
+                f"{self.clipped_highlights * 100:.1f}% highlights   Otsu {self.otsu_threshold}")
+
+    def render(self, height=HISTOGRAM_HEIGHT):
+        # 256 x height RGB image of the histograms, channels drawn additively over black
+        image = np.zeros((height, 256, 3), dtype=np.uint16)
+        rows = np.arange(height, 0, -1)[:, None]
+        for counts, color in zip(self.histograms, _CHANNEL_COLORS[len(self.histograms)]):
+            # Scale to the tallest inner bin, so a spike of clipped pixels does not flatten the rest
+            peak = max(float(counts[1:255].max()), 1.0)
+            bars = np.minimum(counts / peak, 1.0) * height
+            image[rows <= bars[None, :]] += np.array(color, dtype=np.uint16)
+        return np.minimum(image, 255).astype(np.uint8)
+
+
+class StatsCache:
+    # Small LRU of ImageStats keyed by image generation; computing is left to the caller
+    def __init__(self, size=STATS_CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        stats = self._entries.get(key)
+        if stats is not None:
+            self._entries.move_to_end(key)
+        return stats
+
+    def put(self, key, stats):
+        self._entries[key] = stats
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
@@ -0,0 +1,238 @@
+# stream.py
+# Runs an operation chain on live frames from a camera or a video file:
+#
+#   python stream.py --source 0 --recipe "grayscale -> canny 50,150"
+#   python stream.py --source clip.mp4 --recipe edits.json --frames 300
+#
+# A capture thread reads frames with cv2.VideoCapture into a single-slot mailbox and a
+# processing thread always takes the newest one, so when processing is slower than the
+# source, stale frames are dropped instead of queueing up latency. Video files are paced
+# at their own frame rate, so they behave like a camera.
+import argparse
+import sys
+import threading
+import time
+from collections import deque
+
+import cv2
+
+from batch import load_recipe
+from logic import ImageLogic
+
+STATS_WINDOW = 60          # Frames the FPS and latency figures are averaged over
+STAGES = ("capture", "wait", "process", "deliver", "total")
+
+
+class StreamStats:
+    # Rolling per-stage latencies (ms) and achieved frame rate, shared by both threads
+    def __init__(self, window=STATS_WINDOW):
+        self._lock = threading.Lock()
+        self._stages = {stage: deque(maxlen=window) for stage in STAGES}
+        self._done_times = deque(maxlen=window)
+        self.captured = 0
+        self.processed = 0
+        self.dropped = 0
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self._stages[stage].append(seconds * 1000.0)
+
+    def count(self, captured=0, processed=0, dropped=0):
+        with self._lock:
+            self.captured += captured
+            self.processed += processed
+            self.dropped += dropped
+            if processed:
+                self._done_times.append(time.perf_counter())
+
+    def fps(self):
+        with self._lock:
+            if len(self._done_times) < 2:
+                return 0.0
+            return (len(self._done_times) - 1) / (self._done_times[-1] - self._done_times[0])
+
+    def latencies(self):
+        with self._lock:
+            return {stage: (sum(values) / len(values) if values else 0.0) for stage, values in self._stages.items()}
+
+    def summary(self):
+        latencies = self.latencies()
+        stages = "  ".join(f"{stage} {latencies[stage]:.1f}ms" for stage in STAGES)
+        return f"{self.fps():.1f} FPS  {stages}  dropped {self.dropped}/{self.captured}"
+
+
+class _LatestFrame:
+    # Single-slot mailbox: put() replaces an untaken frame (counted as dropped)
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._item = None
+        self.closed = False
+
+    def put(self, item):
+        with self._condition:
+            replaced = self._item is not None
+            self._item = item
+            self._condition.notify()
+            return replaced
+
+    def take(self, timeout=None):
+        with self._condition:
+            if self._item is None and not self.closed:
+                self._condition.wait(timeout)
+            item, self._item = self._item, None
+            return item
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+
+def parse_source(text):
+    # "0" -> camera index 0, anything else is a file path or stream URL
+    return int(text) if str(text).isdigit() else text
+
+
+class VideoStream:
+    # on_frame(original, processed, stats) runs on the processing thread with uint8 RGB(A)/L
+    # arrays in ImageLogic's working format; on_finished(error) once the stream ends.
+    def __init__(self, source, steps=(), on_frame=None, on_finished=None, logic=None, realtime=None,
+                 loop=False, max_frames=None):
+        self.source = parse_source(source)
+        self.steps = tuple(steps)
+        self.on_frame = on_frame
+        self.on_finished = on_finished
+        # Headless ImageLogic for dispatch; no history is kept for stream frames
+        self.logic = logic or ImageLogic(keep_history=False)
+        self.realtime = realtime # None: pace files at their frame rate, cameras as they deliver
+        self.loop = loop
+        self.max_frames = max_frames
+        self.stats = StreamStats()
+        self.error = None
+        self._mailbox = _LatestFrame()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def set_steps(self, steps):
+        # Takes effect from the next frame; a tuple swap is atomic, so no lock is needed
+        self.steps = tuple(steps)
+
+    def start(self):
+        self._threads = [threading.Thread(target=self._capture, name="stream-capture", daemon=True),
+                         threading.Thread(target=self._process, name="stream-process", daemon=True)]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._mailbox.close()
+
+    def join(self, timeout=None):
+        for thread in self._threads:
+            thread.join(timeout)
+
+    @property
+    def running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def _capture(self):
+        capture = cv2.VideoCapture(self.source)
+        try:
+            if not capture.isOpened():
+                raise OSError(f"Could not open video source: {self.source}")
+            is_file = isinstance(self.source, str)
+            fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+            interval = 1.0 / fps if (self.realtime if self.realtime is not None else is_file) and fps > 0 else 0.0
+            next_due = time.perf_counter()
+            frames = 0
+            rewound = False
+            while not self._stop.is_set() and (self.max_frames is None or frames < self.max_frames):
+                start = time.perf_counter()
+                ok, frame = capture.read()
+                if not ok:
+                    if rewound:
+                        # Seeking did not work (some containers and backends): stop rather than spin
+                        raise OSError(f"Could not rewind video source to loop it: {self.source}")
+                    if is_file and self.loop and frames:
+                        capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                        rewound = True
+                        continue
+                    break
+                rewound = False
+                # OpenCV delivers BGR; the working format is RGB (luma weights depend on it)
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) if frame.ndim == 3 else frame
+                frame.flags.writeable = False
+                captured = time.perf_counter()
+                self.stats.record("capture", captured - start)
+                frames += 1
+                self.stats.count(captured=1, dropped=int(self._mailbox.put((frame, captured))))
+                if interval:
+                    next_due += interval
+                    time.sleep(max(0.0, next_due - time.perf_counter()))
+        except Exception as e:
+            self.error = e
+        finally:
+            capture.release()
+            self._mailbox.close()
+
+    def _process(self):
+        try:
+            while True:
+                item = self._mailbox.take(timeout=0.5)
+                if item is None:
+                    if self._mailbox.closed:
+                        break
+                    continue
+                frame, captured = item
+                start = time.perf_counter()
+                self.stats.record("wait", start - captured)
+                steps = self.steps
+                processed = self.logic.run_chain(frame, steps) if steps else frame
+                done = time.perf_counter()
+                self.stats.record("process", done - start)
+                if self.on_frame is not None:
+                    self.on_frame(frame, processed, self.stats)
+                delivered = time.perf_counter()
+                self.stats.record("deliver", delivered - done)
+                self.stats.record("total", delivered - captured)
+                self.stats.count(processed=1)
+        except Exception as e:
+            self.error = e
+            self.stop()
+        finally:
+            if self.on_finished is not None:
+                self.on_finished(self.error)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply an ImageLogic recipe to a camera or video stream.")
+    parser.add_argument("--source", default="0", help="Camera index or video file")
+    parser.add_argument("--recipe", default="", help="Recipe file, or steps like \"grayscale -> canny 50,150\"")
+    parser.add_argument("--frames", type=int, help="Stop after this many captured frames")
+    parser.add_argument("--no-pacing", action="store_true", help="Read video files as fast as possible")
+    parser.add_argument("--report-every", type=float, default=1.0, help="Seconds between stats lines")
+    args = parser.parse_args(argv)
+
+    try:
+        steps = load_recipe(args.recipe) if args.recipe else []
+    except (OSError, ValueError) as e:
+        print(f"Invalid recipe: {e}", file=sys.stderr)
+        return 2
+    stream = VideoStream(args.source, steps, realtime=False if args.no_pacing else None, max_frames=args.frames).start()
+    try:
+        while stream.running:
+            stream.join(args.report_every)
+            print(stream.stats.summary())
+    except KeyboardInterrupt:
+        stream.stop()
+        stream.join()
+    if stream.error is not None:
+        print(f"Stream failed: {stream.error}", file=sys.stderr)
+        return 1
+    print(f"Done: {stream.stats.processed} frame(s) processed, {stream.stats.dropped} dropped.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+# tiling.py
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import cv2
+import numpy as np
+
+MIN_TILED_PIXELS = 2_000_000   # Below this the thread hand-off costs more than it saves
+MIN_STRIP_ROWS = 64            # Strips are never thinner than this (plus halo)
+STRIPS_PER_WORKER = 2          # A little oversplitting evens out uneven strips
+
+
+def available_cores():
+    # Cores this process may run on (a container or taskset can allow fewer than cpu_count)
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+class _SingleThreadedOpenCV:
+    # OpenCV runs its own thread pool inside gaussian/median/sobel; with the strips already
+    # spread over every core, the two pools fight for the same cores and tiling ends up
+    # slower than one untiled call. While any tiled run is in flight OpenCV gets 1 thread;
+    # the previous setting is restored when the last one finishes.
+    _lock = threading.Lock()
+    _active = 0
+    _saved = None
+
+    def __enter__(self):
+        cls = _SingleThreadedOpenCV
+        with cls._lock:
+            if cls._active == 0:
+                cls._saved = cv2.getNumThreads()
+                cv2.setNumThreads(1)
+            cls._active += 1
+
+    def __exit__(self, *exc):
+        cls = _SingleThreadedOpenCV
+        with cls._lock:
+            cls._active -= 1
+            if cls._active == 0:
+                cv2.setNumThreads(cls._saved)
+        return False
+
+
+def gaussian_halo(sigma):
+    # OpenCV picks ksize = round(sigma * 3 * 2 + 1) | 1 for 8-bit images; one spare row for rounding
+    return (int(round(sigma * 6 + 1)) | 1) // 2 + 1
+
+
+class TileExecutor:
+    # Runs a neighbourhood filter over horizontal strips of an image on a thread pool.
+    # Each strip is handed to the filter together with `halo` rows of real pixels above and
+    # below it, and only the strip's own rows are kept, so the stitched result is identical
+    # to filtering the whole image at once. OpenCV releases the GIL while it works, so the
+    # strips really run in parallel. Strips are row ranges of a C-contiguous array, which
+    # makes every input a zero-copy view. The strips replace OpenCV's own threading, which
+    # is switched off while they run, and there are never more workers than cores.
+    def __init__(self, max_workers=None, min_pixels=MIN_TILED_PIXELS):
+        self.max_workers = min(max_workers or available_cores(), available_cores())
+        self.min_pixels = min_pixels
+        self._pool = None
+
+    def _strips(self, height, halo):
+        count = min(self.max_workers * STRIPS_PER_WORKER, height // max(MIN_STRIP_ROWS, 2 * halo))
+        if count <= 1:
+            return [(0, height)]
+        edges = np.linspace(0, height, count + 1).astype(int)
+        return list(zip(edges[:-1], edges[1:]))
+
+    def run(self, fn, image, halo, min_pixels=None):
+        # fn(array) -> array with the same height and width as its input (channels may differ).
+        # min_pixels overrides the size threshold, e.g. lower for costlier filters.
+        height, width = image.shape[:2]
+        min_pixels = self.min_pixels if min_pixels is None else min_pixels
+        if self.max_workers <= 1 or height * width < min_pixels:
+            return fn(image)
+        strips = self._strips(height, halo)
+        if len(strips) == 1:
+            return fn(image)
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="tile")
+
+        def work(top, bottom):
+            padded_top, padded_bottom = max(0, top - halo), min(height, bottom + halo)
+            result = fn(image[padded_top:padded_bottom])
+            return top, bottom, result[top - padded_top:bottom - padded_top]
+
+        output = None
+        with _SingleThreadedOpenCV():
+            futures = [self._pool.submit(work, top, bottom) for top, bottom in strips]
+            for future in as_completed(futures):
+                top, bottom, block = future.result()
+                if output is None:
+                    output = np.empty((height,) + block.shape[1:], dtype=block.dtype)
+                output[top:bottom] = block
+        return output
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
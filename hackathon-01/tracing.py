@@ -0,0 +1,191 @@
+# tracing.py
+# Optional instrumentation of operations, conversions and display refreshes, for finding
+# which step makes the editor slow or run out of memory. Each traced step is a span with
+# its wall time, the bytes copied inside it (reported by the code that copies) and, when
+# memory tracing is on, the peak tracemalloc-traced memory above what was allocated when
+# it started. tracemalloc has one process-wide peak, so only spans on the main thread
+# (the GUI, where operations run) report a peak; spans on worker threads report none
+# rather than a peak that includes, or was reset by, another thread. Spans nest per
+# thread and are kept in a bounded log, which the debug dock shows and which can be
+# saved as Chrome trace JSON (chrome://tracing, Perfetto).
+#
+# While disabled, tracer.span() returns a shared do-nothing span and tracer.copied()
+# returns at once: no timing, no allocation, nothing logged.
+#
+#   IMAGE_EDITOR_TRACE=1 python main.py          (trace from start-up)
+#   IMAGE_EDITOR_TRACE=memory python main.py     (also trace memory; slows allocation down)
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+TRACE_ENV = "IMAGE_EDITOR_TRACE"
+TRACE_LOG_SIZE = 5000     # Spans kept; the oldest are dropped first
+
+
+class _NullSpan:
+    # Stands in for a span while tracing is off
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+    def copied(self, nbytes):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.copied_bytes = 0
+        self.peak_bytes = None
+        self._start_memory = None
+        self._running_peak = 0
+
+    def set(self, **args):
+        self.args.update(args)
+
+    def copied(self, nbytes):
+        self.copied_bytes += nbytes
+
+    def __enter__(self):
+        stack = self.tracer._stack()
+        if self.tracer.memory and tracemalloc.is_tracing() and threading.current_thread() is threading.main_thread():
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                # The peak is global and is reset below: keep the enclosing span's so far
+                parent = stack[-1]
+                parent._running_peak = max(parent._running_peak, peak)
+            self._start_memory = self._running_peak = current
+            tracemalloc.reset_peak()
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        end = time.perf_counter()
+        stack = self.tracer._stack()
+        stack.pop()
+        if self._start_memory is not None and tracemalloc.is_tracing():
+            peak = max(self._running_peak, tracemalloc.get_traced_memory()[1])
+            self.peak_bytes = peak - self._start_memory
+            if stack:
+                stack[-1]._running_peak = max(stack[-1]._running_peak, peak)
+        if stack:
+            stack[-1].copied_bytes += self.copied_bytes # Copies inside a step count for the step too
+        if exc_type is not None:
+            self.args["error"] = f"{exc_type.__name__}: {exc}"
+        self.tracer._record(self, end)
+        return False
+
+
+class Tracer:
+    def __init__(self, log_size=TRACE_LOG_SIZE):
+        self.enabled = False
+        self.memory = False
+        self.log = deque(maxlen=log_size)
+        self.epoch = time.perf_counter()
+        self._local = threading.local()
+        self._thread_names = {}
+        self._owns_tracemalloc = False # Only stop tracemalloc if this tracer started it
+
+    def enable(self, memory=False):
+        # memory: also trace allocations (tracemalloc), which makes allocating much slower
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracemalloc = True
+        elif not memory:
+            self._stop_tracemalloc()
+        self.memory = memory
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        self._stop_tracemalloc()
+        self.memory = False
+
+    def _stop_tracemalloc(self):
+        # Leaves tracing started elsewhere (python -X tracemalloc, a profiler) running
+        if self._owns_tracemalloc and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._owns_tracemalloc = False
+
+    def span(self, name, category="operation", **args):
+        # Context manager timing the enclosed step; args are shown with it
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, category, args)
+
+    def copied(self, nbytes):
+        # Reports a copy of nbytes to the innermost open span on this thread
+        if self.enabled:
+            stack = self._stack()
+            if stack:
+                stack[-1].copied_bytes += nbytes
+
+    def clear(self):
+        self.log.clear()
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, span, end):
+        thread = threading.current_thread()
+        self._thread_names.setdefault(thread.ident, thread.name)
+        args = dict(span.args, copied_bytes=span.copied_bytes)
+        if span.peak_bytes is not None:
+            args["peak_bytes"] = span.peak_bytes
+        self.log.append({
+            "name": span.name, "cat": span.category, "tid": thread.ident,
+            "ts": (span.start - self.epoch) * 1e6, "dur": (end - span.start) * 1e6, "args": args,
+        })
+
+    def events(self):
+        return list(self.log)
+
+    def summary(self):
+        # Per span name and category: count, total and slowest wall time (ms), most bytes
+        # copied and highest peak memory in one span; slowest total first
+        rows = {}
+        for event in self.events():
+            row = rows.setdefault((event["cat"], event["name"]), {"name": event["name"], "category": event["cat"], "count": 0,
+                                                  "total_ms": 0.0, "max_ms": 0.0, "max_copied_bytes": 0, "max_peak_bytes": None})
+            milliseconds = event["dur"] / 1000.0
+            row["count"] += 1
+            row["total_ms"] += milliseconds
+            row["max_ms"] = max(row["max_ms"], milliseconds)
+            row["max_copied_bytes"] = max(row["max_copied_bytes"], event["args"]["copied_bytes"])
+            peak = event["args"].get("peak_bytes")
+            if peak is not None:
+                row["max_peak_bytes"] = max(row["max_peak_bytes"] or 0, peak)
+        return sorted(rows.values(), key=lambda row: row["total_ms"], reverse=True)
+
+    def export_chrome(self, filepath):
+        # Chrome trace event format: complete ("X") events plus thread names
+        pid = os.getpid()
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                  for tid, name in list(self._thread_names.items())]
+        events += [dict(event, ph="X", pid=pid) for event in self.events()]
+        with open(filepath, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return len(events)
+
+
+tracer = Tracer()
+_mode = os.environ.get(TRACE_ENV, "").lower()
+if _mode and _mode != "0":
+    tracer.enable(memory=_mode == "memory")
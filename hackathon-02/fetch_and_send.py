@@ -1,13 +1,26 @@
 import requests
 import json
+import os
 import time
+from spool import SPOOL_PATH, Spool, Forwarder
+from polling import AdaptiveInterval
+from multicast import MULTICAST_GROUP, MULTICAST_PORT, MulticastSender, compact_reading
 
 API_KEY = "<not entering API Key since committing to git>"
-BASE_URL = "http://api.openweathermap.org/data/2.5/weather"
+BASE_URL = os.environ.get("OWM_URL", "http://api.openweathermap.org/data/2.5/weather") # A stub in soak tests
 CITY_NAME = "trivandrum"
 PI_IP_ADDRESS = "192.168.250.169"
 PI_PORT = 5000
-FETCH_INTERVAL = 1
+FETCH_INTERVAL = float(os.environ.get("WEATHER_FETCH_INTERVAL", "1")) # Shortest interval when adaptive
+MAX_FETCH_INTERVAL = float(os.environ.get("WEATHER_MAX_FETCH_INTERVAL", "120"))
+ADAPTIVE_POLLING = os.environ.get("WEATHER_ADAPTIVE", "1") != "0" # 0: fetch every FETCH_INTERVAL seconds
+TEMPERATURE_THRESHOLD = 30.0  # Celsius, as in main.py: polling tightens near it
+# Overrides the Pi's address, e.g. a local stand-in: PI_URL=http://127.0.0.1:5050/update_weather
+PI_URL = os.environ.get("PI_URL", f"http://{PI_IP_ADDRESS}:{PI_PORT}/update_weather") # Flask endpoint
+METRICS_INTERVAL = 30 # Seconds between spool metrics lines
+# "http": POST to one Pi (spooled while it is offline); "multicast": broadcast each reading
+# once to every listening Pi, fire and forget; "both"
+TRANSPORT = os.environ.get("WEATHER_TRANSPORT", "http")
 
 def get_weather_data(city_name):
     try:
@@ -16,7 +29,7 @@ def get_weather_data(city_name):
             "q": city_name,
             "units": "metric"
         }
-        response = requests.get(BASE_URL, params=params)
+        response = requests.get(BASE_URL, params=params, timeout=10)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
@@ -26,13 +39,14 @@ def get_weather_data(city_name):
         print(f"Error decoding weather JSON: {e}")
         return None
 
-def send_data_to_pi(data):
+def send_data_to_pi(data, pi_url=PI_URL):
+    # data: one reading, or a list of spooled readings (oldest first)
     if data is None:
         return False
     try:
-        pi_url = f"http://{PI_IP_ADDRESS}:{PI_PORT}/update_weather" # Flask endpoint
         headers = {'Content-Type': 'application/json'}
-        response = requests.post(pi_url, data=json.dumps(data), headers=headers, timeout=10)
+        # Short connect timeout: an offline Pi should not stall the fetch loop
+        response = requests.post(pi_url, data=json.dumps(data), headers=headers, timeout=(3, 10))
         response.raise_for_status()
         print(f"Successfully sent data to Pi. Response: {response.text}")
         return True
@@ -46,8 +60,25 @@ if __name__ == "__main__":
         exit()
 
     print(f"Starting weather fetcher for {CITY_NAME}.")
-    print(f"Will send data to Raspberry Pi at {PI_IP_ADDRESS}:{PI_PORT}")
-    print(f"Fetching every {FETCH_INTERVAL} seconds. Press Ctrl+C to stop.")
+    use_http = TRANSPORT in ("http", "both")
+    sender = MulticastSender() if TRANSPORT in ("multicast", "both") else None
+    if use_http:
+        print(f"Will send data to Raspberry Pi at {PI_URL}")
+    if sender:
+        print(f"Will broadcast data to {MULTICAST_GROUP}:{MULTICAST_PORT}")
+    if ADAPTIVE_POLLING:
+        print(f"Fetching every {FETCH_INTERVAL}-{MAX_FETCH_INTERVAL:g} seconds, depending on how fast the weather changes. Press Ctrl+C to stop.")
+    else:
+        print(f"Fetching every {FETCH_INTERVAL} seconds. Press Ctrl+C to stop.")
+    schedule = AdaptiveInterval(FETCH_INTERVAL, MAX_FETCH_INTERVAL if ADAPTIVE_POLLING else FETCH_INTERVAL,
+                                TEMPERATURE_THRESHOLD)
+
+    # Readings wait in the spool until the Pi acknowledges them, so outages leave no gaps
+    spool = Spool(SPOOL_PATH)
+    forwarder = Forwarder(spool, send_data_to_pi)
+    if spool.depth():
+        print(f"{spool.depth()} undelivered reading(s) in {SPOOL_PATH} from a previous run.")
+    last_metrics = time.monotonic()
 
     try:
         while True:
@@ -55,13 +86,37 @@ if __name__ == "__main__":
             weather_json = get_weather_data(CITY_NAME)
             if weather_json:
                 print("Weather data fetched.")
-                send_data_to_pi(weather_json)
+                reading = compact_reading(weather_json)
+                interval = schedule.observe(reading["t"], reading["p"], reading["c"])
+                if sender:
+                    sequence = sender.send(reading)
+                    print(f"Broadcast reading #{sequence}.")
+                if use_http:
+                    spool.append(weather_json)
             else:
-                print("Failed to fetch or send weather data.")
+                print("Failed to fetch weather data.")
+                interval = schedule.observe_failure()
+            if use_http:
+                delivered = forwarder.drain()
+                if delivered > 1:
+                    print(f"Delivered {delivered} spooled readings ({forwarder.last_drain_rate:.0f}/s).")
+                elif not delivered and spool.depth():
+                    print(f"Pi unreachable; {spool.depth()} reading(s) spooled.")
+            if time.monotonic() - last_metrics >= METRICS_INTERVAL:
+                if use_http:
+                    print(f"Spool metrics: {json.dumps(forwarder.metrics())}")
+                saving = schedule.saving()
+                print(f"Polling: {schedule.effective_rate():.1f} fetches/min, interval {schedule.interval:.1f}s"
+                      + (f", {saving:.1f}x fewer than every {FETCH_INTERVAL:g}s" if saving else ""))
+                last_metrics = time.monotonic()
             
-            print(f"Waiting for {FETCH_INTERVAL} seconds...")
-            time.sleep(FETCH_INTERVAL)
+            print(f"Waiting for {interval:.1f} seconds...")
+            time.sleep(interval)
     except KeyboardInterrupt:
         print("\nStopping weather fetcher.")
     except Exception as e:
-        print(f"An unexpected error occurred: {e}")
\ No newline at end of file
+        print(f"An unexpected error occurred: {e}")
+    finally:
+        spool.close()
+        if sender:
+            sender.close()
\ No newline at end of file
@@ -1,10 +1,16 @@
 # main_app.py
+import time
+_start_time = time.perf_counter() # Startup phases are timed from here
+
 from flask import Flask, request, jsonify
 import oled_driver
 import led_controller
+import snapshot
+import multicast
+import os
 import signal
 import sys
-import time
+import threading
 
 # --- Configuration ---
 # For Pioneer 600 integrated OLED, typical pins are:
@@ -15,14 +21,63 @@ OLED_RST_PIN = 19  # As per your initial code
 OLED_DC_PIN = 16   # As per your initial code
 OLED_SPI_BUS = 0
 OLED_SPI_DEVICE = 0
+OLED_WIDTH = 128
+OLED_HEIGHT = 64
 
 LED_GPIO_PIN = 26  # BCM pin for the LED
 TEMPERATURE_THRESHOLD = 30.0  # Celsius
+HTTP_PORT = int(os.environ.get("WEATHER_HTTP_PORT", "5000"))
+# Also take readings broadcast by fetch_and_send.py over UDP multicast (see multicast.py)
+MULTICAST_LISTEN = os.environ.get("WEATHER_MULTICAST", "1") != "0"
 
 # --- Global objects ---
 app = Flask(__name__)
 disp = None
 oled_font = None # Using default font from oled_driver
+snapshots = snapshot.SnapshotStore()
+listener = None
+display_lock = threading.Lock() # Flask requests and the multicast listener both update the display
+startup_phases = [] # (phase, seconds since start), see mark_phase
+
+def mark_phase(name):
+    startup_phases.append((name, time.perf_counter() - _start_time))
+
+def report_startup():
+    previous = 0.0
+    for name, elapsed in startup_phases:
+        print(f"Startup: {name:<18} +{(elapsed - previous) * 1000:7.1f} ms  (at {elapsed * 1000:7.1f} ms)")
+        previous = elapsed
+
+def set_led_for(temperature):
+    if temperature is not None:
+        if temperature > TEMPERATURE_THRESHOLD:
+            led_controller.led_on()
+            print(f"Temp {temperature}°C > {TEMPERATURE_THRESHOLD}°C. LED ON.")
+        else:
+            led_controller.led_off()
+            print(f"Temp {temperature}°C <= {TEMPERATURE_THRESHOLD}°C. LED OFF.")
+    else:
+        led_controller.led_off() # Turn off if no temp data
+        print("No temperature data, LED OFF.")
+
+def apply_reading(temperature, pressure, condition):
+    with display_lock:
+        # Update OLED display
+        if disp:
+            oled_driver.draw_weather_on_oled(disp, temperature, pressure, condition, font=oled_font)
+            print("OLED Updated.")
+            # Kept for a warm restart; written at most every MIN_WRITE_INTERVAL seconds
+            snapshots.record(disp, {"temperature": temperature, "pressure": pressure, "condition": condition})
+        else:
+            print("OLED display not initialized.")
+
+        # Control LED based on temperature
+        set_led_for(temperature)
+
+def apply_multicast_reading(message):
+    # Called on the listener thread with each newer broadcast reading (compact keys)
+    print(f"Received multicast reading: {message}")
+    apply_reading(message.get("t"), message.get("p"), message.get("c"))
 
 # --- Flask Route ---
 @app.route('/update_weather', methods=['POST'])
@@ -32,6 +87,14 @@ def update_weather():
         return jsonify({"error": "Request must be JSON"}), 400
 
     data = request.get_json()
+    # The fetcher sends a list when it drains readings spooled while the Pi was offline;
+    # they are oldest first, and only the newest is displayed
+    readings = data if isinstance(data, list) else [data]
+    if not readings or not all(isinstance(reading, dict) for reading in readings):
+        return jsonify({"error": "Expected a reading or a list of readings"}), 400
+    if len(readings) > 1:
+        print(f"Received {len(readings)} spooled readings.")
+    data = readings[-1]
     print(f"Received data: {data}")
 
     try:
@@ -46,26 +109,9 @@ def update_weather():
         if weather_list:
             condition = weather_list[0].get('description', "N/A").capitalize()
 
-        # Update OLED display
-        if disp:
-            oled_driver.draw_weather_on_oled(disp, temperature, pressure, condition, font=oled_font)
-            print("OLED Updated.")
-        else:
-            print("OLED display not initialized.")
-
-        # Control LED based on temperature
-        if temperature is not None:
-            if temperature > TEMPERATURE_THRESHOLD:
-                led_controller.led_on()
-                print(f"Temp {temperature}°C > {TEMPERATURE_THRESHOLD}°C. LED ON.")
-            else:
-                led_controller.led_off()
-                print(f"Temp {temperature}°C <= {TEMPERATURE_THRESHOLD}°C. LED OFF.")
-        else:
-            led_controller.led_off() # Turn off if no temp data
-            print("No temperature data, LED OFF.")
+        apply_reading(temperature, pressure, condition)
 
-        return jsonify({"message": "Weather data processed successfully"}), 200
+        return jsonify({"message": "Weather data processed successfully", "accepted": len(readings)}), 200
 
     except Exception as e:
         print(f"Error processing weather data: {e}")
@@ -74,6 +120,9 @@ def update_weather():
 # --- Cleanup Function ---
 def signal_handler(sig, frame):
     print('\nCtrl+C detected. Shutting down gracefully...')
+    if listener:
+        listener.stop()
+    snapshots.flush()
     if disp:
         disp.cleanup()
     led_controller.cleanup_led()
@@ -84,24 +133,35 @@ def signal_handler(sig, frame):
 # --- Main Execution ---
 if __name__ == '__main__':
     print("Starting Weather Display Application on Raspberry Pi...")
+    mark_phase("imports")
 
     # Setup signal handler for Ctrl+C
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
 
-    # Initialize OLED
+    # Initialize OLED, showing the last frame of the previous run if there is one
+    last = snapshots.load(OLED_WIDTH, OLED_HEIGHT)
+    mark_phase("snapshot loaded")
     try:
         disp = oled_driver.SSD1306(
             rst_pin=OLED_RST_PIN,
             dc_pin=OLED_DC_PIN,
             spi_bus=OLED_SPI_BUS,
-            spi_device=OLED_SPI_DEVICE
+            spi_device=OLED_SPI_DEVICE,
+            width=OLED_WIDTH,
+            height=OLED_HEIGHT,
+            initial_buffer=last["buffer"] if last else None
         )
         # You can load a custom font here if needed for oled_driver.draw_weather_on_oled
         # from PIL import ImageFont
         # oled_font = ImageFont.truetype("path/to/your/font.ttf", 10)
-        print("OLED initialized. Displaying initial message.")
-        oled_driver.draw_weather_on_oled(disp, None, None, "Waiting...", font=oled_font)
+        if last:
+            mark_phase("first pixel")
+            print(f"OLED initialized. Showing the last reading, saved {time.ctime(last['saved_at'])}.")
+        else:
+            print("OLED initialized. Displaying initial message.")
+            oled_driver.draw_weather_on_oled(disp, None, None, "Waiting...", font=oled_font)
+            mark_phase("first pixel")
 
     except Exception as e:
         print(f"Failed to initialize OLED: {e}. Exiting.")
@@ -111,20 +171,35 @@ if __name__ == '__main__':
     if not led_controller.setup_led(LED_GPIO_PIN):
         print(f"Failed to initialize LED on pin {LED_GPIO_PIN}. Check GPIO setup. LED functionality will be disabled.")
         # Continue without LED if setup fails, or sys.exit(1) if critical
+    elif last and last.get("reading"):
+        set_led_for(last["reading"].get("temperature"))
+    mark_phase("led ready")
+
+    # Listen for broadcast readings alongside the HTTP endpoint
+    if MULTICAST_LISTEN:
+        try:
+            listener = multicast.MulticastListener(apply_multicast_reading).start()
+            print(f"Listening for multicast readings on {multicast.MULTICAST_GROUP}:{multicast.MULTICAST_PORT}.")
+        except OSError as e:
+            print(f"Failed to join multicast group: {e}. Only HTTP updates will be received.")
+        mark_phase("multicast ready")
 
 
     # Run Flask app
     # For production, use a proper WSGI server like Gunicorn or uWSGI
     # Example: gunicorn -w 4 -b 0.0.0.0:5000 main_app:app
-    print("Starting Flask server on port 5000...")
+    print(f"Starting Flask server on port {HTTP_PORT}...")
+    mark_phase("server starting")
+    report_startup()
     try:
-        app.run(host='0.0.0.0', port=5000, debug=False) # debug=False for less console output
+        app.run(host='0.0.0.0', port=HTTP_PORT, debug=False) # debug=False for less console output
     except Exception as e:
         print(f"Flask server failed to start: {e}")
     finally:
         # This finally block might not always be reached if Flask's internal
         # shutdown doesn't propagate KeyboardInterrupt well, hence signal_handler
         print("Flask server stopped. Performing final cleanup.")
+        snapshots.flush()
         if disp: # Ensure cleanup if not caught by signal handler
             disp.cleanup()
         led_controller.cleanup_led()
\ No newline at end of file
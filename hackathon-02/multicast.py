@@ -0,0 +1,127 @@
+import argparse
+import json
+import os
+import socket
+import struct
+import threading
+import time
+
+# --- Configuration ---
+# Broadcast transport for a fleet of displays: the fetcher sends each reading once, as one
+# small UDP datagram to a multicast group, and every Pi in the group receives it. The
+# sender's cost does not depend on how many displays listen. Datagrams can be lost or
+# reordered, so each carries the sender's start time (in nanoseconds, so a sender restarted
+# within the same second still counts as newer) and a sequence number, and listeners
+# only apply readings newer than the last one they applied.
+MULTICAST_GROUP = os.environ.get("WEATHER_MULTICAST_GROUP", "239.255.42.99") # Administratively scoped
+MULTICAST_PORT = int(os.environ.get("WEATHER_MULTICAST_PORT", "5007"))
+# Interface to send and join on; 0.0.0.0 lets the OS pick. Use 127.0.0.1 for loopback tests.
+MULTICAST_INTERFACE = os.environ.get("WEATHER_MULTICAST_INTERFACE", "0.0.0.0")
+MULTICAST_TTL = 1   # Stay on the local network
+MAX_DATAGRAM = 512
+
+def compact_reading(owm_json):
+    # The fields the displays use, from an OpenWeatherMap response
+    main_data = owm_json.get('main', {})
+    weather_list = owm_json.get('weather', [])
+    condition = weather_list[0].get('description', "N/A").capitalize() if weather_list else "N/A"
+    return {"t": main_data.get('temp'), "p": main_data.get('pressure'), "c": condition}
+
+class MulticastSender:
+    def __init__(self, group=MULTICAST_GROUP, port=MULTICAST_PORT, interface=MULTICAST_INTERFACE, ttl=MULTICAST_TTL):
+        self.address = (group, port)
+        self.epoch = time.time_ns() # A restarted sender's sequence starts again at 1; its epoch is newer
+        self.sequence = 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1) # Listeners on this host too
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(interface))
+
+    def send(self, reading):
+        # reading: a compact_reading(); returns its sequence number
+        self.sequence += 1
+        datagram = json.dumps({"e": self.epoch, "s": self.sequence, **reading}, separators=(",", ":")).encode()
+        self.sock.sendto(datagram, self.address)
+        return self.sequence
+
+    def close(self):
+        self.sock.close()
+
+class MulticastListener:
+    # Receives readings on a daemon thread and calls on_reading(reading) with each one
+    # newer than the last applied; older, duplicate and malformed datagrams are counted
+    def __init__(self, on_reading, group=MULTICAST_GROUP, port=MULTICAST_PORT, interface=MULTICAST_INTERFACE):
+        self.on_reading = on_reading
+        self.last = (0, 0) # (epoch, sequence) of the newest reading applied
+        self.received = self.stale = self.malformed = 0
+        self._stop = threading.Event()
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, "SO_REUSEPORT"): # Several listeners on one host (loopback tests)
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        self.sock.bind(("", port))
+        membership = struct.pack("4s4s", socket.inet_aton(group), socket.inet_aton(interface))
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+        self.sock.settimeout(1.0) # So stop() is noticed
+        self.thread = threading.Thread(target=self._run, name="multicast-listener", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.thread.join(timeout=2.0)
+        self.sock.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                datagram, _ = self.sock.recvfrom(MAX_DATAGRAM)
+            except socket.timeout:
+                continue
+            except OSError:
+                break # Socket closed
+            try:
+                message = json.loads(datagram)
+                stamp = (int(message.pop("e")), int(message.pop("s")))
+            except (ValueError, KeyError, TypeError, AttributeError):
+                self.malformed += 1
+                continue
+            self.received += 1
+            if stamp <= self.last:
+                self.stale += 1
+                continue
+            self.last = stamp
+            try:
+                self.on_reading(message)
+            except Exception as e:
+                print(f"Error applying multicast reading: {e}")
+
+# Loopback test: start a few listeners, then a sender, on one machine:
+#   WEATHER_MULTICAST_INTERFACE=127.0.0.1 python multicast.py listen      (in several terminals)
+#   WEATHER_MULTICAST_INTERFACE=127.0.0.1 python multicast.py send --count 100
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Send or receive weather readings over UDP multicast.")
+    parser.add_argument("mode", choices=("send", "listen"))
+    parser.add_argument("--count", type=int, default=10, help="Readings to send")
+    parser.add_argument("--interval", type=float, default=0.1, help="Seconds between readings sent")
+    parser.add_argument("--duration", type=float, help="Seconds to listen (default: until Ctrl+C)")
+    args = parser.parse_args()
+
+    if args.mode == "send":
+        sender = MulticastSender()
+        for i in range(args.count):
+            sender.send({"t": 20.0 + i % 15, "p": 1013, "c": "Test"})
+            time.sleep(args.interval)
+        sender.close()
+        print(f"Sent {args.count} reading(s) to {MULTICAST_GROUP}:{MULTICAST_PORT}.")
+    else:
+        listener = MulticastListener(lambda reading: print(f"Reading: {reading}")).start()
+        try:
+            listener.thread.join(args.duration)
+        except KeyboardInterrupt:
+            pass
+        listener.stop()
+        print(f"Received {listener.received}, applied up to {listener.last}, "
+              f"{listener.stale} stale, {listener.malformed} malformed.")
@@ -4,7 +4,8 @@ import time
 from PIL import Image, ImageDraw, ImageFont
 
 class SSD1306:
-    def __init__(self, rst_pin, dc_pin, spi_bus=0, spi_device=0, width=128, height=64):
+    def __init__(self, rst_pin, dc_pin, spi_bus=0, spi_device=0, width=128, height=64, initial_buffer=None):
+        # initial_buffer: a saved frame (see snapshot.py) shown right after init instead of a blank screen
         self.rst_pin = rst_pin
         self.dc_pin = dc_pin
         self.width = width
@@ -33,7 +34,10 @@ class SSD1306:
 
             self._reset()
             self._initialize_display()
-            self.clear()
+            if initial_buffer is not None and len(initial_buffer) == self.width * self.pages:
+                self.buffer = list(initial_buffer)
+            else:
+                self.clear()
             self.show()
             print("SSD1306 Initialized")
 
@@ -54,50 +58,60 @@ class SSD1306:
         lgpio.gpio_write(self.chip_handle, self.dc_pin, 0)  # D/C# low for command
         self.spi.writebytes([cmd])
 
+    def _commands(self, cmds):
+        # Several commands in one SPI transfer: D/C# only needs setting once
+        if self.chip_handle < 0: return
+        lgpio.gpio_write(self.chip_handle, self.dc_pin, 0)
+        self.spi.writebytes(cmds)
+
     def _data(self, data):
         if self.chip_handle < 0: return
         lgpio.gpio_write(self.chip_handle, self.dc_pin, 1)  # D/C# high for data
         self.spi.writebytes(data if isinstance(data, list) else [data])
 
     def _initialize_display(self):
-        # Initialization sequence for SSD1306
-        self._command(0xAE)  # Display OFF
-        self._command(0xD5)  # Set Display Clock Divide Ratio/Oscillator Frequency
-        self._command(0x80)  # Default Ratio
-        self._command(0xA8)  # Set Multiplex Ratio
-        self._command(self.height - 1)
-        self._command(0xD3)  # Set Display Offset
-        self._command(0x00)  # No offset
-        self._command(0x40 | 0x0)  # Set Display Start Line (0)
-        self._command(0x8D)  # Charge Pump Setting
-        self._command(0x14)  # Enable Charge Pump
-        self._command(0x20)  # Memory Addressing Mode
-        self._command(0x00)  # Horizontal Addressing Mode
-        self._command(0xA0 | 0x1)  # Set Segment Re-map (A0: normal, A1: remapped)
-        self._command(0xC0 | 0x8)  # Set COM Output Scan Direction (C0: normal, C8: remapped)
-        self._command(0xDA)  # Set COM Pins Hardware Configuration
-        self._command(0x12 if self.height == 64 else 0x02) # Check height for 0x12 or 0x02
-        self._command(0x81)  # Set Contrast Control
-        self._command(0xCF)  # Default Contrast
-        self._command(0xD9)  # Set Pre-charge Period
-        self._command(0xF1)
-        self._command(0xDB)  # Set VCOMH Deselect Level
-        self._command(0x40)
-        self._command(0xA4)  # Entire Display ON (resume to RAM content display)
-        self._command(0xA6)  # Normal Display (not inverted)
-        self._command(0xAF)  # Display ON
+        # Initialization sequence for SSD1306, sent as one transfer
+        self._commands([
+            0xAE,        # Display OFF
+            0xD5,        # Set Display Clock Divide Ratio/Oscillator Frequency
+            0x80,        # Default Ratio
+            0xA8,        # Set Multiplex Ratio
+            self.height - 1,
+            0xD3,        # Set Display Offset
+            0x00,        # No offset
+            0x40 | 0x0,  # Set Display Start Line (0)
+            0x8D,        # Charge Pump Setting
+            0x14,        # Enable Charge Pump
+            0x20,        # Memory Addressing Mode
+            0x00,        # Horizontal Addressing Mode
+            0xA0 | 0x1,  # Set Segment Re-map (A0: normal, A1: remapped)
+            0xC0 | 0x8,  # Set COM Output Scan Direction (C0: normal, C8: remapped)
+            0xDA,        # Set COM Pins Hardware Configuration
+            0x12 if self.height == 64 else 0x02, # Check height for 0x12 or 0x02
+            0x81,        # Set Contrast Control
+            0xCF,        # Default Contrast
+            0xD9,        # Set Pre-charge Period
+            0xF1,
+            0xDB,        # Set VCOMH Deselect Level
+            0x40,
+            0xA4,        # Entire Display ON (resume to RAM content display)
+            0xA6,        # Normal Display (not inverted)
+            0xAF,        # Display ON
+        ])
 
     def clear(self):
         self.buffer = [0x00] * (self.width * self.pages)
         # self.show() # Optionally show cleared screen immediately
 
     def show(self):
-        self._command(0x21)  # Set Column Address
-        self._command(0)     # Column Start Address (0)
-        self._command(self.width - 1)  # Column End Address (127)
-        self._command(0x22)  # Set Page Address
-        self._command(0)     # Page Start Address (0)
-        self._command(self.pages - 1) # Page End Address (N-1)
+        self._commands([
+            0x21,              # Set Column Address
+            0,                 # Column Start Address (0)
+            self.width - 1,    # Column End Address (127)
+            0x22,              # Set Page Address
+            0,                 # Page Start Address (0)
+            self.pages - 1,    # Page End Address (N-1)
+        ])
         self._data(self.buffer)
 
     def process_image_to_buffer(self, image):
@@ -142,7 +156,13 @@ class SSD1306:
         print("OLED cleanup finished.")
 
 # --- Drawing Helper Function ---
-DEFAULT_FONT = ImageFont.load_default()
+_default_font = None # Loaded on first draw, so it does not hold up start-up
+
+def get_default_font():
+    global _default_font
+    if _default_font is None:
+        _default_font = ImageFont.load_default()
+    return _default_font
 
 def draw_weather_on_oled(disp_obj, temp, pressure, condition, font=None):
     if not disp_obj:
@@ -150,7 +170,7 @@ def draw_weather_on_oled(disp_obj, temp, pressure, condition, font=None):
         return
 
     if font is None:
-        font = DEFAULT_FONT
+        font = get_default_font()
     
     image = Image.new('1', (disp_obj.width, disp_obj.height))
     draw = ImageDraw.Draw(image)
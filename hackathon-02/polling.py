@@ -0,0 +1,85 @@
+import time
+from collections import deque
+
+# --- Configuration ---
+# Adaptive fetch interval. OpenWeatherMap refreshes a city every few minutes, so polling
+# once a second mostly fetches the same reading again. The interval doubles for every
+# fetch that brings nothing new, is halved when the reading moves, and is capped by how
+# close the temperature is to the LED threshold (and how fast it is heading there), so a
+# crossing is still seen within about one minimum interval.
+BACKOFF_FACTOR = 2.0        # Interval growth per unchanged reading
+TIGHTEN_FACTOR = 0.5        # Interval change per changed reading
+TEMPERATURE_STEP = 0.2      # Celsius; smaller changes count as stable
+PRESSURE_STEP = 1.0         # hPa
+SLOPE_SMOOTHING = 0.5       # Weight of the newest temperature slope in the running estimate
+THRESHOLD_BAND = 3.0        # Celsius; within this of the threshold the interval is capped...
+CROSSING_POLLS = 3          # ...and at this many polls before the threshold would be reached
+RATE_WINDOW = 600.0         # Seconds over which the effective polling rate is reported
+
+class AdaptiveInterval:
+    def __init__(self, min_interval, max_interval, threshold):
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.threshold = threshold
+        self.interval = min_interval
+        self.slope = 0.0 # Celsius per second, smoothed
+        self._previous = None # (time, temperature, pressure, condition)
+        self._fetch_times = deque()
+        self.fetches = 0
+        self.started = time.monotonic()
+
+    def observe(self, temperature, pressure, condition, now=None):
+        # Records a fetched reading (values may be None) and returns the next interval
+        now = self._count_fetch(now)
+        previous, self._previous = self._previous, (now, temperature, pressure, condition)
+        if previous is None:
+            return self.interval
+        then, last_temperature, last_pressure, last_condition = previous
+        changed = condition != last_condition
+        if temperature is not None and last_temperature is not None:
+            changed = changed or abs(temperature - last_temperature) >= TEMPERATURE_STEP
+            if now > then:
+                slope = (temperature - last_temperature) / (now - then)
+                self.slope = SLOPE_SMOOTHING * slope + (1.0 - SLOPE_SMOOTHING) * self.slope
+        if pressure is not None and last_pressure is not None:
+            changed = changed or abs(pressure - last_pressure) >= PRESSURE_STEP
+        interval = self.interval * (TIGHTEN_FACTOR if changed else BACKOFF_FACTOR)
+        self.interval = max(self.min_interval, min(self.max_interval, interval, self._threshold_cap(temperature)))
+        return self.interval
+
+    def observe_failure(self, now=None):
+        # A failed fetch still counts as a call, but says nothing about the weather
+        self._count_fetch(now)
+        return self.interval
+
+    def _count_fetch(self, now):
+        now = time.monotonic() if now is None else now
+        self.fetches += 1
+        self._fetch_times.append(now)
+        while self._fetch_times[0] < now - RATE_WINDOW:
+            self._fetch_times.popleft()
+        return now
+
+    def _threshold_cap(self, temperature):
+        if temperature is None or self.threshold is None:
+            return self.max_interval
+        distance = abs(temperature - self.threshold)
+        cap = self.max_interval
+        if distance < THRESHOLD_BAND:
+            # Linear from the minimum at the threshold to the maximum at the band's edge
+            cap = self.min_interval + (self.max_interval - self.min_interval) * distance / THRESHOLD_BAND
+        heading_for_threshold = (self.threshold - temperature) * self.slope > 0
+        if heading_for_threshold:
+            cap = min(cap, distance / abs(self.slope) / CROSSING_POLLS)
+        return cap
+
+    def effective_rate(self, now=None):
+        # Fetches per minute over the last RATE_WINDOW seconds
+        now = time.monotonic() if now is None else now
+        window = max(self.min_interval, min(RATE_WINDOW, now - self.started))
+        return 60.0 * len(self._fetch_times) / window
+
+    def saving(self, now=None):
+        # How many times fewer fetches than polling at the minimum interval
+        rate = self.effective_rate(now)
+        return (60.0 / self.min_interval) / rate if rate else None
@@ -0,0 +1,95 @@
+import json
+import os
+import threading
+import time
+
+# --- Configuration ---
+# The last frame sent to the OLED and the reading behind it, so a restarted service can
+# show it again straight after the display is initialised instead of "Waiting...".
+SNAPSHOT_PATH = os.environ.get("WEATHER_SNAPSHOT_PATH",
+                               os.path.join(os.path.dirname(os.path.abspath(__file__)), "display_snapshot.json"))
+MIN_WRITE_INTERVAL = 60.0  # Seconds between writes, to spare the SD card; newer frames wait
+
+class SnapshotStore:
+    def __init__(self, path=SNAPSHOT_PATH, min_interval=MIN_WRITE_INTERVAL):
+        self.path = path
+        self.min_interval = min_interval
+        self.writes = 0
+        self._lock = threading.Lock()
+        self._pending = None   # Newest snapshot not yet on disk
+        self._written = None   # Last snapshot on disk, to skip rewriting the same frame
+        self._last_write = None
+        self._timer = None
+
+    def load(self, width, height):
+        # The saved snapshot as {"buffer": [...], "reading": {...}, "saved_at": ...}, or
+        # None if there is none or it is for a display of another size
+        try:
+            with open(self.path) as f:
+                snapshot = json.load(f)
+            buffer = list(bytes.fromhex(snapshot["buffer"]))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"Ignoring unreadable snapshot {self.path}: {e}")
+            return None
+        if snapshot.get("width") != width or snapshot.get("height") != height or len(buffer) != width * height // 8:
+            print(f"Ignoring snapshot {self.path}: it is for another display size.")
+            return None
+        self._written = (snapshot["buffer"], snapshot.get("reading"))
+        return {"buffer": buffer, "reading": snapshot.get("reading"), "saved_at": snapshot.get("saved_at")}
+
+    def record(self, disp_obj, reading):
+        # Called after every display update; writes at once if the last write is old
+        # enough, otherwise once the interval has passed (only the newest frame is kept)
+        snapshot = {
+            "width": disp_obj.width,
+            "height": disp_obj.height,
+            "buffer": bytes(disp_obj.buffer).hex(),
+            "reading": reading,
+            "saved_at": time.time(),
+        }
+        with self._lock:
+            if (snapshot["buffer"], reading) == self._written:
+                self._pending = None # Already on disk
+                return
+            self._pending = snapshot
+            wait = 0.0 if self._last_write is None else self._last_write + self.min_interval - time.monotonic()
+            if wait <= 0:
+                self._write_pending()
+            elif self._timer is None:
+                self._timer = threading.Timer(wait, self._write_later)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        # Writes any pending snapshot now (on shutdown)
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._write_pending()
+
+    def _write_later(self):
+        with self._lock:
+            self._timer = None
+            self._write_pending()
+
+    def _write_pending(self):
+        snapshot = self._pending
+        if snapshot is None:
+            return
+        self._pending = None
+        self._last_write = time.monotonic()
+        # Written next to the snapshot and renamed over it, so a power cut leaves either
+        # the old snapshot or the new one, never half of one
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, "w") as f:
+                json.dump(snapshot, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+            self._written = (snapshot["buffer"], snapshot["reading"])
+            self.writes += 1
+        except OSError as e:
+            print(f"Error saving display snapshot to {self.path}: {e}")
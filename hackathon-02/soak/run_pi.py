@@ -0,0 +1,29 @@
+import os
+import runpy
+import sys
+import threading
+import time
+
+# Runs ../main.py with the simulated spidev, lgpio and gpiozero in sim/, and appends a line
+# "<time> <pressure>" to $SOAK_EVENTS every time a reading is drawn. The soak OWM stub puts
+# each reading's id in its pressure, so soak.py can match draws to the readings it served.
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(HERE)
+sys.path[:0] = [os.path.join(HERE, "sim"), APP_DIR]
+
+import oled_driver  # noqa: E402  (after the simulated hardware is on the path)
+
+_events = open(os.environ["SOAK_EVENTS"], "a", buffering=1)
+_events_lock = threading.Lock()
+_draw = oled_driver.draw_weather_on_oled
+
+def draw_and_log(disp_obj, temp, pressure, condition, font=None):
+    _draw(disp_obj, temp, pressure, condition, font=font)
+    if pressure is not None:
+        with _events_lock:
+            _events.write(f"{time.time():.6f} {pressure:.0f}\n")
+
+oled_driver.draw_weather_on_oled = draw_and_log
+
+if __name__ == "__main__":
+    runpy.run_path(os.path.join(APP_DIR, "main.py"), run_name="__main__")
@@ -0,0 +1,24 @@
+# Simulated gpiozero for soak tests: an LED that counts its switches
+
+class GPIOPinMissing(Exception):
+    pass
+
+class LED:
+    switches = 0 # Across all LEDs
+
+    def __init__(self, pin):
+        self.pin = pin
+        self.is_lit = False
+
+    def on(self):
+        if not self.is_lit:
+            LED.switches += 1
+        self.is_lit = True
+
+    def off(self):
+        if self.is_lit:
+            LED.switches += 1
+        self.is_lit = False
+
+    def close(self):
+        self.is_lit = False
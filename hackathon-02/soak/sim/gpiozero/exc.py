@@ -0,0 +1,2 @@
+class BadPinFactory(Exception):
+    pass
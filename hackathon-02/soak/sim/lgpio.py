@@ -0,0 +1,23 @@
+# Simulated lgpio for soak tests: one chip, pins remember their level
+
+_levels = {}
+
+def gpiochip_open(chip):
+    return 0
+
+def gpiochip_close(handle):
+    return 0
+
+def gpio_claim_output(handle, pin, level=0):
+    _levels[pin] = level
+    return 0
+
+def gpio_write(handle, pin, level):
+    _levels[pin] = level
+    return 0
+
+def gpio_read(handle, pin):
+    return _levels.get(pin, 0)
+
+def lasterror(code):
+    return f"simulated error {code}"
@@ -0,0 +1,32 @@
+import time
+
+# Simulated spidev for soak tests (soak/run_pi.py puts this directory first on sys.path).
+# Transfers take the time the bytes would take on the bus, so display updates cost what
+# they cost on the Pi; bytes and transfers are counted.
+
+bytes_written = 0
+transfers = 0
+
+class SpiDev:
+    def __init__(self):
+        self.max_speed_hz = 500000
+        self.mode = 0
+        self.is_open = False
+
+    def open(self, bus, device):
+        self.is_open = True
+
+    def writebytes(self, data):
+        global bytes_written, transfers
+        if not self.is_open:
+            raise OSError("SPI device not open")
+        bytes_written += len(data)
+        transfers += 1
+        time.sleep(len(data) * 8 / self.max_speed_hz)
+
+    def xfer2(self, data):
+        self.writebytes(data)
+        return [0] * len(data)
+
+    def close(self):
+        self.is_open = False
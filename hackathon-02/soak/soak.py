@@ -0,0 +1,335 @@
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# End-to-end soak/load test of fetcher -> Flask -> OLED/LED, headless (Linux, for CI):
+#   - an OpenWeatherMap stub serves readings, numbered through their pressure field, with
+#     configurable size, latency and error rate;
+#   - ../main.py runs through run_pi.py on simulated spidev/lgpio/gpiozero (sim/), logging
+#     every reading it draws;
+#   - ../fetch_and_send.py polls the stub at the requested rate and forwards to the Pi;
+#   - the Pi can be killed and restarted on a schedule (the fetcher spools meanwhile).
+# Reported: end-to-end latency percentiles (stub served -> drawn), readings superseded or
+# lost, and CPU and RSS of both processes over time.
+#
+#   python soak/soak.py --rate 20 --duration 60 --payload-bytes 2000 --owm-error-rate 0.05
+#   python soak/soak.py --duration 120 --pi-outage-every 30 --pi-outage-for 10 --max-p99-ms 500
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(HERE)
+PERCENTILES = (50, 90, 99)
+STARTUP_TIMEOUT = 30.0
+
+class OwmStub:
+    # Serves OpenWeatherMap-shaped readings; reading n has pressure n, so its draw on the
+    # Pi can be matched to the time it was served. Temperatures swing across the LED
+    # threshold so the LED switches too.
+    def __init__(self, payload_bytes, error_rate, latency_ms):
+        self.payload_bytes = payload_bytes
+        self.error_rate = error_rate
+        self.latency_ms = latency_ms
+        self.served = {} # id -> time served
+        self.errors = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/data/2.5/weather"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def handle(self, request):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        if random.random() < self.error_rate:
+            with self._lock:
+                self.errors += 1
+            request.send_error(500, "Injected failure")
+            return
+        with self._lock:
+            reading_id = len(self.served) + 1
+            self.served[reading_id] = time.time()
+        reading = {
+            "weather": [{"id": 500, "main": "Rain", "description": "light rain"}],
+            "main": {"temp": round(30.0 + 5.0 * math.sin(reading_id / 10.0), 2), "pressure": reading_id, "humidity": 80},
+            "name": "Soak",
+        }
+        padding = self.payload_bytes - len(json.dumps(reading))
+        if padding > 0:
+            reading["padding"] = "x" * padding
+        body = json.dumps(reading).encode()
+        request.send_response(200)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_for_port(port, process, timeout=STARTUP_TIMEOUT):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+def process_sample(pid):
+    # (CPU seconds used, RSS in MB) from /proc; None once the process has gone
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+        with open(f"/proc/{pid}/status") as f:
+            rss = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:")) / 1024.0
+        return cpu, rss
+    except (OSError, StopIteration, IndexError):
+        return None
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(round(p / 100.0 * (len(sorted_values) - 1))))]
+
+class Soak:
+    def __init__(self, args):
+        self.args = args
+        self.workdir = tempfile.mkdtemp(prefix="weather-soak-")
+        self.events_path = os.path.join(self.workdir, "events.log")
+        self.port = free_port()
+        self.stub = OwmStub(args.payload_bytes, args.owm_error_rate, args.owm_latency_ms)
+        self.pi = self.fetcher = None
+        self.pi_starts = 0
+        self.samples = [] # (elapsed, {"pi": (cpu%, rss), "fetcher": (cpu%, rss)})
+        self._last_cpu = {}
+
+    def env(self):
+        env = dict(os.environ)
+        env.update({
+            "SOAK_EVENTS": self.events_path,
+            "WEATHER_HTTP_PORT": str(self.port),
+            "WEATHER_SNAPSHOT_PATH": os.path.join(self.workdir, "snapshot.json"),
+            "WEATHER_SPOOL_PATH": os.path.join(self.workdir, "spool.db"),
+            "WEATHER_MULTICAST": "1" if self.args.transport == "multicast" else "0",
+            "WEATHER_TRANSPORT": self.args.transport,
+            "WEATHER_FETCH_INTERVAL": str(1.0 / self.args.rate),
+            "WEATHER_ADAPTIVE": "1" if self.args.adaptive else "0", # The requested rate is the load
+            "OWM_URL": self.stub.url,
+            "PI_URL": f"http://127.0.0.1:{self.port}/update_weather",
+            "PYTHONUNBUFFERED": "1",
+        })
+        return env
+
+    def _log(self, name):
+        return open(os.path.join(self.workdir, f"{name}.log"), "a")
+
+    def start_pi(self):
+        self.pi = subprocess.Popen([sys.executable, os.path.join(HERE, "run_pi.py")], cwd=APP_DIR, env=self.env(),
+                                   stdout=self._log("pi"), stderr=subprocess.STDOUT)
+        self.pi_starts += 1
+        if not wait_for_port(self.port, self.pi):
+            raise RuntimeError(f"main.py did not start; see {self.workdir}/pi.log")
+
+    def stop(self, process):
+        if process is not None and process.poll() is None:
+            process.send_signal(signal.SIGINT)
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+    def sample(self, elapsed):
+        row = {}
+        for name, process in (("pi", self.pi), ("fetcher", self.fetcher)):
+            sample = process_sample(process.pid) if process is not None and process.poll() is None else None
+            if sample is None:
+                continue
+            cpu, rss = sample
+            last = self._last_cpu.get(process.pid)
+            self._last_cpu[process.pid] = (cpu, elapsed)
+            if last is not None and elapsed > last[1]:
+                row[name] = (100.0 * (cpu - last[0]) / (elapsed - last[1]), rss)
+        if row:
+            self.samples.append((elapsed, row))
+
+    def run(self):
+        args = self.args
+        self.start_pi()
+        self.fetcher = subprocess.Popen([sys.executable, os.path.join(APP_DIR, "fetch_and_send.py")], cwd=APP_DIR,
+                                        env=self.env(), stdout=self._log("fetcher"), stderr=subprocess.STDOUT)
+        start = time.monotonic()
+        next_outage = args.pi_outage_every or None
+        outage_ends = None
+        next_sample = 0.0
+        while (elapsed := time.monotonic() - start) < args.duration:
+            if elapsed >= next_sample:
+                self.sample(elapsed)
+                next_sample += args.sample_interval
+            if next_outage is not None and outage_ends is None and elapsed >= next_outage:
+                print(f"[{elapsed:6.1f}s] Stopping the Pi for {args.pi_outage_for:g}s.")
+                self.stop(self.pi)
+                outage_ends = elapsed + args.pi_outage_for
+            elif outage_ends is not None and elapsed >= outage_ends:
+                print(f"[{elapsed:6.1f}s] Restarting the Pi.")
+                self.start_pi()
+                outage_ends = None
+                next_outage = elapsed + args.pi_outage_every
+            if self.fetcher.poll() is not None:
+                raise RuntimeError(f"fetch_and_send.py exited early; see {self.workdir}/fetcher.log")
+            time.sleep(0.05)
+        if outage_ends is not None:
+            self.start_pi()
+        # Stop fetching, give the fetcher's spool time to reach the Pi, then stop the Pi
+        served_by_end = len(self.stub.served)
+        deadline = time.monotonic() + args.drain
+        while time.monotonic() < deadline and self.last_drawn() < served_by_end:
+            time.sleep(0.1)
+        self.stop(self.fetcher)
+        self.stop(self.pi)
+        self.stub.stop()
+        return self.report(time.monotonic() - start)
+
+    def read_events(self):
+        draws = []
+        try:
+            with open(self.events_path) as f:
+                for line in f:
+                    drawn_at, reading_id = line.split()
+                    draws.append((float(drawn_at), int(reading_id)))
+        except (OSError, ValueError):
+            pass
+        return draws
+
+    def last_drawn(self):
+        draws = self.read_events()
+        return max((reading_id for _, reading_id in draws), default=0)
+
+    def report(self, wall):
+        served = dict(self.stub.served)
+        draws = self.read_events()
+        drawn = {}
+        for drawn_at, reading_id in draws:
+            drawn.setdefault(reading_id, drawn_at) # First draw of each reading
+        latencies = sorted((drawn_at - served[reading_id]) * 1000.0 for reading_id, drawn_at in drawn.items()
+                           if reading_id in served)
+        newest_drawn = max(drawn, default=0)
+        # Superseded: never drawn, but a newer reading was (coalesced in a spool batch or
+        # stale multicast); lost: newer than anything drawn
+        superseded = sum(1 for reading_id in served if reading_id not in drawn and reading_id < newest_drawn)
+        lost = sum(1 for reading_id in served if reading_id > newest_drawn)
+        result = {
+            "duration_s": round(wall, 1),
+            "requested_rate": self.args.rate,
+            "served": len(served),
+            "served_rate": round(len(served) / max(self.args.duration, 1e-6), 2),
+            "owm_errors_injected": self.stub.errors,
+            "drawn": len(drawn),
+            "superseded": superseded,
+            "lost": lost,
+            "pi_starts": self.pi_starts,
+            "latency_ms": {f"p{p}": percentile(latencies, p) for p in PERCENTILES},
+            "latency_max_ms": latencies[-1] if latencies else None,
+            "resources": self.resource_summary(),
+            "timeline": [{"t": round(t, 1), **{name: {"cpu_pct": round(cpu, 1), "rss_mb": round(rss, 1)}
+                                                for name, (cpu, rss) in row.items()}} for t, row in self.samples],
+            "workdir": self.workdir,
+        }
+        return result
+
+    def resource_summary(self):
+        summary = {}
+        for name in ("pi", "fetcher"):
+            series = [row[name] for _, row in self.samples if name in row]
+            if series:
+                summary[name] = {
+                    "cpu_pct_mean": round(sum(cpu for cpu, _ in series) / len(series), 1),
+                    "cpu_pct_max": round(max(cpu for cpu, _ in series), 1),
+                    "rss_mb_first": round(series[0][1], 1),
+                    "rss_mb_last": round(series[-1][1], 1),
+                    "rss_mb_max": round(max(rss for _, rss in series), 1),
+                }
+        return summary
+
+def print_report(result):
+    latency = result["latency_ms"]
+    fmt = lambda ms: f"{ms:.1f}ms" if ms is not None else "-"
+    print(f"Served {result['served']} reading(s) in {result['duration_s']}s "
+          f"({result['served_rate']}/s of {result['requested_rate']}/s requested), "
+          f"{result['owm_errors_injected']} OWM error(s) injected, Pi started {result['pi_starts']} time(s).")
+    print(f"Drawn {result['drawn']}, superseded {result['superseded']}, lost {result['lost']}.")
+    print("Latency " + "  ".join(f"{name} {fmt(ms)}" for name, ms in latency.items()) + f"  max {fmt(result['latency_max_ms'])}")
+    for name, stats in result["resources"].items():
+        print(f"{name:<8} CPU mean {stats['cpu_pct_mean']}% max {stats['cpu_pct_max']}%  "
+              f"RSS {stats['rss_mb_first']} -> {stats['rss_mb_last']} MB (max {stats['rss_mb_max']})")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Soak/load test of the fetcher -> Pi pipeline on simulated hardware.")
+    parser.add_argument("--rate", type=float, default=10.0, help="Fetches per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load")
+    parser.add_argument("--payload-bytes", type=int, default=500, help="Size of each OWM response")
+    parser.add_argument("--owm-error-rate", type=float, default=0.0, help="Fraction of OWM requests answered with 500")
+    parser.add_argument("--owm-latency-ms", type=float, default=0.0, help="Delay before each OWM response")
+    parser.add_argument("--pi-outage-every", type=float, default=0.0, help="Kill the Pi every this many seconds (0: never)")
+    parser.add_argument("--pi-outage-for", type=float, default=5.0, help="Seconds each outage lasts")
+    parser.add_argument("--adaptive", action="store_true", help="Let the fetcher adapt its rate (--rate is then the highest)")
+    parser.add_argument("--transport", choices=("http", "multicast", "both"), default="http")
+    parser.add_argument("--drain", type=float, default=15.0, help="Seconds allowed for the spool to drain at the end")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="Seconds between CPU/RSS samples")
+    parser.add_argument("--json", help="Write the full results, with the CPU/RSS timeline, to this file")
+    parser.add_argument("--max-p99-ms", type=float, help="Exit 1 if the p99 latency is above this")
+    parser.add_argument("--max-lost", type=int, help="Exit 1 if more readings than this were lost")
+    parser.add_argument("--keep", action="store_true", help="Keep the working directory (logs, spool, events)")
+    args = parser.parse_args(argv)
+
+    soak = Soak(args)
+    try:
+        result = soak.run()
+    finally:
+        soak.stop(soak.fetcher)
+        soak.stop(soak.pi)
+        if not args.keep:
+            shutil.rmtree(soak.workdir, ignore_errors=True)
+    print_report(result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=1)
+    failed = []
+    p99 = result["latency_ms"]["p99"]
+    if args.max_p99_ms is not None and (p99 is None or p99 > args.max_p99_ms):
+        failed.append(f"p99 latency {p99}ms above {args.max_p99_ms}ms")
+    if args.max_lost is not None and result["lost"] > args.max_lost:
+        failed.append(f"{result['lost']} reading(s) lost, more than {args.max_lost}")
+    for line in failed:
+        print(f"FAILED: {line}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
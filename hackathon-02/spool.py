@@ -0,0 +1,107 @@
+import json
+import os
+import random
+import sqlite3
+import time
+
+# --- Configuration ---
+# Readings the Pi has not acknowledged yet, kept in SQLite so they survive the fetcher
+# being restarted while the Pi is offline. WAL mode makes every append a short sequential
+# write; delivered readings are deleted in batches.
+SPOOL_PATH = os.environ.get("WEATHER_SPOOL_PATH", "weather_spool.db") # Relative to the working directory
+MAX_SPOOL_READINGS = 20000    # Oldest readings are dropped beyond this (about 10 MB of OWM JSON)
+BATCH_SIZE = 500              # Readings per POST while draining a backlog
+BACKOFF_INITIAL = 2.0         # Seconds before retrying an unreachable Pi, doubled per failure...
+BACKOFF_MAX = 300.0           # ...up to this
+WAL_SIZE_LIMIT = 4 * 1024 * 1024  # Bytes the WAL file is truncated to after checkpoints
+
+class Spool:
+    def __init__(self, path=SPOOL_PATH, max_readings=MAX_SPOOL_READINGS):
+        self.path = path
+        self.max_readings = max_readings
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL") # WAL stays consistent; a power cut may lose the last append
+        self.db.execute(f"PRAGMA journal_size_limit={WAL_SIZE_LIMIT}")
+        self.db.execute("CREATE TABLE IF NOT EXISTS readings (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                        "queued_at REAL NOT NULL, payload TEXT NOT NULL)")
+        self.db.commit()
+        self.dropped = 0
+
+    def append(self, data):
+        with self.db:
+            self.db.execute("INSERT INTO readings (queued_at, payload) VALUES (?, ?)", (time.time(), json.dumps(data)))
+            excess = self.depth() - self.max_readings
+            if excess > 0:
+                # Bounded disk: the oldest readings matter least
+                self.db.execute("DELETE FROM readings WHERE id IN (SELECT id FROM readings ORDER BY id LIMIT ?)", (excess,))
+                self.dropped += excess
+
+    def peek(self, limit=BATCH_SIZE):
+        # Oldest first: [(id, data), ...]
+        rows = self.db.execute("SELECT id, payload FROM readings ORDER BY id LIMIT ?", (limit,)).fetchall()
+        return [(row_id, json.loads(payload)) for row_id, payload in rows]
+
+    def ack(self, last_id):
+        # Everything up to last_id was delivered
+        with self.db:
+            self.db.execute("DELETE FROM readings WHERE id <= ?", (last_id,))
+
+    def depth(self):
+        return self.db.execute("SELECT COUNT(*) FROM readings").fetchone()[0]
+
+    def oldest_age(self):
+        row = self.db.execute("SELECT MIN(queued_at) FROM readings").fetchone()
+        return time.time() - row[0] if row[0] is not None else 0.0
+
+    def close(self):
+        self.db.close()
+
+class Forwarder:
+    # Drains a Spool through send(payload) -> bool, backing off while it fails. A single
+    # reading is sent as the JSON object the Pi always accepted; a backlog as a JSON list.
+    def __init__(self, spool, send, batch_size=BATCH_SIZE):
+        self.spool = spool
+        self.send = send
+        self.batch_size = batch_size
+        self.backoff = 0.0
+        self.next_attempt = 0.0
+        self.delivered = 0
+        self.failures = 0
+        self.last_drain_rate = 0.0 # Readings per second over the last drain
+
+    def drain(self):
+        # Sends batches until the spool is empty or a send fails; returns readings delivered
+        now = time.monotonic()
+        if now < self.next_attempt:
+            return 0
+        start, delivered = now, 0
+        while True:
+            batch = self.spool.peek(self.batch_size)
+            if not batch:
+                break
+            payload = batch[0][1] if len(batch) == 1 else [data for _, data in batch]
+            if not self.send(payload):
+                self.failures += 1
+                # Exponential backoff with jitter, so fetchers do not all retry in step
+                self.backoff = min(BACKOFF_MAX, self.backoff * 2 if self.backoff else BACKOFF_INITIAL)
+                self.next_attempt = time.monotonic() + self.backoff * random.uniform(0.8, 1.2)
+                break
+            self.spool.ack(batch[-1][0])
+            delivered += len(batch)
+            self.backoff = 0.0
+        if delivered:
+            self.delivered += delivered
+            self.last_drain_rate = delivered / max(time.monotonic() - start, 1e-6)
+        return delivered
+
+    def metrics(self):
+        return {
+            "spool_depth": self.spool.depth(),
+            "oldest_queued_s": round(self.spool.oldest_age(), 1),
+            "delivered_total": self.delivered,
+            "dropped_total": self.spool.dropped,
+            "send_failures": self.failures,
+            "drain_rate_per_s": round(self.last_drain_rate, 1),
+            "backoff_s": round(max(0.0, self.next_attempt - time.monotonic()), 1),
+        }
@@ -0,0 +1,68 @@
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# A stand-in for the Pi's /update_weather endpoint that goes up and down on a schedule,
+# for trying the fetcher's spool without the hardware:
+#   python standin_pi.py --port 5050 --up 20 --down 40
+#   PI_URL=http://127.0.0.1:5050/update_weather python fetch_and_send.py
+
+received = 0
+batches = 0
+_lock = threading.Lock()
+
+class Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        global received, batches
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            data = json.loads(body)
+        except ValueError:
+            self._reply(400, {"error": "Request must be JSON"})
+            return
+        count = len(data) if isinstance(data, list) else 1
+        with _lock:
+            received += count
+            batches += 1
+        self._reply(200, {"message": "Weather data processed successfully", "accepted": count})
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass # One summary line per up period instead
+
+def run(port, up, down, cycles=None):
+    cycle = 0
+    while cycles is None or cycle < cycles:
+        server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        before = received
+        print(f"Stand-in Pi up on port {port} for {up}s.")
+        time.sleep(up)
+        server.shutdown()
+        server.server_close() # Connections are refused while down, as with an offline Pi
+        print(f"Received {received - before} reading(s) ({received} total in {batches} request(s)). Down for {down}s.")
+        if down:
+            time.sleep(down)
+        cycle += 1
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stand-in for the Pi that goes up and down.")
+    parser.add_argument("--port", type=int, default=5050)
+    parser.add_argument("--up", type=float, default=20.0, help="Seconds up per cycle")
+    parser.add_argument("--down", type=float, default=40.0, help="Seconds down per cycle")
+    parser.add_argument("--cycles", type=int, help="Stop after this many cycles (default: run until Ctrl+C)")
+    args = parser.parse_args()
+    try:
+        run(args.port, args.up, args.down, args.cycles)
+    except KeyboardInterrupt:
+        print(f"\nStopping. Received {received} reading(s) in {batches} request(s).")